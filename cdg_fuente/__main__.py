@@ -0,0 +1,16 @@
+'''
+Punto de entrada de python -m cdg_fuente; ver configuracion.py.
+'''
+import time
+
+_inicio = time.perf_counter()
+
+import os
+import sys
+
+# los modulos de cdg_fuente se importan entre si por nombre, como en main.py
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import configuracion
+
+configuracion.principal(tiempo_de_importacion_=time.perf_counter() - _inicio)
@@ -0,0 +1,292 @@
+'''
+Refinamiento adaptativo h de la malla: los elementos se dividen a la mitad donde la solucion
+tiene saltos grandes entre elementos (el frente de onda) y se vuelven a unir donde la solucion
+es suave (el agua en reposo), de modo que se alcanza la precision de una malla uniforme fina
+con una fraccion de los elementos.
+
+La malla parte de N_elementos_base elementos iguales; cada elemento tiene un nivel de
+refinamiento entre 0 y nivel_maximo y mide longitud_base / 2^nivel. Dos elementos vecinos del
+mismo nivel que vienen de dividir el mismo elemento (hermanos) se pueden unir.
+
+El indicador de error es el salto de h y hu en las fronteras entre elementos, que es cero para
+la solucion exacta y crece con el error de la discretizacion; la condicion inicial, cuyo
+interpolante nodal es continuo, se adapta en cambio con el error de interpolacion. La solucion
+se pasa entre padre e hijos con la proyeccion L2, que conserva la integral de h y de hu:
+    refinar:  el polinomio del padre restringido a cada hijo, exacto
+    unir:     la proyeccion L2 de los polinomios de los dos hijos en el padre
+
+Uso:
+    python adaptacion.py
+'''
+import functools
+import time
+
+import numpy as np
+
+import bases
+import estado
+import paso_de_tiempo
+import simulacion
+import solucionadores_de_riemann
+
+class MallaAdaptativa:
+    '''
+    Malla unidimensional de elementos de longitud longitud_base / 2^nivel.
+
+    Parámetros:
+        x_inicial_ (float): Coordenada inicial del dominio.
+        x_final_ (float): Coordenada final del dominio.
+        N_elementos_base_ (int): Numero de elementos de nivel 0.
+        N_nodos_ (int): Numero de nodos por elemento.
+        nivel_maximo_ (int): Nivel de refinamiento maximo.
+        familia_ (str): Familia de nodos, 'equiespaciados' o 'gauss_lobatto'.
+        niveles_ (numpy.ndarray): Opcional, nivel de cada elemento; por defecto todos en 0.
+    '''
+
+    def __init__(self, x_inicial_, x_final_, N_elementos_base_, N_nodos_, nivel_maximo_=3, familia_='equiespaciados', niveles_=None):
+        self.x_inicial = x_inicial_
+        self.x_final = x_final_
+        self.N_elementos_base = N_elementos_base_
+        self.N_nodos = N_nodos_
+        self.nivel_maximo = nivel_maximo_
+        self.familia = familia_
+        self.niveles = np.zeros(N_elementos_base_, dtype=int) if niveles_ is None else np.asarray(niveles_, dtype=int)
+
+    @property
+    def N_elementos(self):
+        return len(self.niveles)
+
+    def con_niveles(self, niveles_):
+        return MallaAdaptativa(self.x_inicial, self.x_final, self.N_elementos_base, self.N_nodos, self.nivel_maximo, self.familia, niveles_)
+
+    def unidades(self):
+        '''
+        Longitud de cada elemento en unidades enteras del elemento mas fino posible.
+        '''
+        return 2**( self.nivel_maximo - self.niveles )
+
+    def limites(self):
+        '''
+        Coordenadas de los limites de los elementos, forma (N_elementos + 1,).
+        '''
+        posicion = np.concatenate(([0], np.cumsum(self.unidades())))
+        unidades_totales = self.N_elementos_base * 2**self.nivel_maximo
+        return self.x_inicial + ( self.x_final - self.x_inicial ) * posicion / unidades_totales
+
+    def malla(self):
+        return simulacion.generar_malla_desde_limites(self.limites(), self.N_nodos, self.familia)
+
+@functools.lru_cache(maxsize=32)
+def matrices_de_proyeccion(N_nodos_, familia_='equiespaciados'):
+    '''
+    Matrices de referencia para pasar la solucion entre un padre y sus dos hijos, con los valores
+    nodales de cada elemento como vector fila:
+
+        hijo_k = padre @ refinar[k]
+        padre = hijo_0 @ unir[0] + hijo_1 @ unir[1]
+
+    Retorna:
+        tuple: (refinar, unir), cada uno de forma (2, N_nodos, N_nodos).
+    '''
+    nodos = bases.nodos_de_referencia(N_nodos_, familia_)
+    cuadratura, pesos = bases.cuadratura_de_gauss_legendre(N_nodos_ + 1)
+    phi_cuadratura = bases.evaluar_base_baricentrica(nodos, cuadratura)
+    matriz_de_masa = ( phi_cuadratura * pesos ) @ phi_cuadratura.T
+
+    refinar, unir = [], []
+    for hijo in range(2):
+        # el hijo k ocupa [-1, 0] (k = 0) o [0, 1] (k = 1) en las coordenadas del padre
+        en_el_padre = lambda xi: 0.5 * ( xi - 1.0 ) + hijo
+        refinar.append(bases.evaluar_base_baricentrica(nodos, en_el_padre(nodos)))
+
+        # (M_padre U_padre)_i = sum_k integral_hijo_k phi_i^padre U_hijo_k dx, con dx_hijo = dx_padre / 2
+        phi_padre = bases.evaluar_base_baricentrica(nodos, en_el_padre(cuadratura))
+        unir.append(( 0.5 * phi_cuadratura * pesos ) @ phi_padre.T @ np.linalg.inv(matriz_de_masa))
+
+    return np.array(refinar), np.array(unir)
+
+def _diferencia_adimensional(h_a_, hu_a_, h_b_, hu_b_):
+    # |dh| / h + |d(hu)| / (h sqrt(g h)), con h el promedio de las dos alturas
+    h_promedio = 0.5 * ( h_a_ + h_b_ )
+    return np.abs(h_b_ - h_a_) / h_promedio + np.abs(hu_b_ - hu_a_) / ( h_promedio * np.sqrt(solucionadores_de_riemann.GRAVEDAD * h_promedio) )
+
+def indicador_de_saltos(U_):
+    '''
+    Indicador de error de cada elemento: el mayor salto adimensional de h y hu en sus dos
+    fronteras, |dh| / h + |d(hu)| / (h sqrt(g h)) con h el promedio en la frontera.
+
+    Retorna:
+        numpy.ndarray: Forma (N_elementos,); las paredes del dominio no cuentan.
+    '''
+    salto = _diferencia_adimensional(U_[0, :-1, -1], U_[1, :-1, -1], U_[0, 1:, 0], U_[1, 1:, 0])
+
+    indicador = np.zeros(U_.shape[1])
+    indicador[:-1] = salto
+    indicador[1:] = np.maximum(indicador[1:], salto)
+    return indicador
+
+def indicador_de_interpolacion(malla_adaptativa_, condicion_inicial_):
+    '''
+    Indicador de error de una condicion inicial dada como funcion, condicion_inicial(malla) -> (h, u):
+    la mayor diferencia adimensional, en los nodos de los dos hijos de cada elemento, entre la
+    funcion y su interpolante en el elemento. Reemplaza a indicador_de_saltos antes del primer
+    paso, porque el interpolante nodal es continuo si los nodos incluyen los extremos.
+
+    Retorna:
+        numpy.ndarray: Forma (N_elementos,).
+    '''
+    refinar, _ = matrices_de_proyeccion(malla_adaptativa_.N_nodos, malla_adaptativa_.familia)
+    U = estado.EstadoConservativo.desde_primitivas(*condicion_inicial_(malla_adaptativa_.malla())).datos
+
+    limites = malla_adaptativa_.limites()
+    limites_hijos = np.empty(2 * len(limites) - 1)
+    limites_hijos[::2] = limites
+    limites_hijos[1::2] = 0.5 * ( limites[:-1] + limites[1:] )
+    malla_hijos = simulacion.generar_malla_desde_limites(limites_hijos, malla_adaptativa_.N_nodos, malla_adaptativa_.familia)
+    U_hijos = estado.EstadoConservativo.desde_primitivas(*condicion_inicial_(malla_hijos)).datos
+
+    diferencia = np.maximum(_diferencia_adimensional(*( U @ refinar[0] ), *U_hijos[:, 0::2]), _diferencia_adimensional(*( U @ refinar[1] ), *U_hijos[:, 1::2]))
+    return np.max(diferencia, axis=1)
+
+def marcar(malla_adaptativa_, indicador_, umbral_refinar_, umbral_unir_):
+    '''
+    Marca los elementos a refinar (indicador > umbral_refinar_, nivel < nivel_maximo) y las parejas
+    de hermanos a unir (ambos con indicador < umbral_unir_ y sin marcar para refinar). Las parejas
+    no se solapan entre si ni con los elementos a refinar.
+
+    Retorna:
+        tuple: (refinar, primero_de_pareja), mascaras booleanas de forma (N_elementos,); primero_de_pareja
+        marca el hermano izquierdo de cada pareja a unir.
+    '''
+    niveles = malla_adaptativa_.niveles
+    refinar = ( indicador_ > umbral_refinar_ ) & ( niveles < malla_adaptativa_.nivel_maximo )
+
+    # el hermano izquierdo empieza en un multiplo de la longitud del padre
+    unidades = malla_adaptativa_.unidades()
+    posicion = np.concatenate(([0], np.cumsum(unidades)[:-1]))
+    suave = ( indicador_ < umbral_unir_ ) & ~refinar
+    primero_de_pareja = np.zeros(len(niveles), dtype=bool)
+    primero_de_pareja[:-1] = ( ( niveles[:-1] > 0 ) & ( niveles[:-1] == niveles[1:] ) & ( posicion[:-1] % ( 2 * unidades[:-1] ) == 0 )
+                               & suave[:-1] & suave[1:] )
+    return refinar, primero_de_pareja
+
+def adaptar(malla_adaptativa_, U_, refinar_, primero_de_pareja_):
+    '''
+    Divide los elementos marcados en refinar_ y une las parejas marcadas en primero_de_pareja_,
+    proyectando el estado conservativo U_ de forma (2, N_elementos, N_nodos).
+
+    Retorna:
+        tuple: (nueva MallaAdaptativa, nuevo estado conservativo).
+    '''
+    refinar, unir = matrices_de_proyeccion(malla_adaptativa_.N_nodos, malla_adaptativa_.familia)
+    segundo_de_pareja = np.roll(primero_de_pareja_, 1)
+
+    # numero de elementos nuevos que deja cada elemento viejo y posicion del primero
+    cuenta = np.ones(malla_adaptativa_.N_elementos, dtype=int)
+    cuenta[refinar_] = 2
+    cuenta[segundo_de_pareja] = 0
+    inicio = np.cumsum(cuenta) - cuenta
+
+    niveles = np.repeat(malla_adaptativa_.niveles, cuenta)
+    niveles[inicio[refinar_]] += 1
+    niveles[inicio[refinar_] + 1] += 1
+    niveles[inicio[primero_de_pareja_]] -= 1
+
+    U = np.empty((2, int(np.sum(cuenta)), malla_adaptativa_.N_nodos), dtype=U_.dtype)
+    igual = cuenta == 1
+    igual[primero_de_pareja_] = False
+    U[:, inicio[igual]] = U_[:, igual]
+    U[:, inicio[refinar_]] = U_[:, refinar_] @ refinar[0]
+    U[:, inicio[refinar_] + 1] = U_[:, refinar_] @ refinar[1]
+    U[:, inicio[primero_de_pareja_]] = U_[:, primero_de_pareja_] @ unir[0] + U_[:, segundo_de_pareja] @ unir[1]
+
+    return malla_adaptativa_.con_niveles(niveles), U
+
+def adaptar_condicion_inicial(malla_adaptativa_, condicion_inicial_, umbral_refinar_, umbral_unir_):
+    '''
+    Adapta la malla a una condicion inicial dada como funcion, condicion_inicial(malla) -> (h, u),
+    con indicador_de_interpolacion, evaluandola de nuevo en cada pasada en lugar de proyectarla.
+
+    Retorna:
+        tuple: (MallaAdaptativa, EstadoConservativo).
+    '''
+    malla_adaptativa = malla_adaptativa_
+    for _ in range(malla_adaptativa_.nivel_maximo + 1):
+        refinar, primero_de_pareja = marcar(malla_adaptativa, indicador_de_interpolacion(malla_adaptativa, condicion_inicial_), umbral_refinar_, umbral_unir_)
+        if not np.any(refinar) and not np.any(primero_de_pareja):
+            break
+        # el estado proyectado no se usa: la siguiente pasada evalua la funcion en la malla nueva
+        malla_adaptativa, _ = adaptar(malla_adaptativa, np.zeros((2, malla_adaptativa.N_elementos, malla_adaptativa.N_nodos)), refinar, primero_de_pareja)
+    return malla_adaptativa, estado.EstadoConservativo.desde_primitivas(*condicion_inicial_(malla_adaptativa.malla()))
+
+def integrar_adaptativo(estado_, malla_adaptativa_, t_total_, intervalo_de_adaptacion_, umbral_refinar_=1e-3, umbral_unir_=1e-4, integrador_='ssp_rk3', solucionador_riemann_='roe', cfl_=None):
+    '''
+    Integra hasta t_total_ adaptando la malla cada intervalo_de_adaptacion_ segundos. Entre dos
+    adaptaciones el numero de elementos es fijo y se usa paso_de_tiempo.integrar con un
+    RHSOperator que escala cada elemento por su longitud.
+
+    Retorna:
+        tuple: (estado final, malla adaptativa final, reporte con los pasos totales y el numero
+        de elementos despues de cada adaptacion).
+    '''
+    malla_adaptativa = malla_adaptativa_
+    U = estado_.datos
+    reporte = {'pasos': 0, 'pasos_rechazados': 0, 'N_elementos': [malla_adaptativa.N_elementos], 't_final': 0.0}
+
+    t = 0.0
+    while t < t_total_ * ( 1.0 - 1e-12 ):
+        malla = malla_adaptativa.malla()
+        matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla, familia_=malla_adaptativa.familia)
+        operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez, solucionador_riemann_)
+
+        estado_actual = estado.EstadoConservativo(U)
+        parcial = paso_de_tiempo.integrar(estado_actual, operador.evaluate_conservative, min(t + intervalo_de_adaptacion_, t_total_), malla, integrador_, cfl_=cfl_,
+                                          t_inicial_=t, paso_inicial_=reporte['pasos'])
+        t = parcial['t_final']
+        reporte['pasos'] = parcial['pasos']
+        reporte['pasos_rechazados'] += parcial['pasos_rechazados']
+
+        if t < t_total_ * ( 1.0 - 1e-12 ):
+            refinar, primero_de_pareja = marcar(malla_adaptativa, indicador_de_saltos(estado_actual.datos), umbral_refinar_, umbral_unir_)
+            malla_adaptativa, U = adaptar(malla_adaptativa, estado_actual.datos, refinar, primero_de_pareja)
+            reporte['N_elementos'].append(malla_adaptativa.N_elementos)
+        else:
+            U = estado_actual.datos
+
+    reporte['t_final'] = t
+    return estado.EstadoConservativo(U), malla_adaptativa, reporte
+
+def comparar_con_uniforme(N_elementos_base_=10, N_nodos_=3, nivel_maximo_=3, t_total_=1.5, intervalo_de_adaptacion_=0.05, umbral_refinar_=3e-4, umbral_unir_=5e-5):
+    '''
+    Compara el error L2 de h, el numero de elementos y el tiempo de la malla adaptativa con mallas
+    uniformes, contra una referencia uniforme dos veces mas fina que el nivel maximo. Para la
+    malla adaptativa se reporta el numero medio de elementos entre adaptaciones.
+    '''
+    condicion_inicial = lambda malla: simulacion.condiciones_iniciales_gaussianas(malla, amplitud_=0.1, ancho_=0.3)
+
+    def uniforme(N_elementos):
+        malla = simulacion.generar_malla(0.0, 10.0, N_elementos, N_nodos_)
+        matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+        estado_ = estado.EstadoConservativo.desde_primitivas(*condicion_inicial(malla))
+        operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+        inicio = time.perf_counter()
+        paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, t_total_, malla)
+        return malla, estado_.h, time.perf_counter() - inicio
+
+    malla_referencia, h_referencia, _ = uniforme(2 * N_elementos_base_ * 2**nivel_maximo_)
+
+    print(f'{"malla":>24} {"elementos":>10} {"error L2 de h":>14} {"tiempo (s)":>11}')
+    for nivel in range(nivel_maximo_ + 1):
+        malla, h, segundos = uniforme(N_elementos_base_ * 2**nivel)
+        error = bases.error_l2(malla, h, malla_referencia, h_referencia)
+        print(f'{"uniforme nivel " + str(nivel):>24} {len(malla):>10} {error:14.4e} {segundos:11.3f}')
+
+    malla_adaptativa, estado_ = adaptar_condicion_inicial(MallaAdaptativa(0.0, 10.0, N_elementos_base_, N_nodos_, nivel_maximo_), condicion_inicial, umbral_refinar_, umbral_unir_)
+    inicio = time.perf_counter()
+    estado_, malla_adaptativa, reporte = integrar_adaptativo(estado_, malla_adaptativa, t_total_, intervalo_de_adaptacion_, umbral_refinar_, umbral_unir_)
+    segundos = time.perf_counter() - inicio
+    error = bases.error_l2(malla_adaptativa.malla(), estado_.h, malla_referencia, h_referencia)
+    print(f'{"adaptativa":>24} {np.mean(reporte["N_elementos"]):>10.1f} {error:14.4e} {segundos:11.3f}')
+
+if __name__ == '__main__':
+    comparar_con_uniforme()
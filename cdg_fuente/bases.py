@@ -1,4 +1,6 @@
+import functools
 import numpy as np
+import precision
 
 def lagrange_basis_derivative(nodes, i, x):
     """
@@ -58,15 +60,234 @@ def polinomios_de_lagrange(nodos, i, x):
 
     return polinomio_de_lagrange_i_evaluado_en_x
 
+# familias de nodos del elemento de referencia [-1, 1]
+FAMILIAS_DE_NODOS = ('equiespaciados', 'gauss_lobatto')
+
+# familias de cuadratura en [-1, 1]
+FAMILIAS_DE_CUADRATURA = ('gauss_legendre', 'gauss_lobatto')
+
+def n_nodos_cuadratura_minima(N_nodos_):
+    '''
+    Numero minimo de puntos de Gauss-Legendre que integra exactamente las matrices de masa
+    (phi_i phi_j, grado 2 N_nodos - 2) y de rigidez (dphi_i/dx phi_j, grado 2 N_nodos - 3).
+    Una cuadratura de n puntos es exacta hasta grado 2 n - 1, por lo que n = N_nodos.
+    '''
+    return N_nodos_
+
+@functools.lru_cache(maxsize=64)
+def cuadratura_de_gauss_lobatto(n_nodos_cuadratura_):
+    '''
+    Puntos y pesos de la cuadratura de Gauss-Lobatto-Legendre: los extremos -1 y 1 y las raices
+    de P'_{n-1}, con pesos w_i = 2 / ( n (n - 1) P_{n-1}(x_i)^2 ). Guardados en un cache LRU (solo lectura).
+    '''
+    n = n_nodos_cuadratura_
+    if n < 2:
+        raise ValueError('La cuadratura de Gauss-Lobatto necesita al menos 2 puntos')
+
+    legendre_n_1 = np.polynomial.legendre.Legendre.basis(n - 1)
+    puntos = np.concatenate(([-1.0], np.sort(np.real(legendre_n_1.deriv().roots())), [1.0]))
+
+    # refinando las raices interiores con iteraciones de Newton sobre P'_{n-1}
+    primera_derivada, segunda_derivada = legendre_n_1.deriv(1), legendre_n_1.deriv(2)
+    for _ in range(3):
+        puntos[1:-1] -= primera_derivada(puntos[1:-1]) / segunda_derivada(puntos[1:-1])
+
+    pesos = 2.0 / ( n * ( n - 1 ) * legendre_n_1(puntos)**2 )
+    puntos.setflags(write=False)
+    pesos.setflags(write=False)
+    return puntos, pesos
+
+def cuadratura(n_nodos_cuadratura_, familia_='gauss_legendre'):
+    '''
+    Puntos y pesos de la cuadratura de la familia dada en [-1, 1].
+    '''
+    if familia_ == 'gauss_legendre':
+        return cuadratura_de_gauss_legendre(n_nodos_cuadratura_)
+    if familia_ == 'gauss_lobatto':
+        return cuadratura_de_gauss_lobatto(n_nodos_cuadratura_)
+    raise ValueError(f'Familia de cuadratura desconocida: {familia_!r}. Opciones: {FAMILIAS_DE_CUADRATURA}')
+
+def nodos_de_referencia(N_nodos_, familia_='equiespaciados'):
+    '''
+    Nodos del elemento de referencia [-1, 1] para la familia dada. Ambas familias incluyen los
+    extremos del elemento, que son los nodos usados por el flujo numerico en las fronteras.
+    '''
+    if familia_ == 'equiespaciados':
+        return np.linspace(-1.0, 1.0, N_nodos_)
+    if familia_ == 'gauss_lobatto':
+        return np.array(cuadratura_de_gauss_lobatto(N_nodos_)[0])
+    raise ValueError(f'Familia de nodos desconocida: {familia_!r}. Opciones: {FAMILIAS_DE_NODOS}')
+
+def pesos_baricentricos(nodos_):
+    '''
+    Pesos baricentricos w_j = 1 / prod_{k != j} (x_j - x_k) de los nodos dados.
+    '''
+    diferencias = nodos_[:, None] - nodos_[None, :]
+    np.fill_diagonal(diferencias, 1.0)
+    return 1.0 / np.prod(diferencias, axis=1)
+
+def matriz_de_diferenciacion(nodos_):
+    '''
+    Matriz D con D[i, j] = dphi_j/dx evaluada en el nodo i, calculada con los pesos baricentricos.
+    '''
+    pesos = pesos_baricentricos(nodos_)
+    diferencias = nodos_[:, None] - nodos_[None, :]
+    np.fill_diagonal(diferencias, 1.0)
+    D = ( pesos[None, :] / pesos[:, None] ) / diferencias
+    np.fill_diagonal(D, 0.0)
+    np.fill_diagonal(D, -np.sum(D, axis=1))
+    return D
+
+def evaluar_base_baricentrica(nodos_, x_):
+    '''
+    Evalua todos los polinomios de Lagrange de los nodos dados en todas las posiciones x_ con
+    la segunda forma baricentrica, phi_j(x) = (w_j / (x - x_j)) / sum_k (w_k / (x - x_k)).
+
+    Retorna:
+        numpy.ndarray: phi[j, q] = phi_j(x_q), forma (N_nodos, len(x_)).
+    '''
+    pesos = pesos_baricentricos(nodos_)
+    diferencias = x_[None, :] - nodos_[:, None]
+
+    # las posiciones que coinciden con un nodo se resuelven con phi_j(x_i) = delta_ij
+    coincide = diferencias == 0.0
+    diferencias[coincide] = 1.0
+    terminos = pesos[:, None] / diferencias
+    phi = terminos / np.sum(terminos, axis=0)
+    columnas_en_nodo = np.any(coincide, axis=0)
+    phi[:, columnas_en_nodo] = coincide[:, columnas_en_nodo]
+
+    return phi
+
+@functools.lru_cache(maxsize=64)
+def cuadratura_de_gauss_legendre(n_nodos_cuadratura_gauss_):
+    '''
+    Puntos y pesos de la cuadratura de Gauss-Legendre, guardados en un cache LRU (solo lectura).
+    '''
+    cuadratura_de_gauss, pesos_de_gauss = np.polynomial.legendre.leggauss(n_nodos_cuadratura_gauss_)
+    cuadratura_de_gauss.setflags(write=False)
+    pesos_de_gauss.setflags(write=False)
+    return cuadratura_de_gauss, pesos_de_gauss
+
+@functools.lru_cache(maxsize=64)
+def operadores_de_referencia(N_nodos_, n_nodos_cuadratura_gauss_, familia_='equiespaciados', familia_cuadratura_='gauss_legendre'):
+    '''
+    Polinomios de Lagrange y sus derivadas en el elemento de referencia [-1, 1], evaluados en
+    los puntos de la cuadratura familia_cuadratura_ de n_nodos_cuadratura_gauss_ puntos.
+
+    El resultado se guarda en un cache LRU con la llave
+    (N_nodos, n_nodos_cuadratura_gauss, familia, familia_cuadratura),
+    de modo que barridos de parametros y reinicios reutilizan los operadores. Los arrays
+    retornados son de solo lectura porque son compartidos.
+
+    Retorna:
+        tuple: (nodos, cuadratura_de_gauss, pesos_de_gauss, phi, dphi_dxi) con
+            phi[i, q] = phi_i(xi_q) y dphi_dxi[i, q] = dphi_i/dxi(xi_q), forma (N_nodos, n_nodos_cuadratura_gauss).
+    '''
+    nodos = nodos_de_referencia(N_nodos_, familia_)
+    cuadratura_de_gauss, pesos_de_gauss = cuadratura(n_nodos_cuadratura_gauss_, familia_cuadratura_)
+
+    # dphi_j/dxi es un polinomio de grado N_nodos - 1, interpolado exactamente por sus valores en los nodos
+    phi = evaluar_base_baricentrica(nodos, cuadratura_de_gauss)
+    dphi_dxi = matriz_de_diferenciacion(nodos).T @ phi
+
+    operadores = (nodos, cuadratura_de_gauss, pesos_de_gauss, phi, dphi_dxi)
+    for array in (nodos, phi, dphi_dxi):
+        array.setflags(write=False)
+    return operadores
+
 def generate_reference_space(malla_, cuadratura_de_gauss_):
+    '''
+    Evalua los polinomios de Lagrange de los nodos de un elemento de la malla y sus derivadas
+    en x en los puntos de la cuadratura de Gauss.
+
+    Los nodos de malla_[0] se llevan al elemento de referencia [-1, 1]. Si son una familia
+    conocida y la cuadratura es de Gauss-Legendre o de Gauss-Lobatto, los operadores vienen del cache de
+    operadores_de_referencia; si no, se calculan con las mismas formulas baricentricas.
+
+    Parámetros:
+        malla_ (numpy.ndarray): Coordenadas de los nodos, forma (N_elementos, N_nodos).
+        cuadratura_de_gauss_ (numpy.ndarray): Puntos de cuadratura de Gauss en [-1, 1].
+
+    Retorna:
+        tuple: (polinomios_de_lagrange_en_cuadratura_de_gauss, derivada_x_polinomios_de_lagrange_en_cuadratura_de_gauss),
+            ambos de forma (N_nodos, len(cuadratura_de_gauss_)), calculados en float64 y con la
+            precision actual.
+    '''
+    N_nodos = len(malla_[0])
+    tipo = precision.tipo_de_dato()
+    cuadratura_de_gauss_ = np.asarray(cuadratura_de_gauss_, dtype=float)
+
+    # nodos del primer elemento en el espacio de referencia y factor dxi/dx = 2 / longitud_elemento
+    primer_elemento = np.asarray(malla_[0], dtype=float)
+    longitud_elemento = primer_elemento[-1] - primer_elemento[0]
+    nodos = 2.0 * ( primer_elemento - primer_elemento[0] ) / longitud_elemento - 1.0
+    dxi_dx = 2.0 / longitud_elemento
 
-    # guardando la cuadratura de Gauss en el espacio físico
-    cuadratura_de_gauss_espacio_fisico = 0.5 * ( malla_[0][-1] - malla_[0][0] ) * cuadratura_de_gauss_ + 0.5 * ( malla_[0][-1] + malla_[0][0])
+    n_cuadratura = len(cuadratura_de_gauss_)
+    for familia_cuadratura in FAMILIAS_DE_CUADRATURA:
+        if n_cuadratura < 2 and familia_cuadratura == 'gauss_lobatto':
+            continue
+        if not np.allclose(cuadratura_de_gauss_, cuadratura(n_cuadratura, familia_cuadratura)[0]):
+            continue
+        for familia in FAMILIAS_DE_NODOS:
+            if np.allclose(nodos, nodos_de_referencia(N_nodos, familia)):
+                _, _, _, phi, dphi_dxi = operadores_de_referencia(N_nodos, n_cuadratura, familia, familia_cuadratura)
+                return phi.astype(tipo, copy=False), ( dxi_dx * dphi_dxi ).astype(tipo, copy=False)
 
-    # evaluando la función base en los puntos de cuadratura de Gauss
-    polinomios_de_lagrange_en_cuadratura_de_gauss_ = np.array([[polinomios_de_lagrange(malla_[0], i, x) for x in cuadratura_de_gauss_espacio_fisico] for i in range(len(malla_[0]))])
+    phi = evaluar_base_baricentrica(nodos, cuadratura_de_gauss_)
+    return phi.astype(tipo, copy=False), ( dxi_dx * ( matriz_de_diferenciacion(nodos).T @ phi ) ).astype(tipo, copy=False)
 
-    # evaluando la derivada en x de la función base evaluada en los puntos de cuadratura de Gauss
-    derivada_x_polinomios_de_lagrange_en_cuadratura_de_gauss_ = np.array([[lagrange_basis_derivative(malla_[0], i, x) for x in cuadratura_de_gauss_espacio_fisico] for i in range(len(malla_[0]))])
+def evaluar_solucion(malla_, valores_, x_):
+    '''
+    Evalua la solucion de Galerkin discontinuo en posiciones arbitrarias del dominio,
+    interpolando con los polinomios de Lagrange del elemento que contiene cada posicion.
+
+    Parámetros:
+        malla_ (numpy.ndarray): Coordenadas de los nodos, forma (N_elementos, N_nodos).
+        valores_ (numpy.ndarray): Valores nodales de la solucion, forma (N_elementos, N_nodos).
+        x_ (numpy.ndarray): Posiciones en las que se evalua la solucion.
+
+    Retorna:
+        numpy.ndarray: Valores de la solucion en x_, con la forma de x_.
+    '''
+    x_ = np.asarray(x_, dtype=float)
+
+    # elemento que contiene cada posicion (las posiciones fuera del dominio usan el elemento mas cercano)
+    indice_elemento = np.clip(np.searchsorted(malla_[:, 0], x_, side='right') - 1, 0, len(malla_) - 1)
+    nodos = malla_[indice_elemento]
+    valores = valores_[indice_elemento]
+
+    # suma de los valores nodales por los polinomios de Lagrange de su elemento
+    solucion = np.zeros(x_.shape)
+    for i in range(malla_.shape[1]):
+        polinomio_i = np.ones(x_.shape)
+        for j in range(malla_.shape[1]):
+            if j != i:
+                polinomio_i *= (x_ - nodos[..., j]) / (nodos[..., i] - nodos[..., j])
+        solucion += valores[..., i] * polinomio_i
+
+    return solucion
+
+def error_l2(malla_, valores_, malla_referencia_, valores_referencia_, n_nodos_cuadratura_gauss_=20):
+    '''
+    Norma L2 de la diferencia entre dos soluciones de Galerkin discontinuo, integrada con
+    cuadratura de Gauss en cada elemento de malla_. Las mallas pueden ser distintas: las dos
+    soluciones se evaluan en los puntos de cuadratura de malla_ con evaluar_solucion.
+
+    Parámetros:
+        malla_ (numpy.ndarray): Coordenadas de los nodos, forma (N_elementos, N_nodos).
+        valores_ (numpy.ndarray): Valores nodales en malla_.
+        malla_referencia_ (numpy.ndarray): Malla de la solucion de referencia.
+        valores_referencia_ (numpy.ndarray): Valores nodales en malla_referencia_.
+
+    Retorna:
+        float: Norma L2 de la diferencia sobre el dominio de malla_.
+    '''
+    cuadratura_de_gauss, pesos_de_gauss = np.polynomial.legendre.leggauss(n_nodos_cuadratura_gauss_)
+    semi_longitud = 0.5 * ( malla_[:, -1] - malla_[:, 0] )[:, None]
+    punto_medio = 0.5 * ( malla_[:, -1] + malla_[:, 0] )[:, None]
+    x_cuadratura = semi_longitud * cuadratura_de_gauss + punto_medio
 
-    return polinomios_de_lagrange_en_cuadratura_de_gauss_, derivada_x_polinomios_de_lagrange_en_cuadratura_de_gauss_
\ No newline at end of file
+    diferencia = evaluar_solucion(malla_, valores_, x_cuadratura) - evaluar_solucion(malla_referencia_, valores_referencia_, x_cuadratura)
+    return np.sqrt(np.sum(semi_longitud * pesos_de_gauss * diferencia**2))
@@ -0,0 +1,63 @@
+'''
+Compara el costo y la precision de los solucionadores de Riemann registrados en
+solucionadores_de_riemann.
+
+Para cada solucionador reporta:
+    1. fronteras por segundo al evaluar el flujo numerico sobre arrays de fronteras
+    2. error L2 de la altura en el problema de la perturbacion gaussiana de main.py,
+       comparado con una solucion de referencia de Roe en una malla refinada
+
+Uso:
+    python comparar_solucionadores.py
+'''
+import time
+import numpy as np
+
+import bases
+import paso_de_tiempo
+import simulacion
+import solucionadores_de_riemann
+
+def fronteras_por_segundo(solucionador_, N_fronteras_=100000, repeticiones_=20, semilla_=0):
+    '''
+    Mide cuantas fronteras por segundo procesa un flujo numerico sobre estados aleatorios.
+    '''
+    generador = np.random.default_rng(semilla_)
+    h_izquierda, h_derecha = 1.0 + 0.1 * generador.random((2, N_fronteras_))
+    u_izquierda, u_derecha = 0.1 * generador.standard_normal((2, N_fronteras_))
+
+    flujo = solucionadores_de_riemann.obtener_solucionador(solucionador_)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones_):
+        flujo(h_izquierda, u_izquierda, h_derecha, u_derecha)
+    return N_fronteras_ * repeticiones_ / ( time.perf_counter() - inicio )
+
+def simular_gaussiana(N_elementos_, N_nodos_, n_pasos_, t_total_, solucionador_):
+    '''
+    Evoluciona con Euler explicito la perturbacion gaussiana de main.py en [0, 10] m.
+    '''
+    malla = simulacion.generar_malla(0, 10, N_elementos_, N_nodos_)
+    h, u = simulacion.condiciones_iniciales_gaussianas(malla)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+
+    paso_t = t_total_ / n_pasos_
+    for _ in range(n_pasos_):
+        dh_dt, du_dt = paso_de_tiempo.compute_dhdt_du_dt(h, u, matriz_de_rigidez, matriz_de_masa_inversa, solucionador_)
+        h = h + dh_dt * paso_t
+        u = u + du_dt * paso_t
+
+    return malla, h, u
+
+def comparar(N_elementos_=6, N_nodos_=4, n_pasos_=100, t_total_=1.0, refinamiento_=8):
+    '''
+    Imprime una tabla con fronteras por segundo y error L2 de cada solucionador registrado.
+    '''
+    malla_referencia, h_referencia, _ = simular_gaussiana(refinamiento_ * N_elementos_, N_nodos_, refinamiento_ * n_pasos_, t_total_, 'roe')
+
+    print(f'{"solucionador":>14} {"fronteras/s":>14} {"error L2 de h":>14}')
+    for nombre in sorted(solucionadores_de_riemann.SOLUCIONADORES_DE_RIEMANN):
+        malla, h, _ = simular_gaussiana(N_elementos_, N_nodos_, n_pasos_, t_total_, nombre)
+        print(f'{nombre:>14} {fronteras_por_segundo(nombre):14.3e} {bases.error_l2(malla, h, malla_referencia, h_referencia):14.3e}')
+
+if __name__ == '__main__':
+    comparar()
@@ -0,0 +1,273 @@
+'''
+Corridas del problema de la perturbacion gaussiana descritas por un archivo de configuracion TOML,
+sin editar una copia de main.py para cada variante.
+
+Las secciones [malla], [condicion_inicial] e [integracion] dan los parametros de
+ensamble.CASO_POR_DEFECTO (los que faltan toman su valor por defecto) y [salida] dice que se
+escribe. precision elige 'float64' (por defecto) o 'float32' para toda la corrida. Ejemplo:
+
+    nombre = "gaussiana_fina"
+    precision = "float32"
+
+    [malla]
+    N_elementos = 200
+    N_nodos = 4
+
+    [condicion_inicial]
+    amplitud = 0.1
+    ancho = 0.5
+
+    [integracion]
+    t_total = 2.0
+    integrador = "ssp_rk3"
+
+    [salida]
+    directorio = "corridas/gaussiana_fina"
+    snapshots_cada_n_pasos = 10
+    animacion = "gaussiana_fina.gif"
+    diagnosticos_cada_n_pasos = 10
+    max_deriva_masa = 1e-4
+
+Con diagnosticos_cada_n_pasos > 0 se escribe la serie de diagnosticos.MonitorDeDiagnosticos en
+diagnosticos.csv y el ultimo diagnostico en el resumen; max_deriva_masa y max_crecimiento_energia
+abortan la corrida (con un RuntimeError) si se superan.
+
+integrador puede ser uno de paso_de_tiempo.INTEGRADORES o un metodo implicito de
+implicito.METODOS ('euler_implicito', 'sdirk2', 'bdf2'); solo estos importan scipy, y sus
+puntos de control guardan la historia del integrador para reanudar bit a bit.
+
+Solo se importa lo que la salida pide: una corrida sin snapshots ni animacion no importa
+matplotlib, imageio ni los modulos de escritura. --profile-startup reporta el tiempo de cada
+importacion y de cada etapa; python -X importtime da el detalle por modulo.
+
+Uso:
+    python -m cdg_fuente run config.toml
+    python -m cdg_fuente run config.toml --profile-startup
+'''
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+try:
+    import tomllib
+except ImportError:
+    # Python < 3.11
+    import tomli as tomllib
+
+import ensamble
+import estado
+import paso_de_tiempo
+import precision
+import simulacion
+
+# llaves de ensamble.CASO_POR_DEFECTO que se pueden dar en cada seccion
+SECCIONES = {
+    'malla': ('x_inicial', 'x_final', 'N_elementos', 'N_nodos', 'familia'),
+    'condicion_inicial': ('amplitud', 'ancho', 'centro'),
+    'integracion': ('t_total', 'integrador', 'paso_t', 'cfl', 'solucionador'),
+}
+
+SALIDA_POR_DEFECTO = {
+    'directorio': 'corrida',              # directorio de la corrida, se crea si no existe
+    'snapshots_cada_n_pasos': 0,          # fotos con salida.EscritorDeSnapshots, 0 para ninguna
+    'puntos_de_control_cada_n_pasos': 0,  # puntos de control para reanudar, 0 para ninguno
+    'animacion': None,                    # archivo .gif o .mp4 en el directorio, requiere snapshots
+    'duracion_por_cuadro': 0.3,           # (s) duracion de cada cuadro de la animacion
+    'diagnosticos_cada_n_pasos': 0,       # serie de diagnosticos en diagnosticos.csv, 0 para ninguna
+    'max_deriva_masa': None,              # aborta si |deriva de masa| es mayor, requiere diagnosticos
+    'max_crecimiento_energia': None,      # aborta si la energia crece mas que esto (relativo), requiere diagnosticos
+}
+
+NOMBRE_RESUMEN = 'resumen.json'
+NOMBRE_DIAGNOSTICOS = 'diagnosticos.csv'
+
+def caso_desde_configuracion(configuracion_):
+    '''
+    Convierte una configuracion (el diccionario leido del TOML) en un caso completo de ensamble,
+    un diccionario de salida completo y el nombre de la precision.
+
+    Retorna:
+        tuple: (caso, salida, precision).
+    '''
+    desconocidas = set(configuracion_) - set(SECCIONES) - {'salida', 'nombre', 'precision'}
+    if desconocidas:
+        raise ValueError(f'Secciones desconocidas en la configuracion: {sorted(desconocidas)}. Opciones: {sorted(SECCIONES) + ["salida"]}')
+
+    caso = {'nombre': configuracion_['nombre']} if 'nombre' in configuracion_ else {}
+    for seccion, llaves in SECCIONES.items():
+        parametros = configuracion_.get(seccion, {})
+        fuera_de_lugar = set(parametros) - set(llaves)
+        if fuera_de_lugar:
+            raise ValueError(f'Parametros desconocidos en [{seccion}]: {sorted(fuera_de_lugar)}. Opciones: {list(llaves)}')
+        caso.update(parametros)
+
+    salida = configuracion_.get('salida', {})
+    desconocidas = set(salida) - set(SALIDA_POR_DEFECTO)
+    if desconocidas:
+        raise ValueError(f'Parametros desconocidos en [salida]: {sorted(desconocidas)}. Opciones: {list(SALIDA_POR_DEFECTO)}')
+    salida = dict(SALIDA_POR_DEFECTO, **salida)
+    if salida['animacion'] and not salida['snapshots_cada_n_pasos']:
+        raise ValueError('La animacion se renderiza desde los snapshots: da snapshots_cada_n_pasos > 0')
+    if ( salida['max_deriva_masa'] is not None or salida['max_crecimiento_energia'] is not None ) and not salida['diagnosticos_cada_n_pasos']:
+        raise ValueError('Los umbrales de aborto se revisan en los diagnosticos: da diagnosticos_cada_n_pasos > 0')
+
+    nombre_precision = configuracion_.get('precision', 'float64')
+    if nombre_precision not in precision.PRECISIONES:
+        raise ValueError(f'Precision desconocida: {nombre_precision!r}. Opciones: {sorted(precision.PRECISIONES)}')
+
+    # el integrador se valida aqui para fallar antes de construir nada
+    caso = ensamble.completar_caso(caso)
+    if caso['integrador'] not in paso_de_tiempo.INTEGRADORES:
+        # scipy solo se importa para los integradores implicitos
+        import implicito
+        if caso['integrador'] not in implicito.METODOS:
+            raise ValueError(f"Integrador temporal desconocido: {caso['integrador']!r}. Opciones: {sorted(paso_de_tiempo.INTEGRADORES) + list(implicito.METODOS)}")
+    return caso, salida, nombre_precision
+
+def leer_configuracion(camino_):
+    '''
+    Lee un archivo TOML de configuracion.
+
+    Retorna:
+        tuple: (caso, salida, precision), como caso_desde_configuracion.
+    '''
+    with open(camino_, 'rb') as archivo:
+        return caso_desde_configuracion(tomllib.load(archivo))
+
+def _importar(nombre_, tiempos_):
+    # importa un modulo opcional y anota cuanto tardo si no estaba importado
+    if nombre_ not in sys.modules:
+        inicio = time.perf_counter()
+        importlib.import_module(nombre_)
+        tiempos_[f'importar {nombre_}'] = time.perf_counter() - inicio
+    return sys.modules[nombre_]
+
+def ejecutar(caso_, salida_, tiempos_=None, precision_='float64'):
+    '''
+    Ejecuta una corrida: construye la malla, los operadores y el estado inicial, integra con las
+    salidas pedidas y escribe un resumen JSON en el directorio de la corrida.
+
+    Parámetros:
+        caso_ (dict): Caso completo, como el de caso_desde_configuracion.
+        salida_ (dict): Salida completa, como la de caso_desde_configuracion.
+        tiempos_ (dict): Opcional, se le agrega el tiempo (s) de cada importacion y etapa.
+        precision_ (str): 'float64' o 'float32', precision de los operadores y el estado (la malla siempre es float64).
+
+    Retorna:
+        dict: Reporte de paso_de_tiempo.integrar.
+    '''
+    tiempos = {} if tiempos_ is None else tiempos_
+    directorio = salida_['directorio']
+    os.makedirs(directorio, exist_ok=True)
+
+    inicio = time.perf_counter()
+    with precision.usar(precision_):
+        malla, matriz_de_masa_inversa, matriz_de_rigidez = ensamble.operadores_en_cache(caso_['x_inicial'], caso_['x_final'], caso_['N_elementos'], caso_['N_nodos'], caso_['familia'])
+        estado_ = estado.EstadoConservativo.desde_primitivas(*simulacion.condiciones_iniciales_gaussianas(malla, caso_['amplitud'], caso_['ancho'], caso_['centro']))
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez, caso_['solucionador'])
+    integrador = caso_['integrador']
+    if integrador not in paso_de_tiempo.INTEGRADORES:
+        implicito = _importar('implicito', tiempos)
+        integrador = implicito.IntegradorImplicito(matriz_de_masa_inversa, matriz_de_rigidez, integrador, caso_['solucionador'])
+    registros = paso_de_tiempo.crear_registros(integrador, estado_.datos.shape, estado_.datos.dtype)
+    tiempos['construccion'] = time.perf_counter() - inicio
+
+    # escritores de la salida pedida, cada uno con su funcion al final de cada paso
+    escritores = []
+    if salida_['snapshots_cada_n_pasos']:
+        salida = _importar('salida', tiempos)
+        escritores.append(salida.EscritorDeSnapshots(os.path.join(directorio, 'snapshots'), malla, ('h', 'hu'), salida_['snapshots_cada_n_pasos']))
+        # la foto inicial, para que la animacion empiece en t = 0
+        escritores[-1].escribir(0, 0.0, estado_)
+    if salida_['puntos_de_control_cada_n_pasos']:
+        punto_de_control = _importar('punto_de_control', tiempos)
+        escritores.append(punto_de_control.EscritorDePuntosDeControl(os.path.join(directorio, 'puntos_de_control'), caso_, registros, salida_['puntos_de_control_cada_n_pasos'], integrador_=integrador))
+    monitor = None
+    if salida_['diagnosticos_cada_n_pasos']:
+        diagnosticos = _importar('diagnosticos', tiempos)
+        monitor = diagnosticos.MonitorDeDiagnosticos(malla, matriz_de_masa_inversa, os.path.join(directorio, NOMBRE_DIAGNOSTICOS), salida_['diagnosticos_cada_n_pasos'], familia_=caso_['familia'],
+                                                     max_deriva_masa_=salida_['max_deriva_masa'], max_crecimiento_energia_=salida_['max_crecimiento_energia'])
+        escritores.append(monitor)
+        # el diagnostico inicial es la referencia de las derivas
+        monitor.escribir(0, 0.0, estado_)
+
+    def al_final_del_paso(numero_de_paso, t, estado_):
+        for escritor in escritores:
+            escritor.al_final_del_paso(numero_de_paso, t, estado_)
+
+    inicio = time.perf_counter()
+    try:
+        reporte = paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, caso_['t_total'], malla, integrador, caso_['paso_t'], caso_['cfl'],
+                                          al_final_del_paso_=al_final_del_paso if escritores else None, registros_=registros)
+        # el ultimo estado siempre queda guardado
+        for escritor in escritores:
+            if reporte['pasos'] % escritor.cada_n_pasos != 0:
+                escritor.escribir(reporte['pasos'], reporte['t_final'], estado_)
+    finally:
+        for escritor in escritores:
+            escritor.cerrar()
+    tiempos['integracion'] = time.perf_counter() - inicio
+
+    if salida_['animacion']:
+        # imageio se importa aqui para medirlo aparte; graficos lo importaria al codificar
+        graficos = _importar('graficos', tiempos)
+        _importar('imageio.v2', tiempos)
+        inicio = time.perf_counter()
+        graficos.renderizar_corrida(os.path.join(directorio, 'snapshots'), os.path.join(directorio, salida_['animacion']), salida_['duracion_por_cuadro'])
+        tiempos['animacion'] = time.perf_counter() - inicio
+
+    resumen = {
+        'caso': caso_,
+        'salida': salida_,
+        'precision': precision_,
+        'pasos': reporte['pasos'],
+        'pasos_rechazados': reporte['pasos_rechazados'],
+        't_final': reporte['t_final'],
+        'diagnosticos': None if monitor is None else monitor.ultimo,
+        'tiempos': tiempos,
+    }
+    with open(os.path.join(directorio, NOMBRE_RESUMEN), 'w') as archivo:
+        json.dump(resumen, archivo, indent=1)
+    return reporte
+
+def imprimir_perfil(tiempos_):
+    '''
+    Imprime el tiempo de cada importacion y etapa y la fraccion del total que es importacion.
+    '''
+    total = sum(tiempos_.values())
+    importacion = sum(tiempo for nombre, tiempo in tiempos_.items() if nombre.startswith('importar'))
+    print(f'{"etapa":>28} {"tiempo (ms)":>12} {"% total":>8}')
+    for nombre, tiempo in tiempos_.items():
+        print(f'{nombre:>28} {tiempo * 1e3:12.1f} {100 * tiempo / total:8.1f}')
+    print(f'importacion = {importacion * 1e3:.1f} ms de {total * 1e3:.1f} ms ({100 * importacion / total:.1f} %)')
+
+def principal(argumentos_=None, tiempo_de_importacion_=None):
+    '''
+    Punto de entrada de linea de comandos. tiempo_de_importacion_ es el tiempo (s) que tardo en
+    importarse este modulo con sus dependencias, medido por __main__.py.
+    '''
+    argumentos = argparse.ArgumentParser(prog='python -m cdg_fuente', description='Corridas de cdg_fuente desde un archivo de configuracion')
+    comandos = argumentos.add_subparsers(dest='comando', required=True)
+    correr = comandos.add_parser('run', help='ejecuta la corrida de un archivo de configuracion TOML')
+    correr.add_argument('configuracion', help='archivo TOML')
+    correr.add_argument('--profile-startup', action='store_true', help='reporta el tiempo de importacion y de cada etapa')
+    argumentos = argumentos.parse_args(argumentos_)
+
+    tiempos = {}
+    if tiempo_de_importacion_ is not None:
+        tiempos['importar nucleo'] = tiempo_de_importacion_
+
+    inicio = time.perf_counter()
+    caso, salida, nombre_precision = leer_configuracion(argumentos.configuracion)
+    tiempos['configuracion'] = time.perf_counter() - inicio
+
+    reporte = ejecutar(caso, salida, tiempos, nombre_precision)
+    print(f"{caso['nombre']}: pasos = {reporte['pasos']}, t = {reporte['t_final']}")
+    if argumentos.profile_startup:
+        imprimir_perfil(tiempos)
+
+if __name__ == '__main__':
+    principal()
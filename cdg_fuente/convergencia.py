@@ -0,0 +1,255 @@
+'''
+Estudio de convergencia h/p y de costo contra precision: barre N_elementos, N_nodos y el numero
+CFL, mide el error de cada corrida, los ordenes de convergencia observados, el tiempo de pared y
+los grados de libertad, y reporta el frente de Pareto de error contra costo para elegir la
+configuracion mas barata que cumple un error objetivo.
+
+Problemas:
+    gaussiana      la perturbacion gaussiana de main.py; el error se mide contra una solucion
+                   de referencia en una malla con cuatro veces mas elementos y el mayor N_nodos
+    manufacturada  estado estacionario manufacturado h_e(x), hu_e(x) con hu_e = 0 en las
+                   paredes, sostenido por el termino fuente S = dF(U_e)/dx; la solucion exacta
+                   es conocida y el error es solo el de la discretizacion espacial
+
+Los errores L2 y L-infinito de h (y el L2 de hu) se integran con la cuadratura de Gauss-Legendre
+de bases.cuadratura_de_gauss_legendre en cada elemento; el L-infinito es el maximo en los puntos
+de cuadratura. El orden observado entre dos mallas con el mismo N_nodos es
+log(e_gruesa / e_fina) / log(E_fina / E_gruesa), que debe acercarse a N_nodos para soluciones
+suaves; entre dos N_nodos con la misma malla se reporta el factor de reduccion del error. En la
+gaussiana con N_nodos alto el error puede quedar dominado por el error temporal (de orden 3 con
+ssp_rk3) y el orden observado baja a 3; barrer --cfl separa ambos errores.
+
+Uso:
+    python convergencia.py
+    python convergencia.py --problema manufacturada --elementos 10 20 40 80 --nodos 2 3 4 5
+    python convergencia.py --objetivo 1e-5 --salida estudio.json
+'''
+import argparse
+import json
+import time
+
+import numpy as np
+
+import bases
+import estado
+import paso_de_tiempo
+import simulacion
+import solucionadores_de_riemann
+
+PROBLEMAS = ('gaussiana', 'manufacturada')
+
+N_ELEMENTOS = (10, 20, 40, 80, 160)
+N_NODOS = (2, 3, 4, 5)
+
+# el limite CFL de paso_de_tiempo_estable no es estable con cfl = 0.9 para N_nodos >= 6
+# equiespaciados, de modo que el estudio usa un numero CFL menor por defecto
+CFLS = (0.5,)
+
+X_INICIAL, X_FINAL = 0.0, 10.0
+
+def solucion_manufacturada(x_):
+    '''
+    Estado estacionario manufacturado en [X_INICIAL, X_FINAL] y su termino fuente:
+
+        h_e = 1 + 0.1 sin(2 pi x / L),  hu_e = 0.1 sin(pi x / L),  S = dF(U_e)/dx
+
+    con F = (hu, hu^2 / h + g h^2 / 2). hu_e es cero en las paredes reflejantes.
+
+    Retorna:
+        tuple: (h, hu, fuente_1, fuente_2), con la forma de x_.
+    '''
+    gravedad = solucionadores_de_riemann.GRAVEDAD
+    k_h, k_hu = 2.0 * np.pi / ( X_FINAL - X_INICIAL ), np.pi / ( X_FINAL - X_INICIAL )
+    x = x_ - X_INICIAL
+
+    h = 1.0 + 0.1 * np.sin(k_h * x)
+    dh_dx = 0.1 * k_h * np.cos(k_h * x)
+    hu = 0.1 * np.sin(k_hu * x)
+    dhu_dx = 0.1 * k_hu * np.cos(k_hu * x)
+
+    fuente_1 = dhu_dx
+    fuente_2 = 2.0 * hu * dhu_dx / h - hu**2 * dh_dx / h**2 + gravedad * h * dh_dx
+    return h, hu, fuente_1, fuente_2
+
+def errores(malla_, valores_, exacta_, n_nodos_cuadratura_gauss_=20):
+    '''
+    Errores L2 y L-infinito de una solucion de Galerkin discontinuo contra la funcion exacta_(x),
+    con la cuadratura de Gauss-Legendre de n_nodos_cuadratura_gauss_ puntos en cada elemento.
+
+    Retorna:
+        tuple: (error_l2, error_linf).
+    '''
+    cuadratura_de_gauss, pesos_de_gauss = bases.cuadratura_de_gauss_legendre(n_nodos_cuadratura_gauss_)
+    malla = np.asarray(malla_, dtype=float)
+    semi_longitud = 0.5 * ( malla[:, -1] - malla[:, 0] )[:, None]
+    punto_medio = 0.5 * ( malla[:, -1] + malla[:, 0] )[:, None]
+    x_cuadratura = semi_longitud * cuadratura_de_gauss + punto_medio
+
+    diferencia = bases.evaluar_solucion(malla, np.asarray(valores_, dtype=float), x_cuadratura) - exacta_(x_cuadratura)
+    return float(np.sqrt(np.sum(semi_longitud * pesos_de_gauss * diferencia**2))), float(np.max(np.abs(diferencia)))
+
+def _simular(problema_, N_elementos_, N_nodos_, t_total_, cfl_, familia_, integrador_, repeticiones_=1):
+    # integra un problema desde su condicion inicial; retorna la malla, el estado final, el
+    # reporte y el menor tiempo de pared de integrar entre las repeticiones
+    malla = simulacion.generar_malla(X_INICIAL, X_FINAL, N_elementos_, N_nodos_, familia_)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla, familia_=familia_)
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+
+    if problema_ == 'gaussiana':
+        inicial = estado.EstadoConservativo.desde_primitivas(*simulacion.condiciones_iniciales_gaussianas(malla))
+        lado_derecho = operador.evaluate_conservative
+    else:
+        h, hu, fuente_1, fuente_2 = solucion_manufacturada(malla)
+        inicial = estado.EstadoConservativo(np.stack((h, hu)))
+        fuente = np.stack((fuente_1, fuente_2))
+
+        def lado_derecho(U, out):
+            operador.evaluate_conservative(U, out)
+            out += fuente
+            return out
+
+    tiempos = []
+    for _ in range(repeticiones_):
+        estado_ = inicial.copia()
+        inicio = time.perf_counter()
+        reporte = paso_de_tiempo.integrar(estado_, lado_derecho, t_total_, malla, integrador_, cfl_=cfl_)
+        tiempos.append(time.perf_counter() - inicio)
+    return malla, estado_, reporte, min(tiempos)
+
+def ejecutar_estudio(problema_='gaussiana', N_elementos_=N_ELEMENTOS, N_nodos_=N_NODOS, cfls_=CFLS, t_total_=1.0, familia_='equiespaciados', integrador_='ssp_rk3', repeticiones_=1):
+    '''
+    Ejecuta una corrida por cada combinacion de N_elementos_, N_nodos_ y cfls_ y mide su error.
+
+    Parámetros:
+        problema_ (str): 'gaussiana' o 'manufacturada'.
+        t_total_ (float): Tiempo final (s) de cada corrida.
+        repeticiones_ (int): Corridas de cada combinacion; el tiempo reportado es el menor.
+
+    Retorna:
+        list: Un diccionario por corrida con N_elementos, N_nodos, cfl, grados_de_libertad,
+        pasos, tiempo (s), error_l2 y error_linf de h, error_l2_hu y los ordenes observados
+        (ver ordenes_observados).
+    '''
+    if problema_ not in PROBLEMAS:
+        raise ValueError(f'Problema desconocido: {problema_!r}. Opciones: {list(PROBLEMAS)}')
+
+    if problema_ == 'gaussiana':
+        malla_referencia, referencia, _, _ = _simular('gaussiana', 4 * max(N_elementos_), max(N_nodos_), t_total_, min(cfls_), familia_, integrador_)
+        exacta_h = lambda x: bases.evaluar_solucion(malla_referencia, referencia.h, x)
+        exacta_hu = lambda x: bases.evaluar_solucion(malla_referencia, referencia.hu, x)
+    else:
+        exacta_h = lambda x: solucion_manufacturada(x)[0]
+        exacta_hu = lambda x: solucion_manufacturada(x)[1]
+
+    resultados = []
+    for cfl in cfls_:
+        for N_nodos in N_nodos_:
+            for N_elementos in N_elementos_:
+                malla, estado_, reporte, tiempo = _simular(problema_, N_elementos, N_nodos, t_total_, cfl, familia_, integrador_, repeticiones_)
+                error_l2, error_linf = errores(malla, estado_.h, exacta_h)
+                resultados.append({
+                    'problema': problema_,
+                    'N_elementos': N_elementos,
+                    'N_nodos': N_nodos,
+                    'cfl': cfl,
+                    'grados_de_libertad': N_elementos * N_nodos,
+                    'pasos': reporte['pasos'],
+                    'tiempo': tiempo,
+                    'error_l2': error_l2,
+                    'error_linf': error_linf,
+                    'error_l2_hu': errores(malla, estado_.hu, exacta_hu)[0],
+                })
+    return ordenes_observados(resultados)
+
+def ordenes_observados(resultados_):
+    '''
+    Agrega a cada corrida el orden observado de su error L2 de h respecto de la corrida con la
+    malla anterior (mas gruesa) y el mismo N_nodos y cfl, 'orden_h', y el factor de reduccion del
+    error respecto de la corrida con el N_nodos anterior y la misma malla y cfl, 'factor_p'.
+    Ambos son None si no hay corrida anterior.
+
+    Retorna:
+        list: resultados_, modificados en el lugar.
+    '''
+    por_llave = {(r['N_elementos'], r['N_nodos'], r['cfl']): r for r in resultados_}
+    elementos = sorted({r['N_elementos'] for r in resultados_})
+    nodos = sorted({r['N_nodos'] for r in resultados_})
+
+    for r in resultados_:
+        posicion = elementos.index(r['N_elementos'])
+        gruesa = por_llave.get((elementos[posicion - 1], r['N_nodos'], r['cfl'])) if posicion > 0 else None
+        r['orden_h'] = float(np.log(gruesa['error_l2'] / r['error_l2']) / np.log(r['N_elementos'] / gruesa['N_elementos'])) if gruesa else None
+
+        posicion = nodos.index(r['N_nodos'])
+        menor = por_llave.get((r['N_elementos'], nodos[posicion - 1], r['cfl'])) if posicion > 0 else None
+        r['factor_p'] = menor['error_l2'] / r['error_l2'] if menor else None
+    return resultados_
+
+def frente_de_pareto(resultados_, costo_='tiempo', error_='error_l2'):
+    '''
+    Corridas que no son dominadas: ninguna otra es a la vez mas barata (o igual) y mas precisa.
+
+    Parámetros:
+        costo_ (str): Medida de costo, 'tiempo' o 'grados_de_libertad'.
+        error_ (str): Medida de error, por ejemplo 'error_l2' o 'error_linf'.
+
+    Retorna:
+        list: Corridas del frente, de la mas barata a la mas cara.
+    '''
+    frente = []
+    for r in sorted(resultados_, key=lambda r: (r[costo_], r[error_])):
+        if not frente or r[error_] < frente[-1][error_]:
+            frente.append(r)
+    return frente
+
+def mas_barata(resultados_, error_objetivo_, costo_='tiempo', error_='error_l2'):
+    '''
+    Corrida mas barata con error menor o igual que error_objetivo_, o None si ninguna lo cumple.
+    '''
+    candidatas = [r for r in resultados_ if r[error_] <= error_objetivo_]
+    return min(candidatas, key=lambda r: r[costo_]) if candidatas else None
+
+def imprimir_estudio(resultados_, error_objetivo_=None, costo_='tiempo'):
+    '''
+    Imprime la tabla de convergencia, con * en las corridas del frente de Pareto, y la corrida
+    mas barata que cumple error_objetivo_ si es dado.
+    '''
+    frente = {id(r) for r in frente_de_pareto(resultados_, costo_)}
+    formato = lambda valor, ancho, especificacion: f'{"-":>{ancho}}' if valor is None else f'{valor:{ancho}{especificacion}}'
+
+    print(f'{"E":>6} {"N":>3} {"cfl":>5} {"gdl":>7} {"pasos":>6} {"tiempo (s)":>11} {"L2 h":>10} {"Linf h":>10} {"L2 hu":>10} {"orden h":>8} {"factor p":>9} {"pareto":>6}')
+    for r in resultados_:
+        print(f"{r['N_elementos']:>6} {r['N_nodos']:>3} {r['cfl']:5.2f} {r['grados_de_libertad']:>7} {r['pasos']:>6} {r['tiempo']:11.4f} "
+              f"{r['error_l2']:10.3e} {r['error_linf']:10.3e} {r['error_l2_hu']:10.3e} {formato(r['orden_h'], 8, '.2f')} {formato(r['factor_p'], 9, '.1f')} {'*' if id(r) in frente else '':>6}")
+
+    print(f'\nfrente de Pareto (error L2 de h contra {costo_}):')
+    for r in frente_de_pareto(resultados_, costo_):
+        print(f"  E = {r['N_elementos']:>5} N = {r['N_nodos']} cfl = {r['cfl']:.2f}: {costo_} = {r[costo_]:.4g}, error L2 = {r['error_l2']:.3e}")
+
+    if error_objetivo_ is not None:
+        r = mas_barata(resultados_, error_objetivo_, costo_)
+        if r is None:
+            print(f'\nninguna corrida alcanza el error objetivo {error_objetivo_:.1e}')
+        else:
+            print(f"\nmas barata con error L2 <= {error_objetivo_:.1e}: E = {r['N_elementos']} N = {r['N_nodos']} cfl = {r['cfl']:.2f} ({costo_} = {r[costo_]:.4g}, error L2 = {r['error_l2']:.3e})")
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Estudio de convergencia h/p y de costo contra precision de cdg_fuente')
+    argumentos.add_argument('--problema', default='gaussiana', choices=PROBLEMAS)
+    argumentos.add_argument('--elementos', type=int, nargs='+', default=N_ELEMENTOS)
+    argumentos.add_argument('--nodos', type=int, nargs='+', default=N_NODOS)
+    argumentos.add_argument('--cfl', type=float, nargs='+', default=CFLS)
+    argumentos.add_argument('--t-total', type=float, default=1.0)
+    argumentos.add_argument('--familia', default='equiespaciados', choices=('equiespaciados', 'gauss_lobatto'))
+    argumentos.add_argument('--integrador', default='ssp_rk3')
+    argumentos.add_argument('--repeticiones', type=int, default=1, help='corridas de cada combinacion; se reporta el menor tiempo')
+    argumentos.add_argument('--costo', default='tiempo', choices=('tiempo', 'grados_de_libertad'))
+    argumentos.add_argument('--objetivo', type=float, help='error L2 de h objetivo')
+    argumentos.add_argument('--salida', help='archivo JSON de resultados, opcional')
+    argumentos = argumentos.parse_args()
+
+    resultados = ejecutar_estudio(argumentos.problema, argumentos.elementos, argumentos.nodos, argumentos.cfl, argumentos.t_total, argumentos.familia, argumentos.integrador, argumentos.repeticiones)
+    imprimir_estudio(resultados, argumentos.objetivo, argumentos.costo)
+    if argumentos.salida:
+        with open(argumentos.salida, 'w') as archivo:
+            json.dump(resultados, archivo, indent=1)
@@ -0,0 +1,273 @@
+'''
+Diagnosticos de la corrida calculados dentro del bucle de integracion cada cierto numero de pasos,
+para vigilar una corrida sin guardar fotos completas del estado ni mirar los PNG de
+graficos.plot_simulation:
+
+    masa, momento     integrales de h y hu, exactas con la matriz de masa del esquema
+    energia           integral de 0.5 hu^2 / h + 0.5 g h^2 con la cuadratura del esquema
+    velocidad_maxima  max |u| + sqrt(g h) sobre los nodos
+    h_minima          altura minima sobre los nodos
+    deriva_masa       (masa - masa_0) / masa_0, con masa_0 la del primer diagnostico
+    deriva_energia    (energia - energia_0) / energia_0, negativa por la disipacion del flujo numerico
+
+Las integrales de h y hu son una sola reduccion sobre el bloque conservativo (un producto con los
+pesos de integracion de cada nodo, sin copiar el estado); un valor no finito en el estado aparece
+en ellas, de modo que no hace falta otra pasada para detectarlo.
+
+Cada diagnostico es una fila de la serie de tiempo, guardada en un buffer de capacidad_ filas que
+se vacia al llenarse y al cerrar: en un archivo CSV si se da camino_, si no en memoria. Si un
+diagnostico no es finito o supera un umbral dado (deriva de masa, crecimiento de la energia,
+altura minima, velocidad maxima) la serie se vacia y se lanza un RuntimeError, que detiene
+paso_de_tiempo.integrar antes de que la corrida llegue a valores no finitos.
+
+Ejemplo:
+    with diagnosticos.MonitorDeDiagnosticos(malla, matriz_de_masa_inversa, 'diagnosticos.csv', cada_n_pasos_=10, max_deriva_masa_=1e-10) as monitor:
+        monitor.escribir(0, 0.0, estado_)
+        paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, t_total, malla,
+                                al_final_del_paso_=monitor.al_final_del_paso)
+    serie = diagnosticos.leer_diagnosticos('diagnosticos.csv')
+
+Uso:
+    python diagnosticos.py
+'''
+import os
+import time
+
+import numpy as np
+
+import bases
+import estado
+import galerkin_discontinuo
+import instrumentacion
+import paso_de_tiempo
+import precision
+import simulacion
+
+COLUMNAS = ('paso', 't', 'masa', 'momento', 'energia', 'velocidad_maxima', 'h_minima', 'deriva_masa', 'deriva_energia')
+
+def leer_diagnosticos(camino_):
+    '''
+    Lee la serie de tiempo escrita por MonitorDeDiagnosticos.
+
+    Retorna:
+        dict: Un array por columna de COLUMNAS.
+    '''
+    filas = np.loadtxt(camino_, delimiter=',', skiprows=1, ndmin=2)
+    return {columna: filas[:, i] for i, columna in enumerate(COLUMNAS)}
+
+class MonitorDeDiagnosticos:
+    '''
+    Calcula diagnosticos del estado cada cierto numero de pasos y los guarda en una serie de tiempo.
+
+    Parámetros:
+        malla_ (numpy.ndarray): Coordenadas de los nodos, forma (N_elementos, N_nodos).
+        matriz_de_masa_inversa_ (numpy.ndarray): Inversa de la matriz de masa del primer elemento
+            (o su diagonal), como la de simulacion.construir_operadores.
+        camino_ (str): Opcional, archivo CSV de la serie. Si es None la serie queda en memoria.
+        cada_n_pasos_ (int): Se calcula un diagnostico cada cada_n_pasos_ pasos.
+        capacidad_ (int): Filas del buffer; la serie se vacia cada capacidad_ diagnosticos.
+        familia_ (str): Familia de nodos de la malla, que elige la cuadratura de la energia como
+            en simulacion.construir_operadores.
+        max_deriva_masa_ (float): Opcional, |deriva_masa| maxima antes de abortar.
+        max_crecimiento_energia_ (float): Opcional, deriva_energia maxima antes de abortar.
+        min_h_ (float): Opcional, altura minima por debajo de la cual se aborta.
+        max_velocidad_ (float): Opcional, velocidad de onda maxima por encima de la cual se aborta.
+
+    Con un lote de casos, forma (2, B, N_elementos, N_nodos), las integrales suman todos los casos.
+    '''
+
+    def __init__(self, malla_, matriz_de_masa_inversa_, camino_=None, cada_n_pasos_=1, capacidad_=256, familia_='equiespaciados',
+                 max_deriva_masa_=None, max_crecimiento_energia_=None, min_h_=None, max_velocidad_=None):
+
+        # la malla siempre es float64; los pesos siguen el tipo de los operadores
+        tipo = precision.tipo_de(matriz_de_masa_inversa_)
+        N_nodos = malla_.shape[1]
+        longitud_elemento = malla_[:, -1] - malla_[:, 0]
+
+        # pesos de integracion de cada nodo de cada elemento, escalados por la longitud del
+        # elemento respecto del primero, con el que se construyo la matriz de masa
+        escala = ( longitud_elemento / longitud_elemento[0] )[:, None]
+        self.pesos = np.ascontiguousarray(escala * galerkin_discontinuo.calcula_pesos_de_integracion(matriz_de_masa_inversa_), dtype=tipo)
+
+        # cuadratura de la energia: la misma que la de los operadores; en el modo de colocacion de
+        # Gauss-Lobatto los puntos son los nodos y no hace falta interpolar
+        if familia_ == 'gauss_lobatto':
+            self.evaluacion = None
+            _, pesos_de_cuadratura = bases.cuadratura_de_gauss_lobatto(N_nodos)
+        else:
+            _, _, pesos_de_cuadratura, phi, _ = bases.operadores_de_referencia(N_nodos, bases.n_nodos_cuadratura_minima(N_nodos), familia_)
+            self.evaluacion = phi.astype(tipo)
+        self.pesos_de_cuadratura = np.ascontiguousarray(0.5 * longitud_elemento[:, None] * pesos_de_cuadratura, dtype=tipo)
+
+        self.camino = camino_
+        self.cada_n_pasos = cada_n_pasos_
+        self.max_deriva_masa = max_deriva_masa_
+        self.max_crecimiento_energia = max_crecimiento_energia_
+        self.min_h = min_h_
+        self.max_velocidad = max_velocidad_
+
+        self.referencia = None
+        self.ultimo = None
+        self.n_diagnosticos = 0
+        self._buffer = np.empty((capacidad_, len(COLUMNAS)))
+        self._filas = 0
+        self._bloques = []
+        if camino_ is not None:
+            directorio = os.path.dirname(camino_)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            with open(camino_, 'w') as archivo:
+                archivo.write(','.join(COLUMNAS) + '\n')
+
+    def calcular(self, U_):
+        '''
+        Integrales y reducciones del bloque conservativo U_, sin las derivas.
+
+        Retorna:
+            tuple: (masa, momento, energia, velocidad_maxima, h_minima).
+        '''
+        # integrales de h y hu en una sola reduccion sobre los dos ultimos ejes
+        masa, momento = np.tensordot(U_, self.pesos, axes=([-2, -1], [0, 1])).reshape(2, -1).sum(axis=1)
+
+        # energia en los puntos de cuadratura, con u = 0 donde h <= 0
+        h, hu = U_[0], U_[1]
+        if self.evaluacion is not None:
+            h, hu = h @ self.evaluacion, hu @ self.evaluacion
+        densidad = np.divide(hu * hu, h, out=np.zeros(h.shape, dtype=h.dtype), where=(h > 0))
+        densidad += galerkin_discontinuo.GRAVEDAD * h * h
+        energia = 0.5 * np.sum(np.tensordot(densidad, self.pesos_de_cuadratura, axes=([-2, -1], [0, 1])))
+
+        return float(masa), float(momento), float(energia), float(paso_de_tiempo.velocidad_maxima_de_onda(U_)), float(np.min(U_[0]))
+
+    def escribir(self, numero_de_paso_, t_, estado_):
+        '''
+        Calcula el diagnostico de estado_ (un EstadoConservativo), lo agrega a la serie y aborta
+        si no es finito o supera algun umbral.
+        '''
+        with instrumentacion.etapa('diagnosticos'):
+            masa, momento, energia, velocidad_maxima, h_minima = self.calcular(estado_.datos)
+            if self.referencia is None:
+                self.referencia = (masa, energia)
+            masa_0, energia_0 = self.referencia
+            fila = (numero_de_paso_, t_, masa, momento, energia, velocidad_maxima, h_minima, (masa - masa_0) / masa_0, (energia - energia_0) / energia_0)
+
+            self._buffer[self._filas] = fila
+            self._filas += 1
+            self.n_diagnosticos += 1
+            self.ultimo = dict(zip(COLUMNAS, fila))
+            if self._filas == len(self._buffer):
+                self.vaciar()
+
+        motivo = self._motivo_de_aborto()
+        if motivo is not None:
+            self.vaciar()
+            raise RuntimeError(f'Corrida abortada en el paso {numero_de_paso_}, t = {t_}: {motivo}')
+
+    def _motivo_de_aborto(self):
+        # primer criterio que el ultimo diagnostico no cumple, o None
+        ultimo = self.ultimo
+        if not all(np.isfinite(valor) for valor in ultimo.values()):
+            return 'diagnosticos no finitos'
+        if self.max_deriva_masa is not None and abs(ultimo['deriva_masa']) > self.max_deriva_masa:
+            return f"deriva de masa {ultimo['deriva_masa']:.3e} mayor que {self.max_deriva_masa:.3e}"
+        if self.max_crecimiento_energia is not None and ultimo['deriva_energia'] > self.max_crecimiento_energia:
+            return f"la energia crecio {ultimo['deriva_energia']:.3e}, mas que {self.max_crecimiento_energia:.3e}"
+        if self.min_h is not None and ultimo['h_minima'] < self.min_h:
+            return f"altura minima {ultimo['h_minima']:.3e} menor que {self.min_h:.3e}"
+        if self.max_velocidad is not None and ultimo['velocidad_maxima'] > self.max_velocidad:
+            return f"velocidad de onda {ultimo['velocidad_maxima']:.3e} mayor que {self.max_velocidad:.3e}"
+        return None
+
+    def al_final_del_paso(self, numero_de_paso_, t_, estado_):
+        '''
+        Funcion para el argumento al_final_del_paso_ de paso_de_tiempo.integrar.
+        '''
+        if numero_de_paso_ % self.cada_n_pasos == 0:
+            self.escribir(numero_de_paso_, t_, estado_)
+
+    def vaciar(self):
+        '''
+        Agrega las filas del buffer al archivo CSV, o a la serie en memoria, y vacia el buffer.
+        '''
+        if self._filas == 0:
+            return
+        filas = self._buffer[:self._filas]
+        if self.camino is None:
+            self._bloques.append(filas.copy())
+        else:
+            with open(self.camino, 'a') as archivo:
+                np.savetxt(archivo, filas, fmt='%.17g', delimiter=',')
+        self._filas = 0
+
+    def serie(self):
+        '''
+        Serie de tiempo completa: la ya vaciada (del archivo o de memoria) mas el buffer.
+
+        Retorna:
+            dict: Un array por columna de COLUMNAS.
+        '''
+        self.vaciar()
+        if self.camino is not None:
+            return leer_diagnosticos(self.camino)
+        filas = np.concatenate(self._bloques) if self._bloques else np.empty((0, len(COLUMNAS)))
+        return {columna: filas[:, i] for i, columna in enumerate(COLUMNAS)}
+
+    def cerrar(self):
+        '''
+        Vacia las filas que quedan en el buffer.
+        '''
+        self.vaciar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+def demostrar(N_elementos_=200, N_nodos_=4, t_total_=2.0, cada_n_pasos_=100):
+    '''
+    Corre la perturbacion gaussiana con diagnosticos e imprime la serie, el costo de un
+    diagnostico respecto de un paso, y una corrida inestable (nodos equiespaciados de orden alto
+    con cfl 0.9) abortada por el crecimiento de la energia antes de llegar a valores no finitos.
+    '''
+    malla = simulacion.generar_malla(0.0, 10.0, N_elementos_, N_nodos_)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+    estado_ = estado.EstadoConservativo.desde_primitivas(*simulacion.condiciones_iniciales_gaussianas(malla))
+
+    monitor = MonitorDeDiagnosticos(malla, matriz_de_masa_inversa, cada_n_pasos_=cada_n_pasos_, max_deriva_masa_=1e-10, max_crecimiento_energia_=1e-6)
+    monitor.escribir(0, 0.0, estado_)
+    inicio = time.perf_counter()
+    reporte = paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, t_total_, malla, cfl_=0.5, al_final_del_paso_=monitor.al_final_del_paso)
+    segundos_por_paso = ( time.perf_counter() - inicio ) / reporte['pasos']
+
+    print(f'{"paso":>6} {"t":>8} {"masa":>18} {"momento":>10} {"energia":>18} {"vel. max":>9} {"h min":>9} {"deriva masa":>12} {"deriva energia":>15}')
+    serie = monitor.serie()
+    for i in range(len(serie['paso'])):
+        print(f"{serie['paso'][i]:6.0f} {serie['t'][i]:8.4f} {serie['masa'][i]:18.14f} {serie['momento'][i]:10.2e} {serie['energia'][i]:18.14f} "
+              f"{serie['velocidad_maxima'][i]:9.5f} {serie['h_minima'][i]:9.6f} {serie['deriva_masa'][i]:12.2e} {serie['deriva_energia'][i]:15.2e}")
+
+    repeticiones = 100
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        monitor.calcular(estado_.datos)
+    segundos_por_diagnostico = ( time.perf_counter() - inicio ) / repeticiones
+    print(f'paso: {segundos_por_paso * 1e3:.3f} ms, diagnostico: {segundos_por_diagnostico * 1e3:.3f} ms '
+          f'({100 * segundos_por_diagnostico / segundos_por_paso:.1f} % de un paso, {100 * segundos_por_diagnostico / segundos_por_paso / cada_n_pasos_:.2f} % cada {cada_n_pasos_} pasos)')
+
+    # corrida inestable: el monitor la detiene por el crecimiento de la energia
+    malla = simulacion.generar_malla(0.0, 10.0, N_elementos_, 8)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+    estado_ = estado.EstadoConservativo.desde_primitivas(*simulacion.condiciones_iniciales_gaussianas(malla))
+    monitor = MonitorDeDiagnosticos(malla, matriz_de_masa_inversa, cada_n_pasos_=1, max_crecimiento_energia_=1e-6)
+    monitor.escribir(0, 0.0, estado_)
+    try:
+        with np.errstate(over='ignore', invalid='ignore'):
+            paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, t_total_, malla, cfl_=0.9, al_final_del_paso_=monitor.al_final_del_paso)
+        print('La corrida inestable termino sin abortar')
+    except RuntimeError as error:
+        print(f'{error} (estado finito: {bool(np.all(np.isfinite(estado_.datos)))})')
+
+if __name__ == '__main__':
+    demostrar()
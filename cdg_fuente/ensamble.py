@@ -0,0 +1,302 @@
+'''
+Ejecucion en paralelo de ensambles de simulaciones: barridos de parametros sobre las
+condiciones iniciales y la resolucion del problema de la perturbacion gaussiana de main.py.
+
+Cada caso es un diccionario con cualquiera de las llaves de CASO_POR_DEFECTO. Los casos se
+reparten en un concurrent.futures.ProcessPoolExecutor con un numero acotado de casos en vuelo y
+los resultados se entregan a medida que terminan. Los casos que comparten discretizacion y
+parametros de integracion pueden avanzarse juntos como un solo array apilado (ejecutar_lote). Con un directorio de resultados cada caso
+terminado se guarda en un archivo .npz y se anota en un manifiesto, de modo que un barrido
+interrumpido salta los casos ya terminados al reanudarse.
+
+Uso:
+    python ensamble.py casos.json directorio_de_resultados
+'''
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import bases
+import estado
+import paso_de_tiempo
+import precision
+import simulacion
+
+CASO_POR_DEFECTO = {
+    'x_inicial': 0.0,         # (m) coordenada inicial del dominio
+    'x_final': 10.0,          # (m) coordenada final del dominio
+    'N_elementos': 6,         # numero de elementos
+    'N_nodos': 4,             # numero de nodos por elemento
+    'familia': 'equiespaciados', # familia de nodos: 'equiespaciados' o 'gauss_lobatto'
+    'amplitud': 0.1,          # (m) amplitud de la perturbacion gaussiana
+    'ancho': 1.0,             # (m) ancho de la perturbacion gaussiana
+    'centro': 5.0,            # (m) centro de la perturbacion gaussiana
+    't_total': 1.0,           # (s) tiempo final
+    'integrador': 'ssp_rk3',  # integrador registrado en paso_de_tiempo.INTEGRADORES
+    'paso_t': None,           # (s) paso de tiempo fijo, None para el paso adaptativo
+    'cfl': None,              # numero CFL, None para el del integrador
+    'solucionador': 'roe',    # solucionador registrado en solucionadores_de_riemann
+}
+
+# parametros que deben ser iguales para que dos casos puedan avanzarse en el mismo lote
+LLAVES_DE_LOTE = ('x_inicial', 'x_final', 'N_elementos', 'N_nodos', 'familia', 't_total', 'integrador', 'paso_t', 'cfl', 'solucionador')
+
+NOMBRE_MANIFIESTO = 'manifiesto.jsonl'
+
+def completar_caso(caso_):
+    '''
+    Completa un caso con los valores por defecto y le asigna un nombre si no tiene uno.
+    El nombre por defecto depende solo de los parametros, asi que es estable entre ejecuciones.
+    '''
+    desconocidas = set(caso_) - set(CASO_POR_DEFECTO) - {'nombre'}
+    if desconocidas:
+        raise ValueError(f'Parametros desconocidos en el caso: {sorted(desconocidas)}')
+
+    caso = dict(CASO_POR_DEFECTO, **caso_)
+    if 'nombre' not in caso:
+        parametros = json.dumps({k: caso[k] for k in sorted(CASO_POR_DEFECTO)}, sort_keys=True)
+        caso['nombre'] = 'caso_' + hashlib.sha1(parametros.encode()).hexdigest()[:12]
+    return caso
+
+def operadores_en_cache(x_inicial_, x_final_, N_elementos_, N_nodos_, familia_):
+    '''
+    Malla y operadores de un caso, compartidos por todos los casos con la misma
+    discretizacion y la misma precision que corren en el mismo proceso.
+    '''
+    return _operadores_en_cache(x_inicial_, x_final_, N_elementos_, N_nodos_, familia_, np.dtype(precision.tipo_de_dato()).name)
+
+@functools.lru_cache(maxsize=32)
+def _operadores_en_cache(x_inicial_, x_final_, N_elementos_, N_nodos_, familia_, precision_):
+    # la precision es parte de la llave del cache aunque generar_malla la lee del modulo precision
+    malla = simulacion.generar_malla(x_inicial_, x_final_, N_elementos_, N_nodos_, familia_)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla, familia_=familia_)
+    for array in (malla, matriz_de_masa_inversa, matriz_de_rigidez):
+        array.setflags(write=False)
+    return malla, matriz_de_masa_inversa, matriz_de_rigidez
+
+def precalcular_operadores(discretizaciones_):
+    '''
+    Inicializador de los procesos: construye los operadores de referencia de cada
+    (N_nodos, familia) una sola vez por proceso, antes del primer caso.
+    '''
+    for N_nodos, familia in discretizaciones_:
+        bases.nodos_de_referencia(N_nodos, familia)
+        if familia == 'gauss_lobatto':
+            bases.cuadratura_de_gauss_lobatto(N_nodos)
+        else:
+            bases.operadores_de_referencia(N_nodos, bases.n_nodos_cuadratura_minima(N_nodos), familia)
+
+def ejecutar_caso(caso_):
+    '''
+    Ejecuta un caso completo y retorna un diccionario con el caso, el estado final
+    (malla, h, hu), los diagnosticos del integrador y los tiempos de cada etapa.
+    '''
+    caso = completar_caso(caso_)
+    inicio = time.perf_counter()
+
+    malla, matriz_de_masa_inversa, matriz_de_rigidez = operadores_en_cache(caso['x_inicial'], caso['x_final'], caso['N_elementos'], caso['N_nodos'], caso['familia'])
+    h, u = simulacion.condiciones_iniciales_gaussianas(malla, caso['amplitud'], caso['ancho'], caso['centro'])
+    estado_ = estado.EstadoConservativo.desde_primitivas(h, u)
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez, caso['solucionador'])
+    fin_construccion = time.perf_counter()
+
+    reporte = paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, caso['t_total'], malla, caso['integrador'], caso['paso_t'], caso['cfl'])
+    fin_integracion = time.perf_counter()
+
+    return {
+        'nombre': caso['nombre'],
+        'caso': caso,
+        'malla': np.array(malla),
+        'h': estado_.h.copy(),
+        'hu': estado_.hu.copy(),
+        'diagnosticos': {
+            'pasos': reporte['pasos'],
+            'pasos_rechazados': reporte['pasos_rechazados'],
+            't_final': reporte['t_final'],
+            'dt_minimo': min(reporte['historial_dt']),
+            'dt_maximo': max(reporte['historial_dt']),
+            'h_minimo': float(np.min(estado_.h)),
+            'h_maximo': float(np.max(estado_.h)),
+        },
+        'tiempos': {
+            'construccion': fin_construccion - inicio,
+            'integracion': fin_integracion - fin_construccion,
+            'pid': os.getpid(),
+        },
+    }
+
+def ejecutar_lote(casos_):
+    '''
+    Ejecuta como una sola simulacion apilada de forma (2, B, N_elementos, N_nodos) un lote de
+    B casos que solo difieren en las condiciones iniciales (todas las LLAVES_DE_LOTE iguales).
+    Los kernels de rigidez, flujo y masa inversa operan sobre los B casos en cada llamada.
+
+    Todos los casos avanzan con el mismo paso de tiempo; con el paso adaptativo este lo fija el
+    caso con la mayor velocidad de onda, asi que un caso del lote puede tomar mas pasos que
+    si se ejecutara solo.
+
+    Retorna:
+        list: Un diccionario de resultado por caso, con el mismo formato que ejecutar_caso.
+    '''
+    casos = [completar_caso(caso) for caso in casos_]
+    referencia = casos[0]
+    for caso in casos[1:]:
+        diferentes = [llave for llave in LLAVES_DE_LOTE if caso[llave] != referencia[llave]]
+        if diferentes:
+            raise ValueError(f'El caso {caso["nombre"]} no puede ir en el lote de {referencia["nombre"]}: difiere en {diferentes}')
+
+    inicio = time.perf_counter()
+
+    malla, matriz_de_masa_inversa, matriz_de_rigidez = operadores_en_cache(referencia['x_inicial'], referencia['x_final'], referencia['N_elementos'], referencia['N_nodos'], referencia['familia'])
+    condiciones_iniciales = [simulacion.condiciones_iniciales_gaussianas(malla, caso['amplitud'], caso['ancho'], caso['centro']) for caso in casos]
+    estado_ = estado.EstadoConservativo.desde_primitivas(np.stack([h for h, _ in condiciones_iniciales]), np.stack([u for _, u in condiciones_iniciales]))
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez, referencia['solucionador'], n_casos_=len(casos))
+    fin_construccion = time.perf_counter()
+
+    reporte = paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, referencia['t_total'], malla, referencia['integrador'], referencia['paso_t'], referencia['cfl'])
+    fin_integracion = time.perf_counter()
+
+    # diagnosticos por caso al final del lote
+    resultados = []
+    for b, caso in enumerate(casos):
+        resultados.append({
+            'nombre': caso['nombre'],
+            'caso': caso,
+            'malla': np.array(malla),
+            'h': estado_.h[b].copy(),
+            'hu': estado_.hu[b].copy(),
+            'diagnosticos': {
+                'pasos': reporte['pasos'],
+                'pasos_rechazados': reporte['pasos_rechazados'],
+                't_final': reporte['t_final'],
+                'dt_minimo': min(reporte['historial_dt']),
+                'dt_maximo': max(reporte['historial_dt']),
+                'h_minimo': float(np.min(estado_.h[b])),
+                'h_maximo': float(np.max(estado_.h[b])),
+            },
+            'tiempos': {
+                'construccion': fin_construccion - inicio,
+                'integracion': fin_integracion - fin_construccion,
+                'casos_en_lote': len(casos),
+                'pid': os.getpid(),
+            },
+        })
+    return resultados
+
+def agrupar_en_lotes(casos_, tamano_lote_):
+    '''
+    Agrupa los casos con las mismas LLAVES_DE_LOTE en lotes de a lo sumo tamano_lote_ casos.
+    '''
+    grupos = {}
+    for caso in casos_:
+        grupos.setdefault(tuple(caso[llave] for llave in LLAVES_DE_LOTE), []).append(caso)
+    return [grupo[i:i + tamano_lote_] for grupo in grupos.values() for i in range(0, len(grupo), tamano_lote_)]
+
+def casos_terminados(directorio_):
+    '''
+    Nombres de los casos anotados en el manifiesto del directorio de resultados.
+    '''
+    camino = os.path.join(directorio_, NOMBRE_MANIFIESTO)
+    if not os.path.exists(camino):
+        return set()
+    terminados = set()
+    with open(camino) as manifiesto:
+        for linea in manifiesto:
+            try:
+                terminados.add(json.loads(linea)['nombre'])
+            except (json.JSONDecodeError, KeyError):
+                # una linea incompleta de un barrido interrumpido se ignora
+                continue
+    return terminados
+
+def guardar_resultado(directorio_, resultado_):
+    '''
+    Guarda el estado final del caso en <nombre>.npz y lo anota en el manifiesto. El archivo se
+    escribe primero con otro nombre y luego se renombra, asi que nunca queda a medio escribir.
+    '''
+    camino = os.path.join(directorio_, resultado_['nombre'] + '.npz')
+    camino_temporal = camino + '.tmp.npz'
+    np.savez(camino_temporal, malla=resultado_['malla'], h=resultado_['h'], hu=resultado_['hu'])
+    os.replace(camino_temporal, camino)
+
+    linea = {k: resultado_[k] for k in ('nombre', 'caso', 'diagnosticos', 'tiempos')}
+    with open(os.path.join(directorio_, NOMBRE_MANIFIESTO), 'a') as manifiesto:
+        manifiesto.write(json.dumps(linea) + '\n')
+        manifiesto.flush()
+        os.fsync(manifiesto.fileno())
+
+def cargar_resultado(directorio_, nombre_):
+    '''
+    Carga (malla, h, hu) de un caso guardado por guardar_resultado.
+    '''
+    with np.load(os.path.join(directorio_, nombre_ + '.npz')) as datos:
+        return datos['malla'], datos['h'], datos['hu']
+
+def ejecutar_ensamble(casos_, directorio_=None, max_procesos_=None, max_en_vuelo_=None, tamano_lote_=None):
+    '''
+    Ejecuta una lista de casos en paralelo y entrega cada resultado a medida que termina.
+
+    Parámetros:
+        casos_ (list): Lista de diccionarios con los parametros de cada caso.
+        directorio_ (str): Opcional, directorio de resultados con el manifiesto. Los casos ya
+            anotados en el manifiesto no se vuelven a ejecutar.
+        max_procesos_ (int): Numero de procesos, por defecto el numero de nucleos.
+        max_en_vuelo_ (int): Maximo numero de casos enviados y no terminados, por defecto
+            2 * max_procesos_. Acota la memoria usada por resultados pendientes.
+        tamano_lote_ (int): Opcional, si es dado los casos compatibles se agrupan en lotes de
+            hasta tamano_lote_ casos que cada proceso avanza con ejecutar_lote.
+
+    Retorna:
+        generator: Diccionarios de resultado de ejecutar_caso, en orden de terminacion.
+    '''
+    casos = [completar_caso(caso) for caso in casos_]
+    nombres = [caso['nombre'] for caso in casos]
+    if len(set(nombres)) != len(nombres):
+        raise ValueError('Los nombres de los casos deben ser unicos')
+
+    if directorio_ is not None:
+        os.makedirs(directorio_, exist_ok=True)
+        terminados = casos_terminados(directorio_)
+        casos = [caso for caso in casos if caso['nombre'] not in terminados]
+
+    max_procesos = max_procesos_ or os.cpu_count() or 1
+    max_en_vuelo = max_en_vuelo_ or 2 * max_procesos
+    discretizaciones = sorted({(caso['N_nodos'], caso['familia']) for caso in casos})
+
+    # cada tarea es un lote de casos; sin tamano_lote_ cada lote tiene un solo caso
+    if tamano_lote_ is None:
+        tareas = [(ejecutar_caso, caso) for caso in casos]
+    else:
+        tareas = [(ejecutar_lote, lote) for lote in agrupar_en_lotes(casos, tamano_lote_)]
+
+    pendientes = iter(tareas)
+    with concurrent.futures.ProcessPoolExecutor(max_procesos, initializer=precalcular_operadores, initargs=(discretizaciones,)) as ejecutor:
+        en_vuelo = set()
+        while True:
+            # se llenan los lugares libres hasta max_en_vuelo casos enviados
+            for funcion, argumento in pendientes:
+                en_vuelo.add(ejecutor.submit(funcion, argumento))
+                if len(en_vuelo) >= max_en_vuelo:
+                    break
+            if not en_vuelo:
+                break
+
+            terminados_ahora, en_vuelo = concurrent.futures.wait(en_vuelo, return_when=concurrent.futures.FIRST_COMPLETED)
+            for futuro in terminados_ahora:
+                resultados = futuro.result()
+                for resultado in resultados if isinstance(resultados, list) else [resultados]:
+                    if directorio_ is not None:
+                        guardar_resultado(directorio_, resultado)
+                    yield resultado
+
+if __name__ == '__main__':
+    with open(sys.argv[1]) as archivo:
+        casos = json.load(archivo)
+    for resultado in ejecutar_ensamble(casos, sys.argv[2] if len(sys.argv) > 2 else None):
+        print(resultado['nombre'], json.dumps(resultado['diagnosticos']), f"{resultado['tiempos']['integracion']:.3f} s")
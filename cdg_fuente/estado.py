@@ -0,0 +1,78 @@
+import numpy as np
+import precision
+
+class EstadoConservativo:
+    '''
+    Estado de la simulacion en variables conservativas 1U = h y 2U = hu, guardado en un solo
+    array contiguo de forma (2, N_elementos, N_nodos). Un lote de B simulaciones con la misma
+    malla se guarda con un eje de lote adicional: (2, B, N_elementos, N_nodos).
+
+    h y hu son vistas del bloque (no copias), de modo que los integradores pueden avanzar
+    ambas variables con una sola operacion sobre datos. La velocidad u = hu / h no se guarda:
+    se calcula solo cuando se pide, por ejemplo para graficar o escribir resultados.
+
+    Parámetros:
+        datos_ (numpy.ndarray): Bloque conservativo de forma (2, N_elementos, N_nodos). Un bloque
+            de punto flotante conserva su tipo (float32 o float64); otros datos se convierten a
+            la precision actual.
+
+    Ejemplo:
+        estado = EstadoConservativo.desde_primitivas(h, u)
+        graficos.plot_simulation(malla, estado.h, estado.u, N_elementos, paso_t, numero_de_paso)
+    '''
+
+    def __init__(self, datos_):
+        datos_ = np.ascontiguousarray(datos_, dtype=precision.tipo_de(datos_))
+        if datos_.ndim < 3 or datos_.shape[0] != 2:
+            raise ValueError(f'El bloque conservativo debe tener forma (2, [B,] N_elementos, N_nodos), no {datos_.shape}')
+        self.datos = datos_
+
+    @classmethod
+    def desde_primitivas(cls, h_, u_):
+        '''
+        Construye el estado a partir de la altura h y la velocidad u, de forma ([B,] N_elementos, N_nodos).
+        '''
+        datos = np.empty((2,) + np.shape(h_), dtype=precision.tipo_de(h_, u_))
+        datos[0] = h_
+        np.multiply(h_, u_, out=datos[1])
+        return cls(datos)
+
+    @classmethod
+    def ceros(cls, N_elementos_, N_nodos_):
+        return cls(np.zeros((2, N_elementos_, N_nodos_), dtype=precision.tipo_de_dato()))
+
+    @property
+    def shape(self):
+        return self.datos.shape[1:]
+
+    @property
+    def h(self):
+        return self.datos[0]
+
+    @property
+    def hu(self):
+        return self.datos[1]
+
+    @property
+    def u(self):
+        return calcular_velocidad(self.datos[0], self.datos[1])
+
+    def primitivas(self):
+        '''
+        Retorna (h, u), con h como vista del bloque y u calculada en ese momento.
+        '''
+        return self.h, self.u
+
+    def copia(self):
+        return EstadoConservativo(self.datos.copy())
+
+def calcular_velocidad(h_, hu_, out_=None):
+    '''
+    Recupera la velocidad u = hu / h, igual a cero donde h == 0.
+    '''
+    if out_ is None:
+        out_ = np.zeros(np.shape(h_), dtype=precision.tipo_de(h_, hu_))
+    else:
+        out_[...] = 0.0
+    np.divide(hu_, h_, out=out_, where=(h_ != 0))
+    return out_
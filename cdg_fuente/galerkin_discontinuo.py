@@ -1,72 +1,37 @@
 import numpy as np
+import solucionadores_de_riemann
 
-def compute_numerical_flux_vectors(h_, u_):
+# aceleracion de la gravedad (m/s^2)
+GRAVEDAD = solucionadores_de_riemann.GRAVEDAD
 
-    # basis_func_values_at_nodes_in_phys_space = [ [phi_1(x_node_1), phi_2(x_node_1) , ... , phi_p(x_node_1)] , 
-    #                                              [phi_1(x_node_2), phi_2(x_node_2) , ... , phi_p(x_node_2)], ... , ]
-    # basis_values_at_nods = 1 (identity matrix of size number of nodes per element
-    basis_values_at_nods = np.eye(len(h_[0])) # basis function evaluated at nodes in physical space
+def compute_numerical_flux_vectors(h_, u_, solucionador_riemann_='roe'):
 
-    Num_elements = len(h_) # number of elements
+    # numerical flux function selected by name from the riemann solver registry
+    numerical_flux = solucionadores_de_riemann.obtener_solucionador(solucionador_riemann_)
 
-    # computing roe flux
-    roe_flux_1 = []
-    roe_flux_2 = []
+    # the left state of every interior border is the last node of element n and the
+    # right state is the first node of element n+1: compute all borders at once. Any leading
+    # axes of h_ with shape (..., N_elementos, N_nodos) are independent cases of a batch
+    flux_1, flux_2 = numerical_flux(h_[..., :-1, -1], u_[..., :-1, -1], h_[..., 1:, 0], u_[..., 1:, 0])
 
-    # looping over each element (except the final element) to compute the roe flux at the right
-    for n in np.arange(Num_elements-1):
+    # computing the difference between the numerical fluxes in the limits of the element:
+    # right numerical flux on the last node minus left numerical flux on the first node
+    difference_numerical_flux_1 = np.zeros(h_.shape, dtype=flux_1.dtype)
+    difference_numerical_flux_2 = np.zeros(h_.shape, dtype=flux_2.dtype)
 
-        # computing average value in the right border of element n and n+1
-        h_average = 0.5*(h_[n][-1]+h_[n+1][0])
-        u_average = 0.5*(u_[n][-1]+u_[n+1][0])
+    # right border of every element but the last one
+    difference_numerical_flux_1[..., :-1, -1] = flux_1
+    difference_numerical_flux_2[..., :-1, -1] = flux_2
 
-        # compute the jacobian evaluated in the border between elements n and n+1
-        jacobian = [ [ 0 , 1 ] , [ 9.8 * h_average - u_average**2, 2 * u_average ] ]
+    # left border of every element but the first one
+    difference_numerical_flux_1[..., 1:, 0] -= flux_1
+    difference_numerical_flux_2[..., 1:, 0] -= flux_2
 
-        # compute eigenvalues and eigenvector of the jacobian
-        eigenvalues_jacobian, eigenvectors_jacobian = np.linalg.eig(jacobian)
+    # reflecting walls: only the pressure term survives at the domain limits
+    difference_numerical_flux_2[..., 0, 0] -= 0.5 * GRAVEDAD * h_[..., 0, 0]**2
+    difference_numerical_flux_2[..., -1, -1] += 0.5 * GRAVEDAD * h_[..., -1, -1]**2
 
-        # biulds abs_A matrix
-        abs_A = eigenvectors_jacobian @ np.diag(np.abs(eigenvalues_jacobian)) @ np.linalg.inv(eigenvectors_jacobian)
-
-        # for the border between element n and n+1 compute the f1 on the left and the right
-        f1_left  = h_[n][-1] * u_[n][-1] 
-        f1_right = h_[n+1][0] * u_[n+1][0]
-
-        # for the border between element n and n+1 compute the f2 on the left and the right
-        f2_left  = h_[n][-1] * u_[n][-1]**2 + 0.5 * 9.8 * h_[n][-1]**2
-        f2_right = h_[n+1][0] * u_[n+1][0]**2 + 0.5 * 9.8 * h_[n+1][0]**2
-
-        # for the border between element n and n+1 compute the u1 on the left and the right
-        u1_left  = h_[n][-1]
-        u1_right = h_[n+1][0]
-
-        # for the border between element n and n+1 compute the u2 on the left and the right
-        u2_left  = h_[n][-1] * u_[n][-1] 
-        u2_right = h_[n+1][0] * u_[n+1][0]
-
-        # compute roe flux
-        roe_flux_1.append( 0.5 * ( f1_left + f1_right ) - 0.5 * abs_A[0][0] * ( u1_right - u1_left ) - 0.5 * abs_A[0][1] * ( u2_right - u2_left ) )
-        roe_flux_2.append( 0.5 * ( f2_left + f2_right ) - 0.5 * abs_A[1][0] * ( u1_right - u1_left ) - 0.5 * abs_A[1][1] * ( u2_right - u2_left ) )
-
-    # computing the difference between the numerical fluxe in limits of the element
-    difference_numerical_flux_1 = []
-    difference_numerical_flux_2 = []
-
-    #looping over all element
-    for n in np.arange(Num_elements):
-        # compute differences between flux: right numerical flux - left numerical flux
-        if n == 0:               
-            difference_numerical_flux_1.append( basis_values_at_nods[:,-1] * roe_flux_1[n] - basis_values_at_nods[:,0] * 0 )
-            difference_numerical_flux_2.append( basis_values_at_nods[:,-1] * roe_flux_2[n] - basis_values_at_nods[:,0] * ( 0.5 * 9.8 * h_[n][0]**2 ) )
-        elif n == Num_elements-1: 
-            difference_numerical_flux_1.append( basis_values_at_nods[:,-1] * 0 - basis_values_at_nods[:,0] * roe_flux_1[n-1] )
-            difference_numerical_flux_2.append( basis_values_at_nods[:,-1] * ( 0.5 * 9.8 * h_[n][-1]**2 ) - basis_values_at_nods[:,0] * roe_flux_2[n-1] )
-        else:                    
-            difference_numerical_flux_1.append( basis_values_at_nods[:,-1] * roe_flux_1[n] - basis_values_at_nods[:,0] * roe_flux_1[n-1] )
-            difference_numerical_flux_2.append( basis_values_at_nods[:,-1] * roe_flux_2[n] - basis_values_at_nods[:,0] * roe_flux_2[n-1] )
-
-    return np.array(difference_numerical_flux_1), np.array(difference_numerical_flux_2)
+    return difference_numerical_flux_1, difference_numerical_flux_2
 
 def calcula_matrix_de_rigidez(longitud_elemento_, pesos_de_gauss_, polinomios_de_lagrange_en_cuadratura_de_gauss, derivada_x_polinomios_de_lagrange_en_cuadratura_de_gauss):
 
@@ -75,12 +40,15 @@ def calcula_matrix_de_rigidez(longitud_elemento_, pesos_de_gauss_, polinomios_de
 
     return matriz_de_rigidez
 
-def compute_stiffness_vectors(_h, _u, _matriz_de_rigidez):
-    
-    e_numb = np.arange(len(_h)) # elements number
+def compute_stiffness_vectors(_h, _u, _matriz_de_rigidez, _stiff_vec_1=None, _stiff_vec_2=None):
 
-    stiff_vec_1 = np.array([ _matriz_de_rigidez @ ( _h[n] * np.array(_u[n]) ) for n in e_numb])
-    stiff_vec_2 = np.array([ _matriz_de_rigidez @ ( _h[n] * np.array(_u[n])**2 + 0.5 * 9.8 * np.array(_h[n])**2 ) for n in e_numb])
+    # physical fluxes f1 = hu and f2 = hu^2 + 0.5 g h^2 evaluated once on every node
+    _, flux_1, flux_2 = solucionadores_de_riemann.flujos_fisicos(_h, _u)
+
+    # stiffness vector of every element at once: row n is S @ f[n], that is f @ S.T
+    # optionally written into caller provided (N_elementos, N_nodos) buffers
+    stiff_vec_1 = np.matmul(flux_1, _matriz_de_rigidez.T, out=_stiff_vec_1)
+    stiff_vec_2 = np.matmul(flux_2, _matriz_de_rigidez.T, out=_stiff_vec_2)
 
     return stiff_vec_1, stiff_vec_2
 
@@ -108,19 +76,68 @@ def calcula_inversa_matriz_de_masa(longitud_elemento_, pesos_de_gauss_, polinomi
     """
 
     # Inicializa la matriz de masa
-    matriz_de_masa = np.zeros((N_nodos_, N_nodos_))
+    matriz_de_masa = np.zeros((N_nodos_, N_nodos_), dtype=np.result_type(np.asarray(pesos_de_gauss_), np.asarray(polinomios_de_lagrange_en_cuadratura_de_gauss_)))
 
     #-----------------------------------------------------------------------------------------
     # Escribe tu solucion al ejercicio 4 a continuacion ...
 
-    # Calcula la matriz de masa
-    for i in range(N_nodos_):
-        for j in range(N_nodos_):
-            # Calcula la integral de phi_i(x) * phi_j(x) dx
-            matriz_de_masa[i, j] = 0.5 * longitud_elemento_ * np.sum(pesos_de_gauss_ * polinomios_de_lagrange_en_cuadratura_de_gauss_[i] * polinomios_de_lagrange_en_cuadratura_de_gauss_[j])
+    # Calcula la matriz de masa: M_ij = integral de phi_i(x) * phi_j(x) dx para todos los i, j a la vez
+    matriz_de_masa[:, :] = 0.5 * longitud_elemento_ * np.dot(polinomios_de_lagrange_en_cuadratura_de_gauss_ * pesos_de_gauss_, polinomios_de_lagrange_en_cuadratura_de_gauss_.T)
     # Calcula la inversa de la matriz de masa
     inversa_matriz_de_masa = np.linalg.inv(matriz_de_masa)
 
     #-----------------------------------------------------------------------------------------
 
-    return inversa_matriz_de_masa
\ No newline at end of file
+    return inversa_matriz_de_masa
+
+def calcula_inversa_matriz_de_masa_diagonal(longitud_elemento_, pesos_de_lobatto_):
+    """
+    Calcula la inversa de la matriz de masa diagonal del modo de colocacion de Gauss-Lobatto:
+    con los nodos del elemento en los puntos de Gauss-Lobatto y la misma cuadratura,
+    phi_i(x_q) = delta_iq y M_ij = 0.5 * longitud_elemento * w_i * delta_ij.
+
+    Parametros:
+
+    longitud_elemento_ (float): La longitud del elemento finito.
+
+    pesos_de_lobatto_ (numpy.ndarray): Los pesos de la cuadratura de Gauss-Lobatto con N_nodos puntos.
+
+    Retorna:
+
+    numpy.ndarray: La diagonal de la inversa de la matriz de masa, forma (N_nodos,).
+    """
+    return 1.0 / ( 0.5 * longitud_elemento_ * np.asarray(pesos_de_lobatto_) )
+
+def aplicar_inversa_matriz_de_masa(vector_residual_, matriz_de_masa_inversa_, out_=None):
+    """
+    Aplica la inversa de la matriz de masa a todos los elementos a la vez: la fila n del
+    resultado es M^-1 @ vector_residual_[n]. Si matriz_de_masa_inversa_ es un vector se trata
+    como la diagonal de una matriz de masa diagonal y el producto es un escalado por nodo.
+    """
+    if np.ndim(matriz_de_masa_inversa_) == 1:
+        return np.multiply(vector_residual_, matriz_de_masa_inversa_, out=out_)
+    return np.matmul(vector_residual_, matriz_de_masa_inversa_.T, out=out_)
+
+def calcula_pesos_de_integracion(matriz_de_masa_inversa_):
+    """
+    Calcula los pesos nodales de la integral de la solucion sobre un elemento a partir de la
+    matriz de masa ya construida: como los polinomios de Lagrange suman uno en todo punto,
+    integral u dx = sum_ij phi_i phi_j u_j = sum_ij M_ij u_j, es decir pesos = M @ 1, exacto con
+    la misma cuadratura que la matriz de masa.
+
+    Parametros:
+
+    matriz_de_masa_inversa_ (numpy.ndarray): La inversa de la matriz de masa, forma (N_nodos, N_nodos),
+        o la diagonal de la inversa de una matriz de masa diagonal, forma (N_nodos,).
+
+    Retorna:
+
+    numpy.ndarray: Los pesos de integracion, forma (N_nodos,), con el tipo de matriz_de_masa_inversa_.
+    """
+    matriz_de_masa_inversa = np.asarray(matriz_de_masa_inversa_, dtype=np.float64)
+    if matriz_de_masa_inversa.ndim == 1:
+        pesos = 1.0 / matriz_de_masa_inversa
+    else:
+        # M^-1 pesos = 1 porque M es simetrica
+        pesos = np.linalg.solve(matriz_de_masa_inversa, np.ones(len(matriz_de_masa_inversa)))
+    return pesos.astype(np.asarray(matriz_de_masa_inversa_).dtype, copy=False)
@@ -1,35 +1,57 @@
+import collections
+import concurrent.futures
+import itertools
+import os
 import time
-import matplotlib.pyplot as plt
+import numpy as np
+import instrumentacion
 
 ############################################################
 # PLOT SETTINGS
+# pyplot solo se importa en plot_simulation: el renderizado de cuadros usa Figure y el
+# lienzo Agg directamente, sin elegir un backend interactivo
 import matplotlib as mpl
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from matplotlib.ticker import AutoLocator, AutoMinorLocator, LogLocator
 
-# Font settings
-mpl.rcParams['font.size'] = 22
-mpl.rcParams['font.family'] = 'serif'
-# mpl.rc('text', usetex=True)
-
-# Tick settings
-mpl.rcParams['xtick.major.size'] = 7
-mpl.rcParams['xtick.major.width'] = 2
-mpl.rcParams['xtick.major.pad'] = 8
-mpl.rcParams['xtick.minor.size'] = 4
-mpl.rcParams['xtick.minor.width'] = 2
-mpl.rcParams['ytick.major.size'] = 7
-mpl.rcParams['ytick.major.width'] = 2
-mpl.rcParams['ytick.minor.size'] = 4
-mpl.rcParams['ytick.minor.width'] = 2
-
-# Axis linewidth
-mpl.rcParams['axes.linewidth'] = 2
-
-# Tick direction and enabling ticks on all sides
-mpl.rcParams['xtick.direction'] = 'in'
-mpl.rcParams['ytick.direction'] = 'in'
-mpl.rcParams['xtick.top'] = True
-mpl.rcParams['ytick.right'] = True
+_estilo_aplicado = False
+
+def aplicar_estilo():
+    '''
+    Aplica el estilo de las figuras del curso a mpl.rcParams. Se llama antes de crear cada
+    figura y solo modifica rcParams la primera vez, de modo que importar graficos no cambia la
+    configuracion de matplotlib.
+    '''
+    global _estilo_aplicado
+    if _estilo_aplicado:
+        return
+    _estilo_aplicado = True
+
+    # Font settings
+    mpl.rcParams['font.size'] = 22
+    mpl.rcParams['font.family'] = 'serif'
+    # mpl.rc('text', usetex=True)
+
+    # Tick settings
+    mpl.rcParams['xtick.major.size'] = 7
+    mpl.rcParams['xtick.major.width'] = 2
+    mpl.rcParams['xtick.major.pad'] = 8
+    mpl.rcParams['xtick.minor.size'] = 4
+    mpl.rcParams['xtick.minor.width'] = 2
+    mpl.rcParams['ytick.major.size'] = 7
+    mpl.rcParams['ytick.major.width'] = 2
+    mpl.rcParams['ytick.minor.size'] = 4
+    mpl.rcParams['ytick.minor.width'] = 2
+
+    # Axis linewidth
+    mpl.rcParams['axes.linewidth'] = 2
+
+    # Tick direction and enabling ticks on all sides
+    mpl.rcParams['xtick.direction'] = 'in'
+    mpl.rcParams['ytick.direction'] = 'in'
+    mpl.rcParams['xtick.top'] = True
+    mpl.rcParams['ytick.right'] = True
 
 # Function to apply custom tick locators and other settings to an Axes object
 def apply_custom_settings(ax, log_scale_y=False):
@@ -50,8 +72,11 @@ def apply_custom_settings(ax, log_scale_y=False):
 
 ############################################################
 
+@instrumentacion.instrumentar('graficos')
 def plot_simulation(malla, h, u, N_elementos, time_step, number_of_t_step, display=False, save=True):
+    import matplotlib.pyplot as plt
 
+    aplicar_estilo()
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
 
     # Plot h in the top panel
@@ -89,3 +114,166 @@ def plot_simulation(malla, h, u, N_elementos, time_step, number_of_t_step, displ
     if display:
         plt.show()
     plt.close(fig)
+
+############################################################
+# RENDERIZADO DE CUADROS FUERA DEL CICLO TEMPORAL
+
+class RenderizadorDeCuadros:
+    '''
+    Renderiza cuadros con el mismo aspecto que plot_simulation reutilizando una sola figura.
+
+    La figura, los ejes y las zonas grises se dibujan una sola vez y se guardan como fondo. En
+    cada cuadro se restaura el fondo, se actualizan en el lugar los datos de las lineas, los
+    rellenos y el titulo, y solo esos artistas se vuelven a dibujar (blitting). El resultado es
+    un array RGB listo para el codificador, sin pasar por archivos PNG.
+
+    Parámetros:
+        malla_ (numpy.ndarray): Coordenadas de los nodos, forma (N_elementos, N_nodos).
+        dpi_ (int): Resolucion de la figura.
+    '''
+
+    def __init__(self, malla_, dpi_=80):
+
+        self.malla = np.asarray(malla_)
+        N_elementos = len(self.malla)
+        aplicar_estilo()
+
+        # figura sin pyplot: no depende del backend interactivo y puede vivir en otro proceso
+        self.figura = Figure(figsize=(10, 8), dpi=dpi_)
+        self.lienzo = FigureCanvasAgg(self.figura)
+        ax1, ax2 = self.figura.subplots(2, 1, sharex=True)
+
+        ceros = np.zeros(self.malla.shape[1])
+        colores = mpl.rcParams['axes.prop_cycle'].by_key()['color']
+
+        self.lineas_h = [ax1.plot(self.malla[i], ceros, linestyle='-', marker='o', markersize=5, linewidth=2, color=colores[i % len(colores)], animated=True)[0] for i in range(N_elementos)]
+        self.rellenos = [ax1.fill_between(self.malla[i], ceros, color='blue', alpha=1, animated=True) for i in range(N_elementos)]
+        ax1.axvspan(xmin=-1, xmax=0, ymin=0, ymax=1.10, facecolor='gray', alpha=1.)
+        ax1.axvspan(xmin=10, xmax=11, ymin=0, ymax=1.10, facecolor='gray', alpha=1.)
+        ax1.minorticks_on()
+        ax1.tick_params(axis='both', which='both', direction='in', top=True, right=True)
+        ax1.set_ylim(0.85, 1.14)
+        ax1.set_ylabel(r'$h \, (m)$', fontsize=22)
+        apply_custom_settings(ax1)
+
+        self.lineas_u = [ax2.plot(self.malla[i], ceros, linestyle='-', marker='o', markersize=5, linewidth=2, color=colores[i % len(colores)], animated=True)[0] for i in range(N_elementos)]
+        ax2.minorticks_on()
+        ax2.tick_params(axis='both', which='both', direction='in', top=True, right=True)
+        ax2.set_ylim(-0.2, 0.2)
+        ax2.set_xlim(-0.5, 10.5)
+        ax2.set_xlabel(r'$x \, (m)$', fontsize=22)
+        ax2.set_ylabel(r'$u \, (m/s)$', fontsize=22)
+        apply_custom_settings(ax2)
+
+        self.titulo = ax1.set_title(r'$t = {:.2f} \, s$'.format(0.0), fontsize=22)
+        self.titulo.set_animated(True)
+        self.figura.tight_layout()
+
+        # los artistas animados no se dibujan aqui: el fondo queda sin datos
+        self.lienzo.draw()
+        self.fondo = self.lienzo.copy_from_bbox(self.figura.bbox)
+        self.artistas = self.rellenos + self.lineas_h + self.lineas_u + [self.titulo]
+
+    @instrumentacion.instrumentar('cuadro')
+    def cuadro(self, h_, u_, t_):
+        '''
+        Renderiza el estado (h, u) en el tiempo t_ y retorna la imagen como array RGB uint8.
+        '''
+        for i in range(len(self.malla)):
+            self.lineas_h[i].set_ydata(h_[i])
+            self.lineas_u[i].set_ydata(u_[i])
+
+            # poligono de fill_between(x, h) con base en cero
+            x = self.malla[i]
+            self.rellenos[i].set_verts([np.column_stack((np.concatenate(([x[0]], x, [x[-1]])), np.concatenate(([0.0], h_[i], [0.0]))))])
+        self.titulo.set_text(r'$t = {:.2f} \, s$'.format(t_))
+
+        self.lienzo.restore_region(self.fondo)
+        for artista in self.artistas:
+            artista.axes.draw_artist(artista)
+
+        return np.asarray(self.lienzo.buffer_rgba())[..., :3].copy()
+
+# renderizador de cada proceso del pool, creado por _iniciar_renderizador
+_renderizador_del_proceso = None
+
+def _iniciar_renderizador(malla_, dpi_):
+    global _renderizador_del_proceso
+    _renderizador_del_proceso = RenderizadorDeCuadros(malla_, dpi_)
+
+def _renderizar_en_proceso(fotos_):
+    return [_renderizador_del_proceso.cuadro(h, u, t) for h, u, t in fotos_]
+
+def _cuadros_en_orden(ejecutor_, fotos_, tareas_pendientes_, cuadros_por_tarea_):
+    '''
+    Envia las fotos al pool en tareas de cuadros_por_tarea_ fotos y entrega los cuadros en orden.
+    Solo hay tareas_pendientes_ tareas enviadas a la vez, de modo que las fotos se leen a medida
+    que se renderizan y no todas de una vez.
+    '''
+    fotos = iter(fotos_)
+    pendientes = collections.deque()
+    while True:
+        while len(pendientes) < tareas_pendientes_:
+            tarea = list(itertools.islice(fotos, cuadros_por_tarea_))
+            if not tarea:
+                break
+            pendientes.append(ejecutor_.submit(_renderizar_en_proceso, tarea))
+        if not pendientes:
+            return
+        yield from pendientes.popleft().result()
+
+def codificar_animacion(cuadros_, archivo_salida_, duracion_por_cuadro_=0.3):
+    '''
+    Codifica una secuencia de cuadros RGB en un GIF o MP4 (segun la extension de archivo_salida_)
+    a medida que llegan, sin guardar los cuadros en disco ni en memoria. duracion_por_cuadro_ esta
+    en segundos.
+
+    Retorna:
+        int: Numero de cuadros escritos.
+    '''
+    import imageio.v2 as imageio
+
+    if archivo_salida_.lower().endswith('.gif'):
+        # el escritor de GIF de imageio recibe la duracion en milisegundos; loop=0 repite sin fin
+        escritor = imageio.get_writer(archivo_salida_, mode='I', duration=1000 * duracion_por_cuadro_, loop=0)
+    else:
+        escritor = imageio.get_writer(archivo_salida_, fps=1.0 / duracion_por_cuadro_)
+
+    n_cuadros = 0
+    with escritor:
+        for cuadro in cuadros_:
+            escritor.append_data(cuadro)
+            n_cuadros += 1
+    return n_cuadros
+
+def renderizar_animacion(malla_, fotos_, archivo_salida_, duracion_por_cuadro_=0.3, n_procesos_=None, dpi_=80, cuadros_por_tarea_=8):
+    '''
+    Renderiza una animacion a partir de fotos (h, u, t) en un pool de procesos, cada uno con su
+    propia figura reutilizada, y codifica los cuadros en orden a medida que llegan. Las fotos se
+    consumen con una ventana de 2 * n_procesos_ tareas pendientes, de modo que en memoria solo hay
+    las fotos de esas tareas.
+
+    Parámetros:
+        malla_ (numpy.ndarray): Coordenadas de los nodos, forma (N_elementos, N_nodos).
+        fotos_ (iterable): Tuplas (h, u, t) con h y u de forma (N_elementos, N_nodos).
+        archivo_salida_ (str): Archivo .gif o .mp4.
+        n_procesos_ (int): Numero de procesos, por defecto el numero de nucleos.
+
+    Retorna:
+        int: Numero de cuadros escritos.
+    '''
+    n_procesos = n_procesos_ or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(n_procesos, initializer=_iniciar_renderizador, initargs=(malla_, dpi_)) as ejecutor:
+        cuadros = _cuadros_en_orden(ejecutor, fotos_, 2 * n_procesos, cuadros_por_tarea_)
+        return codificar_animacion(cuadros, archivo_salida_, duracion_por_cuadro_)
+
+def renderizar_corrida(directorio_, archivo_salida_, duracion_por_cuadro_=0.3, n_procesos_=None, dpi_=80):
+    '''
+    Renderiza la animacion de una corrida guardada por salida.EscritorDeSnapshots, leyendo las
+    fotos de forma perezosa.
+    '''
+    import salida
+
+    lector = salida.LectorDeSnapshots(directorio_)
+    fotos = ((lector.leer(i, i + 1, 'h')[0], lector.leer(i, i + 1, 'u')[0], lector.tiempos[i]) for i in range(len(lector)))
+    return renderizar_animacion(lector.malla, fotos, archivo_salida_, duracion_por_cuadro_, n_procesos_, dpi_)
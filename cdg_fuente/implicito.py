@@ -0,0 +1,267 @@
+'''
+Integradores temporales implicitos para corridas largas en mallas finas, donde el limite CFL de
+los integradores explicitos obliga a tomar muchos pasos pequeños.
+
+Cada paso resuelve un sistema no lineal de la forma
+
+    G(X) = X - c dt F(X) - R = 0
+
+con el lado derecho F de paso_de_tiempo (RHSOperator.evaluate_conservative, o
+compute_dhdt_du_dt a traves de paso_de_tiempo.lado_derecho_desde_compute_dhdt_du_dt), por el
+metodo de Newton-Krylov sin jacobiano: el producto del jacobiano por un vector se aproxima con
+una diferencia finita de F y cada correccion de Newton se resuelve con GMRES de
+scipy.sparse.linalg. El precondicionador es Jacobi por bloques de elemento: la inversa de
+I - c dt J_e, con J_e el bloque diagonal del jacobiano linealizado de cada elemento construido
+con las matrices de masa y de rigidez (operador_global.bloques_diagonales_del_jacobiano).
+
+Metodos:
+    euler_implicito  Euler implicito, primer orden
+    sdirk2           DIRK de dos etapas de Alexander, L-estable, segundo orden
+    bdf2             BDF2 con paso variable, segundo orden; el primer paso es de Euler implicito
+
+Un IntegradorImplicito se pasa a paso_de_tiempo.integrar en lugar del nombre del integrador.
+Si Newton no converge el paso retorna False y integrar lo rechaza y reduce el paso. La historia
+de BDF2 (U^(n-1) en los registros y el paso anterior) solo avanza cuando integrar acepta el paso
+(aceptar_paso); el paso anterior se guarda en los puntos de control con historia() y se
+recupera con restaurar_historia().
+
+Uso:
+    python implicito.py
+'''
+import time
+
+import numpy as np
+import scipy.sparse.linalg
+
+import estado
+import operador_global
+import paso_de_tiempo
+import simulacion
+
+METODOS = ('euler_implicito', 'sdirk2', 'bdf2')
+
+# coeficiente de la diagonal del DIRK de Alexander
+GAMMA_SDIRK2 = 1.0 - 1.0 / np.sqrt(2.0)
+
+class IntegradorImplicito:
+    '''
+    Integrador implicito con Newton-Krylov sin jacobiano, con la interfaz de los integradores
+    registrados en paso_de_tiempo: integrador(U, lado_derecho, paso_t, registros).
+
+    Parámetros:
+        matriz_de_masa_inversa_ (numpy.ndarray): Inversa de la matriz de masa, para el precondicionador.
+        matriz_de_rigidez_ (numpy.ndarray): Matriz de rigidez, para el precondicionador.
+        metodo_ (str): 'euler_implicito', 'sdirk2' o 'bdf2'.
+        solucionador_riemann_ (str): Solucionador con el que se linealiza el precondicionador ('roe' o 'rusanov').
+        cfl_ (float): Numero CFL del paso adaptativo de integrar, mayor que el de los explicitos.
+        tolerancia_newton_ (float): Reduccion relativa de la norma de G para detener Newton.
+        max_iteraciones_newton_ (int): Iteraciones de Newton por etapa.
+        tolerancia_krylov_ (float): Tolerancia relativa de GMRES en cada iteracion de Newton.
+        max_iteraciones_krylov_ (int): Iteraciones de GMRES por iteracion de Newton.
+        precondicionar_ (bool): Usa el precondicionador de Jacobi por bloques de elemento.
+
+    Atributos:
+        historial (list): Un diccionario por intento de paso con el paso de tiempo, las
+            iteraciones de Newton y de Krylov y si Newton convergio.
+    '''
+
+    def __init__(self, matriz_de_masa_inversa_, matriz_de_rigidez_, metodo_='bdf2', solucionador_riemann_='roe', cfl_=10.0,
+                 tolerancia_newton_=1e-8, max_iteraciones_newton_=10, tolerancia_krylov_=1e-3, max_iteraciones_krylov_=50, precondicionar_=True):
+
+        if metodo_ not in METODOS:
+            raise ValueError(f'Metodo implicito desconocido: {metodo_!r}. Opciones: {METODOS}')
+
+        self.nombre = metodo_
+        self.cfl = cfl_
+        # BDF2 guarda U^(n-1) y U^n en los registros
+        self.n_registros = 2 if metodo_ == 'bdf2' else 0
+
+        self.matriz_de_masa_inversa = matriz_de_masa_inversa_
+        self.matriz_de_rigidez = matriz_de_rigidez_
+        self.solucionador_riemann = solucionador_riemann_
+        self.tolerancia_newton = tolerancia_newton_
+        self.max_iteraciones_newton = max_iteraciones_newton_
+        self.tolerancia_krylov = tolerancia_krylov_
+        self.max_iteraciones_krylov = max_iteraciones_krylov_
+        self.precondicionar = precondicionar_
+
+        self.historial = []
+        # paso de tiempo del ultimo paso aceptado, None antes del primero
+        self._paso_t_anterior = None
+
+    def _precondicionador(self, X_, c_paso_t_):
+
+        # inversa de I - c dt J_e en cada elemento, aplicada sobre el vector en orden (variable, elemento, nodo)
+        _, N_elementos, N_nodos = X_.shape
+        bloques = operador_global.bloques_diagonales_del_jacobiano(X_, self.matriz_de_masa_inversa, self.matriz_de_rigidez, self.solucionador_riemann)
+        inversas = np.linalg.inv(np.eye(2 * N_nodos) - c_paso_t_ * bloques)
+
+        def aplicar(vector):
+            por_elemento = vector.reshape(2, N_elementos, N_nodos).transpose(1, 0, 2).reshape(N_elementos, 2 * N_nodos)
+            resultado = np.matmul(inversas, por_elemento[:, :, None])[:, :, 0]
+            return resultado.reshape(N_elementos, 2, N_nodos).transpose(1, 0, 2).ravel()
+
+        return scipy.sparse.linalg.LinearOperator((X_.size, X_.size), matvec=aplicar)
+
+    def resolver(self, X_, R_, c_paso_t_, lado_derecho_):
+        '''
+        Resuelve X - c dt F(X) = R por Newton-Krylov sin jacobiano, partiendo de X_ y
+        actualizandolo en el lugar.
+
+        Retorna:
+            tuple: (iteraciones de Newton, iteraciones de Krylov, convergio).
+        '''
+        F = lado_derecho_(X_, np.empty(X_.shape))
+        F_perturbado = np.empty(X_.shape)
+        X_perturbado = np.empty(X_.shape)
+        G = X_ - c_paso_t_ * F - R_
+        norma_inicial = np.linalg.norm(G)
+        M = self._precondicionador(X_, c_paso_t_) if self.precondicionar and X_.ndim == 3 else None
+
+        iteraciones_de_krylov = [0]
+        def contar(_):
+            iteraciones_de_krylov[0] += 1
+
+        raiz_epsilon = np.sqrt(np.finfo(float).eps)
+        for iteracion in range(self.max_iteraciones_newton + 1):
+            norma = np.linalg.norm(G)
+            if norma <= self.tolerancia_newton * max(norma_inicial, 1.0) or not np.isfinite(norma):
+                break
+            if iteracion == self.max_iteraciones_newton:
+                break
+
+            # J v = v - c dt ( F(X + e v) - F(X) ) / e, con e escalado por |X| / |v|
+            def producto_jacobiano(vector):
+                norma_vector = np.linalg.norm(vector)
+                if norma_vector == 0.0:
+                    return np.zeros(vector.shape)
+                epsilon = raiz_epsilon * ( 1.0 + np.linalg.norm(X_) ) / norma_vector
+                np.add(X_, epsilon * vector.reshape(X_.shape), out=X_perturbado)
+                lado_derecho_(X_perturbado, F_perturbado)
+                return vector - c_paso_t_ * ( ( F_perturbado - F ) / epsilon ).ravel()
+
+            J = scipy.sparse.linalg.LinearOperator((X_.size, X_.size), matvec=producto_jacobiano)
+            correccion, _ = scipy.sparse.linalg.gmres(J, -G.ravel(), rtol=self.tolerancia_krylov, restart=self.max_iteraciones_krylov, maxiter=1, M=M, callback=contar, callback_type='pr_norm')
+            X_ += correccion.reshape(X_.shape)
+
+            lado_derecho_(X_, F)
+            np.subtract(X_, c_paso_t_ * F, out=G)
+            G -= R_
+
+        convergio = bool(np.isfinite(norma) and norma <= self.tolerancia_newton * max(norma_inicial, 1.0))
+        return iteracion, iteraciones_de_krylov[0], convergio
+
+    def __call__(self, U_, lado_derecho_, paso_t_, registros_):
+
+        iteraciones = []
+
+        if self.nombre == 'euler_implicito':
+            X = U_.copy()
+            iteraciones.append(self.resolver(X, U_, paso_t_, lado_derecho_))
+
+        elif self.nombre == 'sdirk2':
+            # etapa 1: X1 = U + gamma dt F(X1), k1 = F(X1) = ( X1 - U ) / ( gamma dt )
+            X = U_.copy()
+            iteraciones.append(self.resolver(X, U_, GAMMA_SDIRK2 * paso_t_, lado_derecho_))
+            k1 = ( X - U_ ) / ( GAMMA_SDIRK2 * paso_t_ )
+            # etapa 2: X2 = U + (1 - gamma) dt k1 + gamma dt F(X2), y U^(n+1) = X2
+            R = U_ + ( 1.0 - GAMMA_SDIRK2 ) * paso_t_ * k1
+            X = R + GAMMA_SDIRK2 * paso_t_ * k1
+            iteraciones.append(self.resolver(X, R, GAMMA_SDIRK2 * paso_t_, lado_derecho_))
+
+        else:
+            U_anterior, U_inicio = registros_
+            # U^n queda en U_inicio hasta que aceptar_paso lo pase a U^(n-1)
+            np.copyto(U_inicio, U_)
+
+            if self._paso_t_anterior is None:
+                X = U_.copy()
+                iteraciones.append(self.resolver(X, U_, paso_t_, lado_derecho_))
+            else:
+                # BDF2 con paso variable, w = dt_n / dt_(n-1):
+                # U^(n+1) - (1+w)^2/(1+2w) U^n + w^2/(1+2w) U^(n-1) = (1+w)/(1+2w) dt F(U^(n+1))
+                w = paso_t_ / self._paso_t_anterior
+                R = ( 1.0 + w )**2 / ( 1.0 + 2.0 * w ) * U_ - w**2 / ( 1.0 + 2.0 * w ) * U_anterior
+                X = U_ + w * ( U_ - U_anterior )
+                iteraciones.append(self.resolver(X, R, ( 1.0 + w ) / ( 1.0 + 2.0 * w ) * paso_t_, lado_derecho_))
+
+        convergio = all(etapa[2] for etapa in iteraciones)
+        self.historial.append({
+            'paso_t': paso_t_,
+            'newton': sum(etapa[0] for etapa in iteraciones),
+            'krylov': sum(etapa[1] for etapa in iteraciones),
+            'convergio': convergio,
+        })
+
+        # si Newton no converge U_ queda sin cambios e integrar repite el paso con uno menor
+        if convergio:
+            np.copyto(U_, X)
+        return convergio
+
+    def aceptar_paso(self, paso_t_, registros_):
+        '''
+        Llamada por paso_de_tiempo.integrar despues de cada paso aceptado: avanza la historia de
+        BDF2, U^(n-1) <- U^n y el paso anterior <- paso_t_.
+        '''
+        if self.nombre == 'bdf2':
+            U_anterior, U_inicio = registros_
+            np.copyto(U_anterior, U_inicio)
+            self._paso_t_anterior = paso_t_
+
+    def historia(self):
+        '''
+        Estado del integrador entre pasos que no esta en los registros, para los puntos de control.
+        '''
+        return {'paso_t_anterior': self._paso_t_anterior}
+
+    def restaurar_historia(self, historia_):
+        '''
+        Recupera el estado guardado con historia(), al reanudar desde un punto de control.
+        '''
+        self._paso_t_anterior = historia_.get('paso_t_anterior')
+
+    def resumen(self):
+        '''
+        Pasos, pasos sin convergencia e iteraciones de Newton y de Krylov totales y por paso.
+        '''
+        pasos = len(self.historial)
+        newton = sum(paso['newton'] for paso in self.historial)
+        krylov = sum(paso['krylov'] for paso in self.historial)
+        return {
+            'pasos': pasos,
+            'sin_convergencia': sum(not paso['convergio'] for paso in self.historial),
+            'newton': newton,
+            'krylov': krylov,
+            'newton_por_paso': newton / max(pasos, 1),
+            'krylov_por_newton': krylov / max(newton, 1),
+        }
+
+def comparar_con_explicito(N_elementos_=200, N_nodos_=3, t_total_=2.0, factores_cfl_=(1.0, 10.0, 30.0), metodos_=METODOS):
+    '''
+    Compara los integradores implicitos con pasos factores_cfl_ veces el limite de ssp_rk3 contra
+    la solucion de ssp_rk3 en su limite CFL. Imprime pasos, iteraciones, tiempo y diferencia L∞ de h.
+    '''
+    malla = simulacion.generar_malla(0.0, 10.0, N_elementos_, N_nodos_)
+    h, u = simulacion.condiciones_iniciales_gaussianas(malla)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+    cfl_explicito = paso_de_tiempo.obtener_integrador('ssp_rk3').cfl
+
+    referencia = estado.EstadoConservativo.desde_primitivas(h, u)
+    inicio = time.perf_counter()
+    reporte = paso_de_tiempo.integrar(referencia, operador.evaluate_conservative, t_total_, malla, 'ssp_rk3')
+    print(f'{"ssp_rk3":>16} {"x1":>5} {reporte["pasos"]:>6} pasos {"":>28} {time.perf_counter() - inicio:8.3f} s')
+
+    for metodo in metodos_:
+        for factor in factores_cfl_:
+            integrador = IntegradorImplicito(matriz_de_masa_inversa, matriz_de_rigidez, metodo, cfl_=factor * cfl_explicito)
+            estado_ = estado.EstadoConservativo.desde_primitivas(h, u)
+            inicio = time.perf_counter()
+            reporte = paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, t_total_, malla, integrador)
+            segundos = time.perf_counter() - inicio
+            resumen = integrador.resumen()
+            diferencia = np.max(np.abs(estado_.h - referencia.h))
+            print(f'{metodo:>16} {"x" + format(factor, "g"):>5} {reporte["pasos"]:>6} pasos {resumen["newton_por_paso"]:6.2f} Newton/paso {resumen["krylov_por_newton"]:6.2f} Krylov/Newton {segundos:8.3f} s  |h - h_ref| = {diferencia:.2e}')
+
+if __name__ == '__main__':
+    comparar_con_explicito()
@@ -0,0 +1,202 @@
+'''
+Instrumentacion opcional de las etapas del solucionador: tiempo de pared, numero de llamadas,
+bytes reservados por etapa y pasos por segundo.
+
+Desactivada (por defecto) cada etapa es un contexto vacio compartido, asi que el costo es una
+llamada a funcion. Activada, cada etapa acumula su tiempo y numero de llamadas y, si se pide,
+los bytes reservados (el pico de memoria sobre el nivel de entrada, medido con tracemalloc) y
+un evento en una linea de tiempo con el formato de Chrome trace (chrome://tracing o Perfetto).
+Los tiempos de etapas anidadas son inclusivos.
+
+medir repite una funcion y resume sus tiempos; la usan rendimiento.py y
+operador_global.comparar_rendimiento.
+
+Ejemplo:
+    with instrumentacion.perfilar(memoria_=True) as registro:
+        paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, t_total, malla)
+    print(registro.resumen())
+    registro.guardar_linea_de_tiempo('linea_de_tiempo.json')
+
+    @instrumentacion.instrumentar('graficos')
+    def plot_simulation(...): ...
+'''
+import contextlib
+import functools
+import json
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+
+class Registro:
+    '''
+    Estadisticas acumuladas de una sesion de instrumentacion.
+
+    Parámetros:
+        linea_de_tiempo_ (bool): Guarda un evento por llamada para la linea de tiempo.
+        memoria_ (bool): Mide los bytes reservados por etapa con tracemalloc (lento).
+    '''
+
+    def __init__(self, linea_de_tiempo_=True, memoria_=False):
+        self.linea_de_tiempo = linea_de_tiempo_
+        self.memoria = memoria_
+        self.etapas = {}   # nombre -> [llamadas, tiempo total (ns), bytes reservados]
+        self.eventos = []
+        self.pasos = 0
+        self.inicio = time.perf_counter_ns()
+        self.fin = None
+        self._pila_de_memoria = []
+        self._detener_tracemalloc = False
+
+    def _entrar(self):
+        if self.memoria:
+            actual, pico = tracemalloc.get_traced_memory()
+            if self._pila_de_memoria:
+                self._pila_de_memoria[-1][1] = max(self._pila_de_memoria[-1][1], pico)
+            tracemalloc.reset_peak()
+            self._pila_de_memoria.append([actual, 0])
+        return time.perf_counter_ns()
+
+    def _salir(self, nombre_, inicio_):
+        fin = time.perf_counter_ns()
+        etapa = self.etapas.setdefault(nombre_, [0, 0, 0])
+        etapa[0] += 1
+        etapa[1] += fin - inicio_
+
+        if self.memoria:
+            # el pico de la etapa incluye los picos de sus etapas hijas, que reiniciaron el contador
+            entrada, pico_hijas = self._pila_de_memoria.pop()
+            pico = max(tracemalloc.get_traced_memory()[1], pico_hijas)
+            etapa[2] += pico - entrada
+            if self._pila_de_memoria:
+                self._pila_de_memoria[-1][1] = max(self._pila_de_memoria[-1][1], pico)
+
+        if self.linea_de_tiempo:
+            self.eventos.append((nombre_, inicio_, fin - inicio_, threading.get_ident()))
+
+    def duracion(self):
+        '''
+        Tiempo de pared de la sesion (s).
+        '''
+        return ( ( self.fin or time.perf_counter_ns() ) - self.inicio ) * 1e-9
+
+    def resumen(self):
+        '''
+        Tabla con llamadas, tiempo total, tiempo por llamada, fraccion del tiempo de la sesion y
+        bytes reservados por etapa, ordenada por tiempo total, y los pasos por segundo.
+        '''
+        duracion = self.duracion()
+        lineas = [f'{"etapa":>16} {"llamadas":>10} {"total (s)":>12} {"por llamada (us)":>18} {"% sesion":>9} {"bytes":>14}']
+        for nombre, (llamadas, total, reservado) in sorted(self.etapas.items(), key=lambda etapa: -etapa[1][1]):
+            bytes_reservados = f'{reservado:14d}' if self.memoria else f'{"-":>14}'
+            lineas.append(f'{nombre:>16} {llamadas:>10} {total * 1e-9:12.4f} {total * 1e-3 / llamadas:18.2f} {100 * total * 1e-9 / duracion:9.1f} {bytes_reservados}')
+        lineas.append(f'duracion = {duracion:.4f} s, pasos = {self.pasos}, pasos/s = {self.pasos / duracion:.2f}')
+        return '\n'.join(lineas)
+
+    def guardar_linea_de_tiempo(self, camino_):
+        '''
+        Guarda los eventos en formato JSON de Chrome trace, con tiempos en microsegundos desde el
+        inicio de la sesion.
+        '''
+        pid = os.getpid()
+        eventos = [{'name': nombre, 'ph': 'X', 'ts': ( inicio - self.inicio ) * 1e-3, 'dur': duracion * 1e-3, 'pid': pid, 'tid': tid}
+                   for nombre, inicio, duracion, tid in self.eventos]
+        with open(camino_, 'w') as archivo:
+            json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, archivo)
+
+# registro de la sesion activa, None si la instrumentacion esta desactivada
+_registro = None
+_NULO = contextlib.nullcontext()
+
+class _Etapa:
+
+    __slots__ = ('nombre', 'inicio')
+
+    def __init__(self, nombre_):
+        self.nombre = nombre_
+
+    def __enter__(self):
+        self.inicio = _registro._entrar()
+        return self
+
+    def __exit__(self, *excepcion):
+        _registro._salir(self.nombre, self.inicio)
+
+def etapa(nombre_):
+    '''
+    Contexto que mide la etapa nombre_ si la instrumentacion esta activa y no hace nada si no.
+    '''
+    return _NULO if _registro is None else _Etapa(nombre_)
+
+def instrumentar(nombre_):
+    '''
+    Decorador que mide cada llamada a la funcion como la etapa nombre_.
+    '''
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if _registro is None:
+                return funcion(*args, **kwargs)
+            with _Etapa(nombre_):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+def contar_paso():
+    '''
+    Cuenta un paso de tiempo aceptado para los pasos por segundo.
+    '''
+    if _registro is not None:
+        _registro.pasos += 1
+
+def activar(linea_de_tiempo_=True, memoria_=False):
+    '''
+    Empieza una nueva sesion de instrumentacion y retorna su Registro.
+    '''
+    global _registro
+    iniciar_tracemalloc = memoria_ and not tracemalloc.is_tracing()
+    if iniciar_tracemalloc:
+        tracemalloc.start()
+    _registro = Registro(linea_de_tiempo_, memoria_)
+    _registro._detener_tracemalloc = iniciar_tracemalloc
+    return _registro
+
+def desactivar():
+    '''
+    Termina la sesion activa y retorna su Registro, o None si no habia una.
+    '''
+    global _registro
+    registro, _registro = _registro, None
+    if registro is not None:
+        registro.fin = time.perf_counter_ns()
+        if registro._detener_tracemalloc:
+            tracemalloc.stop()
+    return registro
+
+@contextlib.contextmanager
+def perfilar(linea_de_tiempo_=True, memoria_=False):
+    '''
+    Contexto que activa la instrumentacion y la desactiva al salir. Entrega el Registro.
+    '''
+    registro = activar(linea_de_tiempo_, memoria_)
+    try:
+        yield registro
+    finally:
+        desactivar()
+
+def medir(funcion_, tiempo_minimo_=0.2, repeticiones_minimas_=3):
+    '''
+    Mide el tiempo de funcion_() despues de una llamada de calentamiento, repitiendo hasta
+    acumular tiempo_minimo_ segundos y al menos repeticiones_minimas_ llamadas.
+
+    Retorna:
+        dict: Mediana y minimo de los tiempos (s) y numero de repeticiones.
+    '''
+    funcion_()
+    tiempos = []
+    while len(tiempos) < repeticiones_minimas_ or sum(tiempos) < tiempo_minimo_:
+        inicio = time.perf_counter()
+        funcion_()
+        tiempos.append(time.perf_counter() - inicio)
+    return {'mediana': statistics.median(tiempos), 'minimo': min(tiempos), 'repeticiones': len(tiempos)}
@@ -0,0 +1,234 @@
+'''
+Limitadores aplicados despues de cada etapa del integrador (paso_de_tiempo.integrar con
+limitador_), para correr frentes empinados y zonas casi secas sin reducir el paso de tiempo ni
+refinar la malla:
+
+    tvb          limitador de pendiente minmod TVB de Cockburn y Shu: un elemento es problematico
+                 si el salto de su traza respecto de su promedio no es el que da minmod con las
+                 diferencias de promedios de los vecinos (salvo saltos menores que M dx^2); su
+                 solucion se reemplaza por la lineal con la pendiente limitada
+    positividad  limitador de Zhang y Shu: en cada elemento la solucion se contrae hacia su
+                 promedio, U <- U_promedio + theta (U - U_promedio), con el mayor theta en [0, 1]
+                 que deja h >= epsilon en los nodos y en los puntos de cuadratura
+    seco         en los nodos con altura menor que profundidad_seca se anula hu, para que la
+                 velocidad hu / h de una capa casi seca no limite el paso de tiempo
+
+Los promedios y las pendientes de cada elemento se calculan con la cuadratura de Gauss-Legendre y
+los elementos problematicos se detectan con mascaras sobre todos los elementos a la vez, sin
+bucles de Python por elemento. Los tres limitadores conservan el promedio de h de cada elemento
+(el limitador seco no conserva hu). Los limitadores se aplican a cada variable conservativa por
+separado y aceptan lotes de forma (2, B, N_elementos, N_nodos).
+
+Ejemplo:
+    limitador = limitadores.Limitador(malla)
+    paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, t_total, malla, limitador_=limitador)
+
+Uso:
+    python limitadores.py
+'''
+import functools
+import time
+
+import numpy as np
+
+import bases
+import estado
+import instrumentacion
+import paso_de_tiempo
+import precision
+import simulacion
+
+@functools.lru_cache(maxsize=32)
+def operadores_del_limitador(N_nodos_, familia_='equiespaciados'):
+    '''
+    Vectores y matrices de referencia del limitador, con los valores nodales de cada elemento
+    como vector fila:
+
+        promedio = U @ promedio             promedio del elemento
+        pendiente = U @ pendiente           coeficiente c1 de la parte lineal c0 + c1 xi (xi en [-1, 1])
+        U @ evaluacion                      valores en los puntos de cuadratura
+
+    Retorna:
+        tuple: (promedio (N_nodos,), pendiente (N_nodos,), evaluacion (N_nodos, N_nodos + 1), nodos (N_nodos,)).
+    '''
+    nodos = bases.nodos_de_referencia(N_nodos_, familia_)
+    cuadratura, pesos = bases.cuadratura_de_gauss_legendre(N_nodos_ + 1)
+    evaluacion = bases.evaluar_base_baricentrica(nodos, cuadratura)
+    promedio = 0.5 * evaluacion @ pesos
+    pendiente = 1.5 * evaluacion @ ( pesos * cuadratura )
+    for array in (promedio, pendiente, evaluacion):
+        array.setflags(write=False)
+    return promedio, pendiente, evaluacion, nodos
+
+def minmod(a_, b_, c_):
+    '''
+    minmod(a, b, c): el de menor valor absoluto si los tres tienen el mismo signo, si no cero.
+    '''
+    signo = np.sign(a_)
+    mismo_signo = ( signo == np.sign(b_) ) & ( signo == np.sign(c_) )
+    return np.where(mismo_signo, signo * np.minimum(np.minimum(np.abs(a_), np.abs(b_)), np.abs(c_)), 0.0)
+
+class Limitador:
+    '''
+    Limitador de un bloque conservativo sobre una malla, aplicado en el lugar: limitador(U).
+
+    Parámetros:
+        malla_ (numpy.ndarray): Coordenadas de los nodos, forma (N_elementos, N_nodos).
+        familia_ (str): Familia de nodos de la malla.
+        tvb_ (bool): Aplica el limitador de pendiente minmod TVB.
+        positividad_ (bool): Aplica el limitador de positividad de Zhang y Shu y anula hu en los
+            nodos secos.
+        M_ (float): Constante TVB: los saltos menores que M dx^2 no se limitan, lo que evita
+            recortar los extremos suaves. Su escala es la de la segunda derivada de la solucion;
+            con M_ = 0 el limitador es TVD.
+        epsilon_ (float): Altura minima (m) que el limitador de positividad garantiza en los
+            elementos cuyo promedio es mayor que epsilon_.
+        profundidad_seca_ (float): Altura (m) bajo la cual un nodo se considera seco.
+
+    Atributos:
+        elementos_limitados (int): Elementos modificados por el limitador TVB o de positividad en
+            todas las llamadas, sumando las variables conservativas.
+    '''
+
+    def __init__(self, malla_, familia_='equiespaciados', tvb_=True, positividad_=True, M_=1.0, epsilon_=1e-8, profundidad_seca_=1e-4):
+        N_nodos = malla_.shape[1]
+        promedio, pendiente, evaluacion, nodos = operadores_del_limitador(N_nodos, familia_)
+        # la malla siempre es float64; los operadores del limitador usan la precision actual
+        dtype = precision.tipo_de_dato()
+        self.promedio = promedio.astype(dtype)
+        self.pendiente = pendiente.astype(dtype)
+        self.nodos = nodos.astype(dtype)
+
+        # valores en los puntos de control de positividad (nodos y puntos de cuadratura) con los
+        # elementos como columnas: el minimo sobre el primer eje es mucho mas rapido que sobre
+        # el eje corto de los nodos
+        self.puntos_de_control_T = np.ascontiguousarray(np.hstack((np.eye(N_nodos), evaluacion)).T, dtype=dtype)
+
+        # cuadrado del umbral M dx^2 de cada elemento
+        self.umbral_tvb_2 = ( ( M_ * ( malla_[:, -1] - malla_[:, 0] )**2 )**2 ).astype(dtype)
+        self.tvb = tvb_ and N_nodos > 1
+        self.positividad = positividad_
+        self.epsilon = epsilon_
+        self.profundidad_seca = profundidad_seca_
+        self.elementos_limitados = 0
+
+    def __call__(self, U_):
+        with instrumentacion.etapa('limitador'):
+            # ningun limitador cambia los promedios de h y hu (salvo hu en los nodos secos, que
+            # se anula al final), de modo que se calculan una sola vez
+            promedio = U_ @ self.promedio
+            if self.tvb:
+                self.limitar_pendiente(U_, promedio)
+            if self.positividad:
+                self.limitar_positividad(U_, promedio)
+        return U_
+
+    def limitar_pendiente(self, U_, promedio_=None):
+        '''
+        Limitador minmod TVB en el lugar sobre h y hu. En las paredes la diferencia de promedios
+        que falta se reemplaza por la del unico vecino.
+
+        Retorna:
+            numpy.ndarray: Mascara de los elementos limitados, forma (2, [B,] N_elementos).
+        '''
+        promedio = U_ @ self.promedio if promedio_ is None else promedio_
+
+        # diferencias de promedios hacia la derecha y hacia la izquierda
+        diferencia = np.diff(promedio, axis=-1)
+        adelante = np.concatenate((diferencia, diferencia[..., -1:]), axis=-1)
+        atras = np.concatenate((diferencia[..., :1], diferencia), axis=-1)
+
+        # un salto a de la traza respecto del promedio cambia con minmod TVB si |a| > M dx^2 y
+        # no es a la vez del signo de ambas diferencias b, c y menor en valor absoluto, es decir
+        # si a^2 > (M dx^2)^2 y (a b < a^2 o a c < a^2)
+        problematico = np.zeros(promedio.shape, dtype=bool)
+        for salto in (U_[..., -1] - promedio, promedio - U_[..., 0]):
+            salto_2 = salto * salto
+            problematico |= ( salto_2 > self.umbral_tvb_2 ) & ( ( salto * adelante < salto_2 ) | ( salto * atras < salto_2 ) )
+
+        if np.any(problematico):
+            pendiente_limitada = minmod(U_ @ self.pendiente, adelante, atras)
+            lineal = promedio[..., None] + pendiente_limitada[..., None] * self.nodos
+            np.copyto(U_, lineal, where=problematico[..., None])
+            self.elementos_limitados += int(np.count_nonzero(problematico))
+        return problematico
+
+    def limitar_positividad(self, U_, promedio_=None):
+        '''
+        Limitador de positividad de Zhang y Shu en el lugar, con el mismo theta para h y hu, y
+        hu = 0 en los nodos secos.
+
+        Retorna:
+            numpy.ndarray: Mascara de los elementos contraidos, forma ([B,] N_elementos).
+        '''
+        h, hu = U_[0], U_[1]
+        promedio_h, promedio_hu = U_ @ self.promedio if promedio_ is None else promedio_
+        minimo_h = np.min(self.puntos_de_control_T @ np.swapaxes(h, -1, -2), axis=-2)
+
+        # theta = (promedio - delta) / (promedio - minimo), con delta = min(epsilon, promedio);
+        # los elementos con promedio no positivo no se pueden corregir conservando la masa y
+        # se dejan al rechazo de pasos de integrar
+        delta = np.minimum(self.epsilon, promedio_h)
+        contraer = ( minimo_h < delta ) & ( promedio_h > 0.0 )
+        if np.any(contraer):
+            theta = np.ones_like(promedio_h)
+            np.divide(promedio_h - delta, promedio_h - minimo_h, out=theta, where=contraer)
+            theta = theta[..., None]
+            h -= promedio_h[..., None]
+            h *= theta
+            h += promedio_h[..., None]
+            hu -= promedio_hu[..., None]
+            hu *= theta
+            hu += promedio_hu[..., None]
+            self.elementos_limitados += int(np.count_nonzero(contraer))
+
+        # nodos secos: hu = 0, para que la velocidad hu / h no crezca sin limite donde h ~ epsilon
+        seco = h < self.profundidad_seca
+        if np.any(seco):
+            hu[seco] = 0.0
+        return contraer
+
+def _rotura_de_presa(malla_, h_izquierda_=1.0, h_derecha_=1e-3, posicion_=5.0):
+    # rotura de presa: columna de agua a la izquierda de posicion_ sobre una capa casi seca
+    h = np.where(malla_ < posicion_, h_izquierda_, h_derecha_)
+    return h, malla_ * 0.0
+
+def comparar_con_y_sin_limitador(N_elementos_=(50, 200), N_nodos_=3, t_total_=1.0, cfls_=(0.3, 0.9), h_derecha_=1e-3, solucionador_riemann_='hll', max_rechazos_=10):
+    '''
+    Corre la rotura de presa sobre una capa casi seca sin limitador y con positividad y TVB, e
+    imprime para cada malla y numero CFL si la corrida termino, los pasos tomados y rechazados, la
+    altura minima, el exceso sobre la altura inicial maxima (oscilaciones de Gibbs), el tiempo por
+    paso y los elementos limitados. El solucionador por defecto es HLL porque el limitador de
+    positividad supone un flujo numerico que preserva la positividad de los promedios.
+
+    El limitador de positividad solo no basta en este problema: las oscilaciones en el frente
+    dejan nodos con h ~ epsilon y hu grande, y el paso de tiempo CFL se vuelve muy pequeño.
+    '''
+    print(f'{"limitador":>18} {"E":>5} {"cfl":>5} {"termino":>8} {"pasos":>6} {"rechazos":>9} {"h minima":>10} {"exceso h":>10} {"ms/paso":>9} {"limitados":>10}')
+    for N_elementos in N_elementos_:
+        malla = simulacion.generar_malla(0.0, 10.0, N_elementos, N_nodos_)
+        matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+        operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez, solucionador_riemann_)
+        h_inicial, u_inicial = _rotura_de_presa(malla, h_derecha_=h_derecha_)
+        for cfl in cfls_:
+            for nombre, limitador in (('sin limitador', None), ('positividad + tvb', Limitador(malla))):
+                estado_ = estado.EstadoConservativo.desde_primitivas(h_inicial, u_inicial)
+                if limitador is not None:
+                    limitador(estado_.datos)
+                inicio = time.perf_counter()
+                try:
+                    # sin limitador los pasos rechazados producen desbordes, que no son un error aqui
+                    with np.errstate(over='ignore', invalid='ignore'):
+                        reporte = paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, t_total_, malla, cfl_=cfl, max_rechazos_=max_rechazos_, limitador_=limitador)
+                except RuntimeError:
+                    reporte = None
+                segundos = time.perf_counter() - inicio
+                limitados = 0 if limitador is None else limitador.elementos_limitados
+                if reporte is None:
+                    print(f'{nombre:>18} {N_elementos:>5} {cfl:5.2f} {"no":>8} {"-":>6} {max_rechazos_ + 1:>9} {"-":>10} {"-":>10} {"-":>9} {limitados:>10}')
+                else:
+                    print(f'{nombre:>18} {N_elementos:>5} {cfl:5.2f} {"si":>8} {reporte["pasos"]:>6} {reporte["pasos_rechazados"]:>9} {np.min(estado_.h):10.2e} '
+                          f'{np.max(estado_.h) - np.max(h_inicial):10.2e} {1e3 * segundos / reporte["pasos"]:9.3f} {limitados:>10}')
+
+if __name__ == '__main__':
+    comparar_con_y_sin_limitador()
@@ -0,0 +1,318 @@
+'''
+Operador global ensamblado de Galerkin discontinuo: el lado derecho semi-discreto linealizado
+como una sola matriz dispersa de scipy.sparse.
+
+El lado derecho F(U) se linealiza alrededor de un estado congelado U0:
+
+    F(U) ~ J U + b,    b = F(U0) - J U0
+
+J incluye los vectores de rigidez con el jacobiano del flujo fisico en cada nodo, el flujo
+numerico en cada frontera con la matriz de disipacion (|A| de Roe o la velocidad maxima de
+Rusanov) congelada en U0, el termino de presion de las paredes y la matriz de masa inversa. El
+lado derecho es entonces un solo producto matriz-vector. En U0 el resultado es el de
+RHSOperator; lejos de U0 es una aproximacion de primer orden, asi que J se reensambla cada
+paso (o cada cierto numero de pasos, si el estado cambia lentamente).
+
+J es el jacobiano con disipacion congelada, no el jacobiano exacto dF/dU (U0): del flujo
+numerico F = 0.5 (f_L + f_R) - 0.5 D (U_R - U_L) se deriva todo salvo D, de modo que falta el
+termino 0.5 dD/dU (U_R - U_L). J solo es exacto en estados continuos en las fronteras
+(U_R = U_L); el error es proporcional a los saltos entre elementos. Comparado con diferencias
+finitas de RHSOperator, el error relativo de J v es de 1e-10 a 1e-8 en estados suaves (saltos
+del tamaño del error de discretizacion) y de 1e-2 con un salto de h en una frontera. Para un
+metodo implicito esto es un Newton inexacto (converge mas lento cerca de discontinuidades), y
+los valores propios de J son los del problema con disipacion congelada.
+
+Las incognitas se ordenan por elemento, (elemento, variable, nodo), de modo que J es
+tridiagonal por bloques con bloques de 2 N_nodos x 2 N_nodos: cada elemento solo se acopla con
+sus dos vecinos. J tambien sirve para analisis, por ejemplo para un paso de tiempo estable a
+partir de sus valores propios (paso_de_tiempo_por_valores_propios).
+
+Uso:
+    python operador_global.py
+'''
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+import estado
+import instrumentacion
+import paso_de_tiempo
+import simulacion
+import solucionadores_de_riemann
+
+def _disipacion_de_rusanov(h_izquierda, u_izquierda, h_derecha, u_derecha):
+    velocidad_maxima = np.maximum(np.abs(u_izquierda) + np.sqrt(solucionadores_de_riemann.GRAVEDAD * h_izquierda), np.abs(u_derecha) + np.sqrt(solucionadores_de_riemann.GRAVEDAD * h_derecha))
+    return velocidad_maxima, 0.0 * velocidad_maxima, 0.0 * velocidad_maxima, velocidad_maxima
+
+# matriz de disipacion congelada de cada solucionador con forma F = 0.5 (f_L + f_R) - 0.5 D (U_R - U_L)
+DISIPACION_CONGELADA = {
+    'roe': solucionadores_de_riemann.matriz_absoluta_de_roe,
+    'rusanov': _disipacion_de_rusanov,
+}
+
+def jacobiano_del_flujo(h_, u_):
+    '''
+    Componentes del jacobiano del flujo fisico A = [[0, 1], [g h - u^2, 2 u]] en cada nodo.
+    '''
+    return np.zeros(h_.shape), np.ones(h_.shape), solucionadores_de_riemann.GRAVEDAD * h_ - u_**2, 2.0 * u_
+
+def a_vector(U_):
+    '''
+    Reordena un estado conservativo (2, N_elementos, N_nodos) en el vector global ordenado por elemento.
+    '''
+    return np.ascontiguousarray(U_.transpose(1, 0, 2)).reshape(-1)
+
+def desde_vector(vector_, shape_, out_=None):
+    '''
+    Reordena un vector global en un estado conservativo de forma shape_ = (2, N_elementos, N_nodos).
+    '''
+    por_elemento = vector_.reshape(shape_[1], 2, shape_[2]).transpose(1, 0, 2)
+    if out_ is None:
+        return np.ascontiguousarray(por_elemento)
+    np.copyto(out_, por_elemento)
+    return out_
+
+def _derivadas_del_flujo_numerico(h_, u_, solucionador_riemann_):
+
+    # dF/dU_L y dF/dU_R de F = 0.5 (f_L + f_R) - 0.5 D (U_R - U_L) con D congelada, en cada frontera interior
+    try:
+        disipacion = DISIPACION_CONGELADA[solucionador_riemann_]
+    except KeyError:
+        raise ValueError(f'El operador global no soporta el solucionador {solucionador_riemann_!r}. Opciones: {sorted(DISIPACION_CONGELADA)}') from None
+
+    h_izquierda, u_izquierda, h_derecha, u_derecha = h_[:-1, -1], u_[:-1, -1], h_[1:, 0], u_[1:, 0]
+    D = np.array(disipacion(h_izquierda, u_izquierda, h_derecha, u_derecha)).reshape(2, 2, -1)
+    A_izquierda = np.array(jacobiano_del_flujo(h_izquierda, u_izquierda)).reshape(2, 2, -1)
+    A_derecha = np.array(jacobiano_del_flujo(h_derecha, u_derecha)).reshape(2, 2, -1)
+    return 0.5 * ( A_izquierda + D ), 0.5 * ( A_derecha - D )
+
+def _masa_inversa_densa(matriz_de_masa_inversa_):
+    if np.ndim(matriz_de_masa_inversa_) == 1:
+        return np.diag(matriz_de_masa_inversa_)
+    return np.asarray(matriz_de_masa_inversa_)
+
+def ensamblar_jacobiano(U_, matriz_de_masa_inversa_, matriz_de_rigidez_, solucionador_riemann_='roe'):
+    '''
+    Ensambla el jacobiano con disipacion congelada J en el estado U_ (exacto solo si U_ es
+    continuo en las fronteras) como matriz CSR tridiagonal por bloques.
+
+    Parámetros:
+        U_ (numpy.ndarray): Estado conservativo congelado, forma (2, N_elementos, N_nodos).
+        matriz_de_masa_inversa_ (numpy.ndarray): Forma (N_nodos, N_nodos), o (N_nodos,) si es diagonal.
+        matriz_de_rigidez_ (numpy.ndarray): Forma (N_nodos, N_nodos).
+        solucionador_riemann_ (str): 'roe' o 'rusanov'.
+
+    Retorna:
+        scipy.sparse.csr_matrix: J de forma (2 N_elementos N_nodos, 2 N_elementos N_nodos).
+    '''
+    _, N_elementos, N_nodos = U_.shape
+    h = U_[0]
+    u = estado.calcular_velocidad(U_[0], U_[1])
+    dF_dU = _derivadas_del_flujo_numerico(h, u, solucionador_riemann_)
+
+    # la matriz de masa inversa se aplica a cada (elemento, variable): una contribucion c al
+    # residual en el nodo k se convierte en la columna M^-1[:, k] c de la derivada temporal
+    masa_inversa = _masa_inversa_densa(matriz_de_masa_inversa_)
+    masa_inversa_por_rigidez = masa_inversa @ matriz_de_rigidez_
+
+    # indice global de (elemento, variable, nodo)
+    indice = np.arange(2 * N_elementos * N_nodos).reshape(N_elementos, 2, N_nodos)
+    filas, columnas, valores = [], [], []
+
+    # volumen: dU/dt[e, r] = sum_c M^-1 S diag(A_rc(e)) U[e, c]
+    A = np.array(jacobiano_del_flujo(h, u)).reshape(2, 2, N_elementos, N_nodos)
+    for r in range(2):
+        for c in range(2):
+            filas.append(np.broadcast_to(indice[:, r, :, None], (N_elementos, N_nodos, N_nodos)).ravel())
+            columnas.append(np.broadcast_to(indice[:, c, None, :], (N_elementos, N_nodos, N_nodos)).ravel())
+            valores.append(( masa_inversa_por_rigidez[None, :, :] * A[r, c][:, None, :] ).ravel())
+
+    # fronteras interiores: el flujo numerico se resta en el ultimo nodo del elemento izquierdo
+    # y se suma en el primero del derecho
+    columna_del_lado = ( indice[:-1, :, -1], indice[1:, :, 0] )
+    for elementos, nodo, signo in ((slice(None, -1), -1, -1.0), (slice(1, None), 0, 1.0)):
+        for r in range(2):
+            for c in range(2):
+                for lado in range(2):
+                    filas.append(np.broadcast_to(indice[elementos, r, :], (N_elementos - 1, N_nodos)).ravel())
+                    columnas.append(np.repeat(columna_del_lado[lado][:, c], N_nodos))
+                    valores.append(( signo * dF_dU[lado][r, c][:, None] * masa_inversa[None, :, nodo] ).ravel())
+
+    # paredes reflejantes: +0.5 g h^2 en el primer nodo y -0.5 g h^2 en el ultimo
+    filas += [indice[0, 1, :], indice[-1, 1, :]]
+    columnas += [np.repeat(indice[0, 0, 0], N_nodos), np.repeat(indice[-1, 0, -1], N_nodos)]
+    valores += [solucionadores_de_riemann.GRAVEDAD * h[0, 0] * masa_inversa[:, 0], - solucionadores_de_riemann.GRAVEDAD * h[-1, -1] * masa_inversa[:, -1]]
+
+    n = 2 * N_elementos * N_nodos
+    return scipy.sparse.csr_matrix((np.concatenate(valores), (np.concatenate(filas), np.concatenate(columnas))), shape=(n, n))
+
+def bloques_diagonales_del_jacobiano(U_, matriz_de_masa_inversa_, matriz_de_rigidez_, solucionador_riemann_='roe'):
+    '''
+    Bloques diagonales de J, el acoplamiento de cada elemento consigo mismo, sin ensamblar J.
+
+    Retorna:
+        numpy.ndarray: Forma (N_elementos, 2 N_nodos, 2 N_nodos), con filas y columnas ordenadas
+        por (variable, nodo) como en el vector global.
+    '''
+    _, N_elementos, N_nodos = U_.shape
+    h = U_[0]
+    u = estado.calcular_velocidad(U_[0], U_[1])
+    dF_dU_izquierda, dF_dU_derecha = _derivadas_del_flujo_numerico(h, u, solucionador_riemann_)
+    masa_inversa = _masa_inversa_densa(matriz_de_masa_inversa_)
+
+    # volumen: M^-1 S diag(A_rc(e))
+    A = np.array(jacobiano_del_flujo(h, u)).reshape(2, 2, N_elementos, N_nodos)
+    # bloques[e, r, i, c, j] = (M^-1 S)[i, j] A_rc(e, j)
+    bloques = ( masa_inversa @ matriz_de_rigidez_ )[None, None, :, None, :] * A.transpose(2, 0, 1, 3)[:, :, None, :, :]
+
+    # flujo numerico con el propio estado: -dF/dU_L en el ultimo nodo, +dF/dU_R en el primero
+    bloques[:-1, :, :, :, -1] -= dF_dU_izquierda.transpose(2, 0, 1)[:, :, None, :] * masa_inversa[None, None, :, -1, None]
+    bloques[1:, :, :, :, 0] += dF_dU_derecha.transpose(2, 0, 1)[:, :, None, :] * masa_inversa[None, None, :, 0, None]
+
+    # paredes reflejantes
+    bloques[0, 1, :, 0, 0] += solucionadores_de_riemann.GRAVEDAD * h[0, 0] * masa_inversa[:, 0]
+    bloques[-1, 1, :, 0, -1] -= solucionadores_de_riemann.GRAVEDAD * h[-1, -1] * masa_inversa[:, -1]
+
+    return bloques.reshape(N_elementos, 2 * N_nodos, 2 * N_nodos)
+
+class OperadorGlobalEnsamblado:
+    '''
+    Lado derecho linealizado F(U) = J U + b ensamblado como matriz dispersa, con la misma
+    interfaz lado_derecho(U, out) que RHSOperator.evaluate_conservative.
+
+    Parámetros:
+        malla_ (numpy.ndarray): Coordenadas de los nodos, forma (N_elementos, N_nodos).
+        matriz_de_masa_inversa_ (numpy.ndarray): Inversa de la matriz de masa.
+        matriz_de_rigidez_ (numpy.ndarray): Matriz de rigidez.
+        solucionador_riemann_ (str): 'roe' o 'rusanov'.
+        reensamblar_cada_n_pasos_ (int): Pasos entre ensamblados con al_final_del_paso.
+
+    Ejemplo:
+        operador = OperadorGlobalEnsamblado(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+        operador.ensamblar(estado_.datos)
+        paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, t_total, malla,
+                                al_final_del_paso_=operador.al_final_del_paso)
+    '''
+
+    def __init__(self, malla_, matriz_de_masa_inversa_, matriz_de_rigidez_, solucionador_riemann_='roe', reensamblar_cada_n_pasos_=1):
+
+        self.shape = (2,) + malla_.shape
+        self.matriz_de_masa_inversa = matriz_de_masa_inversa_
+        self.matriz_de_rigidez = matriz_de_rigidez_
+        self.solucionador_riemann = solucionador_riemann_
+        self.reensamblar_cada_n_pasos = reensamblar_cada_n_pasos_
+
+        # el lado derecho exacto, para el termino independiente b = F(U0) - J U0
+        self.operador_exacto = paso_de_tiempo.RHSOperator(malla_, matriz_de_masa_inversa_, matriz_de_rigidez_, solucionador_riemann_)
+        self.matriz = None
+        self.termino_independiente = None
+        self._vector = np.empty(np.prod(self.shape))
+
+    def ensamblar(self, U_):
+        '''
+        Congela el estado U_ y ensambla J y b.
+        '''
+        self.matriz = ensamblar_jacobiano(U_, self.matriz_de_masa_inversa, self.matriz_de_rigidez, self.solucionador_riemann)
+        self.termino_independiente = a_vector(self.operador_exacto.evaluate_conservative(U_)) - self.matriz @ a_vector(U_)
+        return self.matriz
+
+    def evaluate_conservative(self, U, out=None):
+        '''
+        Calcula dU/dt = J U + b con un producto matriz-vector disperso.
+        '''
+        if self.matriz is None:
+            self.ensamblar(U)
+        self._vector[:] = a_vector(U)
+        dU_dt = self.matriz @ self._vector
+        dU_dt += self.termino_independiente
+        return desde_vector(dU_dt, self.shape, out)
+
+    def al_final_del_paso(self, numero_de_paso_, t_, estado_):
+        '''
+        Funcion para el argumento al_final_del_paso_ de paso_de_tiempo.integrar: reensambla J y b
+        en el estado actual cada reensamblar_cada_n_pasos_ pasos.
+        '''
+        if numero_de_paso_ % self.reensamblar_cada_n_pasos == 0:
+            self.ensamblar(estado_.datos)
+
+def valores_propios(matriz_, n_valores_=None):
+    '''
+    Valores propios de J. Con n_valores_ = None se calculan todos con un algoritmo denso; si no,
+    solo los n_valores_ de mayor modulo con scipy.sparse.linalg.eigs (para matrices grandes).
+    '''
+    if n_valores_ is None:
+        return np.linalg.eigvals(matriz_.toarray())
+    return scipy.sparse.linalg.eigs(matriz_, k=n_valores_, which='LM', return_eigenvectors=False)
+
+def factor_de_amplificacion(z_, integrador_):
+    '''
+    Factor de amplificacion R(z) de un integrador registrado, obtenido dando un paso de
+    tamaño 1 sobre la ecuacion y' = z y con y(0) = 1 para cada z del array complejo z_.
+    '''
+    z = np.asarray(z_, dtype=complex)
+    y = np.ones(z.shape, dtype=complex)
+    registros = [np.empty(z.shape, dtype=complex) for _ in range(paso_de_tiempo.obtener_integrador(integrador_).n_registros)]
+    paso_de_tiempo.obtener_integrador(integrador_)(y, lambda y_, out: np.multiply(z, y_, out=out), 1.0, registros)
+    return y
+
+def paso_de_tiempo_por_valores_propios(valores_propios_, integrador_='ssp_rk3', paso_t_maximo_=1.0, tolerancia_=1e-10, iteraciones_=60):
+    '''
+    Mayor paso de tiempo dt tal que |R(dt lambda)| <= max(1, |exp(dt lambda)|) para todos los
+    valores propios lambda de J, buscado por biseccion entre 0 y paso_t_maximo_. Los modos con
+    parte real positiva (crecimiento fisico del estado linealizado, o de redondeo) pueden crecer
+    tanto como la solucion exacta, pero no mas.
+
+    Retorna:
+        float: El paso de tiempo estable del integrador.
+    '''
+    def estable(paso_t):
+        z = paso_t * np.asarray(valores_propios_)
+        return np.all(np.abs(factor_de_amplificacion(z, integrador_)) <= np.maximum(1.0, np.exp(z.real)) + tolerancia_)
+
+    if estable(paso_t_maximo_):
+        return paso_t_maximo_
+    inferior, superior = 0.0, paso_t_maximo_
+    for _ in range(iteraciones_):
+        medio = 0.5 * ( inferior + superior )
+        if estable(medio):
+            inferior = medio
+        else:
+            superior = medio
+    return inferior
+
+def comparar_rendimiento(N_elementos_=(10, 100, 1000, 10000, 100000), N_nodos_=(2, 4, 8), tiempo_minimo_=0.2):
+    '''
+    Compara el lado derecho sin matriz (RHSOperator) con el ensamblado (un producto disperso) en
+    varias mallas, incluyendo el costo de ensamblar, e imprime el camino mas rapido para cada
+    configuracion en dos usos: reensamblando cada paso de ssp_rk3 (el ensamblado se amortiza sobre
+    3 etapas) y con el estado congelado (la matriz se reutiliza y solo cuenta el producto).
+
+    Retorna:
+        list: Un diccionario por configuracion con los tiempos (s).
+    '''
+    n_etapas = 3
+    resultados = []
+    print(f'{"E":>8} {"N":>3} {"sin matriz (ms)":>16} {"producto (ms)":>14} {"ensamblado (ms)":>16} {"no ceros":>10} {"cada paso":>12} {"congelado":>12}')
+    for N_nodos in N_nodos_:
+        for N_elementos in N_elementos_:
+            malla = simulacion.generar_malla(0.0, 10.0, N_elementos, N_nodos)
+            h, u = simulacion.condiciones_iniciales_gaussianas(malla)
+            U = estado.EstadoConservativo.desde_primitivas(h, u + 0.01).datos
+            matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+
+            sin_matriz = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+            ensamblado = OperadorGlobalEnsamblado(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+            out = np.empty(U.shape)
+
+            tiempo_sin_matriz = instrumentacion.medir(lambda: sin_matriz.evaluate_conservative(U, out), tiempo_minimo_)['mediana']
+            tiempo_ensamblado = instrumentacion.medir(lambda: ensamblado.ensamblar(U), tiempo_minimo_)['mediana']
+            tiempo_producto = instrumentacion.medir(lambda: ensamblado.evaluate_conservative(U, out), tiempo_minimo_)['mediana']
+
+            cada_paso = 'ensamblado' if tiempo_producto + tiempo_ensamblado / n_etapas < tiempo_sin_matriz else 'sin matriz'
+            congelado = 'ensamblado' if tiempo_producto < tiempo_sin_matriz else 'sin matriz'
+            print(f'{N_elementos:>8} {N_nodos:>3} {tiempo_sin_matriz * 1e3:16.4f} {tiempo_producto * 1e3:14.4f} {tiempo_ensamblado * 1e3:16.4f} {ensamblado.matriz.nnz:>10} {cada_paso:>12} {congelado:>12}')
+            resultados.append({'N_elementos': N_elementos, 'N_nodos': N_nodos, 'sin_matriz': tiempo_sin_matriz, 'producto': tiempo_producto, 'ensamblado': tiempo_ensamblado, 'cada_paso': cada_paso, 'congelado': congelado})
+    return resultados
+
+if __name__ == '__main__':
+    comparar_rendimiento()
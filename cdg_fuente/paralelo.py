@@ -0,0 +1,203 @@
+'''
+Descomposicion de dominio en memoria compartida para simulaciones con muchos elementos.
+
+El esquema de Galerkin discontinuo solo acopla elementos vecinos a traves de los valores en las
+fronteras, h[n][-1] y h[n+1][0]. Por eso el array de elementos se divide en bloques contiguos, uno
+por proceso. El estado conservativo vive en multiprocessing.shared_memory y cada proceso avanza su
+bloque en el lugar. En cada etapa del integrador cada proceso publica los nodos extremos de su
+bloque (el halo de un nodo de sus vecinos), espera en una barrera y lee los nodos de sus vecinos.
+Los halos usan dos juegos de lugares que se alternan entre etapas, asi que basta una barrera por
+etapa. El paso de tiempo adaptativo usa una reduccion del maximo de la velocidad de onda.
+
+Como cada nodo recibe las mismas operaciones en el mismo orden que en paso_de_tiempo.integrar, el
+resultado es identico bit a bit al de la ejecucion en serie (mientras no haya pasos rechazados,
+que el integrador en paralelo no implementa).
+
+Uso:
+    python paralelo.py [N_elementos] [N_nodos]
+'''
+import multiprocessing
+import multiprocessing.shared_memory
+import sys
+import time
+
+import numpy as np
+
+import estado
+import paso_de_tiempo
+import simulacion
+
+# lugares del halo de cada proceso: h y hu del primer nodo y h y hu del ultimo nodo de su bloque
+LUGARES_DE_HALO = 4
+
+def dividir_elementos(N_elementos_, n_procesos_):
+    '''
+    Limites [inicio, fin) de los bloques contiguos de elementos de cada proceso.
+    '''
+    limites = np.linspace(0, N_elementos_, n_procesos_ + 1).round().astype(int)
+    return list(zip(limites[:-1], limites[1:]))
+
+def _abrir_array(nombre_, shape_, dtype_=float):
+    memoria = multiprocessing.shared_memory.SharedMemory(name=nombre_)
+    return memoria, np.ndarray(shape_, dtype=dtype_, buffer=memoria.buf)
+
+def _trabajador(indice_, limites_, nombres_, shape_, dtype_, n_procesos_, malla_, matriz_de_masa_inversa_, matriz_de_rigidez_, t_total_, integrador_, paso_t_, cfl_, solucionador_, barrera_, cola_):
+
+    # las vistas de la memoria compartida se borran antes de cerrarla; existen desde el inicio para
+    # que un error al abrirla no se reemplace por un NameError en finally
+    memorias = []
+    U = halos = reduccion = bloque = None
+    try:
+        memoria, U = _abrir_array(nombres_['estado'], shape_, dtype_)
+        memorias.append(memoria)
+        memoria, halos = _abrir_array(nombres_['halos'], (2, n_procesos_, LUGARES_DE_HALO), dtype_)
+        memorias.append(memoria)
+        # la reduccion usa el tipo del estado para que dt se calcule igual que en serie
+        memoria, reduccion = _abrir_array(nombres_['reduccion'], (2, n_procesos_), dtype_)
+        memorias.append(memoria)
+
+        inicio, fin = limites_
+        bloque = U[:, inicio:fin]
+        malla_bloque = malla_[inicio:fin]
+        operador = paso_de_tiempo.RHSOperator(malla_bloque, matriz_de_masa_inversa_, matriz_de_rigidez_, solucionador_, longitud_de_referencia_=malla_[0][-1] - malla_[0][0])
+
+        integrador = paso_de_tiempo.obtener_integrador(integrador_)
+        cfl = integrador.cfl if cfl_ is None else cfl_
+        registros = paso_de_tiempo.crear_registros(integrador_, bloque.shape, dtype_)
+        dx_minimo = np.min(malla_[:, -1] - malla_[:, 0])
+
+        paridad_de_etapa = [0]
+
+        def lado_derecho(U_etapa, out):
+            # publica los nodos extremos del bloque en los lugares de esta paridad
+            lugares = halos[paridad_de_etapa[0], indice_]
+            lugares[0], lugares[1] = U_etapa[0, 0, 0], U_etapa[1, 0, 0]
+            lugares[2], lugares[3] = U_etapa[0, -1, -1], U_etapa[1, -1, -1]
+            barrera_.wait()
+
+            # lee el ultimo nodo del vecino izquierdo y el primer nodo del vecino derecho
+            # como arrays de un elemento, para que el flujo en la frontera entre bloques use las
+            # mismas operaciones de arrays que en la ejecucion en serie
+            halo_izquierdo = None if indice_ == 0 else np.array(halos[paridad_de_etapa[0], indice_ - 1, 2:4])[:, None]
+            halo_derecho = None if indice_ == n_procesos_ - 1 else np.array(halos[paridad_de_etapa[0], indice_ + 1, 0:2])[:, None]
+            paridad_de_etapa[0] ^= 1
+
+            return operador.evaluate_conservative(U_etapa, out, (halo_izquierdo, halo_derecho))
+
+        historial_dt = []
+        t = 0.0
+        while t < t_total_ * ( 1.0 - 1e-12 ):
+
+            if paso_t_ is not None:
+                paso_t = paso_t_
+            else:
+                # reduccion del maximo de la velocidad de onda entre todos los bloques
+                paridad_de_paso = len(historial_dt) % 2
+                reduccion[paridad_de_paso, indice_] = paso_de_tiempo.velocidad_maxima_de_onda(bloque)
+                barrera_.wait()
+                paso_t = paso_de_tiempo.paso_de_tiempo_cfl(dx_minimo, malla_.shape[1], np.max(reduccion[paridad_de_paso]), cfl)
+            paso_t = float(min(paso_t, t_total_ - t))
+
+            integrador(bloque, lado_derecho, paso_t, registros)
+
+            t += paso_t
+            historial_dt.append(paso_t)
+
+        # todos los bloques terminan antes de que el proceso principal lea el estado
+        barrera_.wait()
+        if indice_ == 0:
+            cola_.put({'integrador': integrador_, 'pasos': len(historial_dt), 'pasos_rechazados': 0, 't_final': t, 'historial_dt': historial_dt})
+
+    except BaseException:
+        # libera a los demas procesos que esperan en la barrera
+        barrera_.abort()
+        raise
+    finally:
+        del bloque, U, halos, reduccion
+        for memoria in memorias:
+            memoria.close()
+
+def integrar_en_paralelo(estado_, malla_, matriz_de_masa_inversa_, matriz_de_rigidez_, t_total_, n_procesos_, integrador_='ssp_rk3', paso_t_=None, cfl_=None, solucionador_='roe'):
+    '''
+    Evoluciona en el lugar un EstadoConservativo desde t = 0 hasta t_total_ repartiendo los
+    elementos en n_procesos_ bloques contiguos que avanzan en procesos separados.
+
+    Los parametros tienen el mismo significado que en paso_de_tiempo.integrar.
+
+    Retorna:
+        dict: Reporte con los pasos tomados, el tiempo final y el historial de dt.
+    '''
+    shape, dtype = estado_.datos.shape, estado_.datos.dtype
+    if len(shape) != 3:
+        raise ValueError('integrar_en_paralelo no acepta lotes de casos')
+    if not 1 <= n_procesos_ <= shape[1]:
+        raise ValueError(f'n_procesos_ debe estar entre 1 y N_elementos = {shape[1]}')
+
+    contexto = multiprocessing.get_context()
+    memorias = {
+        'estado': multiprocessing.shared_memory.SharedMemory(create=True, size=estado_.datos.nbytes),
+        'halos': multiprocessing.shared_memory.SharedMemory(create=True, size=2 * n_procesos_ * LUGARES_DE_HALO * dtype.itemsize),
+        'reduccion': multiprocessing.shared_memory.SharedMemory(create=True, size=2 * n_procesos_ * dtype.itemsize),
+    }
+    try:
+        U = np.ndarray(shape, dtype=dtype, buffer=memorias['estado'].buf)
+        U[...] = estado_.datos
+        nombres = {llave: memoria.name for llave, memoria in memorias.items()}
+
+        barrera = contexto.Barrier(n_procesos_)
+        cola = contexto.Queue()
+        procesos = [contexto.Process(target=_trabajador, args=(indice, limites, nombres, shape, dtype, n_procesos_, malla_, matriz_de_masa_inversa_, matriz_de_rigidez_, t_total_, integrador_, paso_t_, cfl_, solucionador_, barrera, cola))
+                    for indice, limites in enumerate(dividir_elementos(shape[1], n_procesos_))]
+        for proceso in procesos:
+            proceso.start()
+
+        # el reporte se lee antes de join para no bloquear al proceso que lo escribe
+        reporte = None
+        while reporte is None and any(proceso.is_alive() for proceso in procesos):
+            try:
+                reporte = cola.get(timeout=0.1)
+            except Exception:
+                continue
+        if reporte is None and not cola.empty():
+            reporte = cola.get()
+        for proceso in procesos:
+            proceso.join()
+
+        if reporte is None or any(proceso.exitcode != 0 for proceso in procesos):
+            raise RuntimeError(f'Un proceso de la descomposicion de dominio fallo: codigos de salida {[proceso.exitcode for proceso in procesos]}')
+
+        estado_.datos[...] = U
+        del U
+        return reporte
+
+    finally:
+        for memoria in memorias.values():
+            memoria.close()
+            memoria.unlink()
+
+def medir_escalamiento(N_elementos_=100000, N_nodos_=4, t_total_=0.01, procesos_=(1, 2, 4, 8), integrador_='ssp_rk3'):
+    '''
+    Escalamiento fuerte: tiempo de integrar_en_paralelo con cada numero de procesos para la
+    perturbacion gaussiana de main.py, y comparacion bit a bit con paso_de_tiempo.integrar.
+    '''
+    malla = simulacion.generar_malla(0, 10, N_elementos_, N_nodos_)
+    h, u = simulacion.condiciones_iniciales_gaussianas(malla)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+
+    serie = estado.EstadoConservativo.desde_primitivas(h, u)
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+    inicio = time.perf_counter()
+    reporte = paso_de_tiempo.integrar(serie, operador.evaluate_conservative, t_total_, malla, integrador_)
+    tiempo_serie = time.perf_counter() - inicio
+
+    print(f'{N_elementos_} elementos, {N_nodos_} nodos, {reporte["pasos"]} pasos, serie: {tiempo_serie:.3f} s')
+    print(f'{"procesos":>9} {"tiempo (s)":>11} {"aceleracion":>12} {"identico":>9}')
+    for n_procesos in procesos_:
+        paralelo = estado.EstadoConservativo.desde_primitivas(h, u)
+        inicio = time.perf_counter()
+        integrar_en_paralelo(paralelo, malla, matriz_de_masa_inversa, matriz_de_rigidez, t_total_, n_procesos, integrador_)
+        tiempo = time.perf_counter() - inicio
+        print(f'{n_procesos:>9} {tiempo:11.3f} {tiempo_serie / tiempo:12.2f} {str(np.array_equal(paralelo.datos, serie.datos)):>9}')
+
+if __name__ == '__main__':
+    medir_escalamiento(*(int(argumento) for argumento in sys.argv[1:3]))
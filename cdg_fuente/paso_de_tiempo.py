@@ -1,13 +1,19 @@
+import estado
 import galerkin_discontinuo
+import instrumentacion
+import solucionadores_de_riemann
 import numpy as np
+import precision
 
-def calcular_vector_residual(h__, u__, matriz_de_rigidez__):
+def calcular_vector_residual(h__, u__, matriz_de_rigidez__, solucionador_riemann__='roe'):
     
     # computing stiffness vectors
-    stiffness_vector_1_, stiffness_vector_2_ = galerkin_discontinuo.compute_stiffness_vectors(h__, u__, matriz_de_rigidez__)
+    with instrumentacion.etapa('volumen'):
+        stiffness_vector_1_, stiffness_vector_2_ = galerkin_discontinuo.compute_stiffness_vectors(h__, u__, matriz_de_rigidez__)
 
     # computing numerical flux
-    numerical_flux_vector_1_, numerical_flux_vector_2_ = galerkin_discontinuo.compute_numerical_flux_vectors(h__, u__)
+    with instrumentacion.etapa('flujo'):
+        numerical_flux_vector_1_, numerical_flux_vector_2_ = galerkin_discontinuo.compute_numerical_flux_vectors(h__, u__, solucionador_riemann__)
 
     # computing residual vector
     residual_vector_1_ = stiffness_vector_1_ - numerical_flux_vector_1_
@@ -15,27 +21,466 @@ def calcular_vector_residual(h__, u__, matriz_de_rigidez__):
 
     return residual_vector_1_, residual_vector_2_
 
-def compute_dhdt_du_dt(_h, _u, _matriz_de_rigidez, _matriz_de_masa_inversa):
+def compute_dhdt_du_dt(_h, _u, _matriz_de_rigidez, _matriz_de_masa_inversa, _solucionador_riemann='roe'):
 
-    _N_elementos, _N_nodos = _h.shape
+    vector_residual_1, vector_residual_2 = calcular_vector_residual(_h, _u, _matriz_de_rigidez, _solucionador_riemann)
 
-    vector_residual_1, vector_residual_2 = calcular_vector_residual(_h, _u, _matriz_de_rigidez)
-
-    d1U_dt = np.zeros((_N_elementos, _N_nodos))
-    d2U_dt = np.zeros((_N_elementos, _N_nodos))
-
-    for i in range(_N_elementos):
-        d1U_dt[i] = _matriz_de_masa_inversa @ vector_residual_1[i]
-        d2U_dt[i] = _matriz_de_masa_inversa @ vector_residual_2[i]
-
-    # inicializando los valores de dh/dt y du/dt
-    dh_dt = np.zeros((_N_elementos, _N_nodos))
-    du_dt = np.zeros((_N_elementos, _N_nodos))
+    # aplicando la matriz de masa inversa a todos los elementos a la vez: fila i es M^-1 @ r[i]
+    with instrumentacion.etapa('masa'):
+        d1U_dt = galerkin_discontinuo.aplicar_inversa_matriz_de_masa(vector_residual_1, _matriz_de_masa_inversa)
+        d2U_dt = galerkin_discontinuo.aplicar_inversa_matriz_de_masa(vector_residual_2, _matriz_de_masa_inversa)
 
     # calculando la derivada temporal de h y u
     # ... Escribe aqui dh_dt y du_dt ...
     # ... recuerda que 1U=h y 2U=hu por lo que du_dt = ( d2U_dt - u * dh_dt ) / h ...
     dh_dt = d1U_dt
-    du_dt = np.where( _h == 0 , 0 , ( d2U_dt - _u * dh_dt ) / _h )
+    with instrumentacion.etapa('primitivas'):
+        du_dt = np.where( _h == 0 , 0 , ( d2U_dt - _u * dh_dt ) / _h )
 
     return dh_dt, du_dt
+
+class RHSOperator:
+    '''
+    Operador reutilizable del lado derecho de las ecuaciones semi-discretas. Hace el mismo
+    calculo que compute_dhdt_du_dt, pero es construido una sola vez a partir de la malla y de
+    las matrices de masa inversa y de rigidez, y guarda los arrays de trabajo de forma
+    (N_elementos, N_nodos) para que cada evaluacion no reserve memoria del tamaño del estado.
+
+    Los elementos pueden tener longitudes distintas: las matrices son las de un elemento de
+    longitud longitud_de_referencia_ (por defecto la del primer elemento de la malla) y la
+    derivada temporal de cada elemento se escala por longitud_de_referencia / longitud_elemento,
+    el cociente de los jacobianos, sin reconstruir las matrices. La matriz de rigidez no depende
+    de la longitud del elemento y la de masa inversa es proporcional a 1 / longitud_elemento.
+
+    Con n_casos_ = B el operador evalua un lote de B simulaciones independientes con la misma
+    malla, guardadas con un eje inicial de lote: (B, N_elementos, N_nodos) en evaluate y
+    (2, B, N_elementos, N_nodos) en evaluate_conservative.
+
+    Parámetros:
+        malla_ (numpy.ndarray): Coordenadas de los nodos, forma (N_elementos, N_nodos).
+        matriz_de_masa_inversa_ (numpy.ndarray): Inversa de la matriz de masa, forma (N_nodos, N_nodos),
+            o su diagonal de forma (N_nodos,) en el modo de colocacion de Gauss-Lobatto.
+        matriz_de_rigidez_ (numpy.ndarray): Matriz de rigidez, forma (N_nodos, N_nodos).
+        solucionador_riemann_ (str): Nombre del solucionador de Riemann registrado.
+        n_casos_ (int): Opcional, numero de casos del lote.
+        longitud_de_referencia_ (float): Opcional, longitud del elemento con la que se
+            construyeron las matrices, por ejemplo si la malla es un bloque de otra mas grande.
+
+    Ejemplo:
+        operador = RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+        dh_dt, du_dt = operador.evaluate((h, u), (dh_dt, du_dt))
+        dU_dt = operador.evaluate_conservative(estado.datos, dU_dt)
+    '''
+
+    def __init__(self, malla_, matriz_de_masa_inversa_, matriz_de_rigidez_, solucionador_riemann_='roe', n_casos_=None, longitud_de_referencia_=None):
+
+        self.shape = malla_.shape if n_casos_ is None else (n_casos_,) + malla_.shape
+        # tipo de punto flotante de los operadores: los arrays de trabajo y las derivadas lo siguen
+        self.dtype = precision.tipo_de(matriz_de_masa_inversa_, matriz_de_rigidez_)
+
+        # escala de cada elemento, forma (N_elementos, 1); None si todos tienen la longitud de
+        # referencia. Las longitudes son diferencias de coordenadas redondeadas, con un error de
+        # unos eps |x|: una malla uniforme se reconoce con esa tolerancia relativa, eps max|x| / dx
+        longitudes = np.asarray(malla_[:, -1], dtype=np.float64) - malla_[:, 0]
+        escala = ( longitudes[0] if longitud_de_referencia_ is None else longitud_de_referencia_ ) / longitudes
+        tolerancia = 4.0 * np.finfo(malla_.dtype).eps * np.max(np.abs(malla_)) / np.min(longitudes)
+        self.escala_por_elemento = None if np.all(np.abs(escala - 1.0) <= tolerancia) else escala[:, None].astype(self.dtype)
+
+        # las matrices se aplican por la derecha a todos los elementos: r @ M^-1.T y f @ S.T
+        self.matriz_de_masa_inversa = matriz_de_masa_inversa_
+        self.matriz_de_rigidez_T = np.ascontiguousarray(matriz_de_rigidez_.T)
+
+        self.flujo_numerico = solucionadores_de_riemann.obtener_solucionador(solucionador_riemann_)
+
+        # arrays de trabajo reutilizados en cada evaluacion
+        self._hu = np.empty(self.shape, dtype=self.dtype)
+        self._u = np.empty(self.shape, dtype=self.dtype)
+        self._flujo_2 = np.empty(self.shape, dtype=self.dtype)
+        self._temporal = np.empty(self.shape, dtype=self.dtype)
+        self._residual_1 = np.empty(self.shape, dtype=self.dtype)
+        self._residual_2 = np.empty(self.shape, dtype=self.dtype)
+        self._mojado = np.empty(self.shape, dtype=bool)
+        self._seco = np.empty(self.shape, dtype=bool)
+        # arrays de trabajo del solucionador de Riemann en las fronteras interiores, de modo que
+        # ninguna evaluacion reserva memoria del tamaño del estado o de las fronteras
+        self._trabajo_del_flujo = solucionadores_de_riemann.crear_trabajo(self.shape[:-2] + (self.shape[-2] - 1,), self.dtype)
+
+    def _derivadas_conservativas(self, h, hu, u, d1U_dt, d2U_dt, halo_izquierdo=None, halo_derecho=None):
+
+        with instrumentacion.etapa('volumen'):
+            # flujos fisicos en los nodos: f1 = hu y f2 = hu u + 0.5 g h^2
+            np.multiply(hu, u, out=self._flujo_2)
+            np.multiply(h, h, out=self._temporal)
+            self._temporal *= 0.5 * solucionadores_de_riemann.GRAVEDAD
+            self._flujo_2 += self._temporal
+
+            # vectores de rigidez de todos los elementos: S @ f[n] para cada n es f @ S.T
+            np.matmul(hu, self.matriz_de_rigidez_T, out=self._residual_1)
+            np.matmul(self._flujo_2, self.matriz_de_rigidez_T, out=self._residual_2)
+
+        with instrumentacion.etapa('flujo'):
+            self._flujos_en_fronteras(h, u, halo_izquierdo, halo_derecho)
+
+        # d1U/dt y d2U/dt con un solo producto (o escalado, si es diagonal) por la matriz de masa inversa
+        with instrumentacion.etapa('masa'):
+            galerkin_discontinuo.aplicar_inversa_matriz_de_masa(self._residual_1, self.matriz_de_masa_inversa, d1U_dt)
+            galerkin_discontinuo.aplicar_inversa_matriz_de_masa(self._residual_2, self.matriz_de_masa_inversa, d2U_dt)
+            if self.escala_por_elemento is not None:
+                d1U_dt *= self.escala_por_elemento
+                d2U_dt *= self.escala_por_elemento
+
+    def _flujos_en_fronteras(self, h, u, halo_izquierdo, halo_derecho):
+
+        # flujo numerico en las fronteras interiores, restado del lado derecho de cada elemento
+        # y sumado en el lado izquierdo del elemento siguiente
+        flujo_1, flujo_2 = self.flujo_numerico(h[..., :-1, -1], u[..., :-1, -1], h[..., 1:, 0], u[..., 1:, 0], self._trabajo_del_flujo)
+        self._residual_1[..., :-1, -1] -= flujo_1
+        self._residual_1[..., 1:, 0] += flujo_1
+        self._residual_2[..., :-1, -1] -= flujo_2
+        self._residual_2[..., 1:, 0] += flujo_2
+
+        # en los extremos del array: flujo numerico con el nodo vecino (halo) si el array es un
+        # bloque de un dominio mas grande, o pared reflejante en los limites del dominio, donde
+        # solo el termino de presion sobrevive
+        if halo_izquierdo is None:
+            self._residual_2[..., 0, 0] += 0.5 * solucionadores_de_riemann.GRAVEDAD * h[..., 0, 0]**2
+        else:
+            flujo_1, flujo_2 = self.flujo_numerico(halo_izquierdo[0], halo_izquierdo[1], h[..., :1, 0], u[..., :1, 0])
+            self._residual_1[..., :1, 0] += flujo_1
+            self._residual_2[..., :1, 0] += flujo_2
+        if halo_derecho is None:
+            self._residual_2[..., -1, -1] -= 0.5 * solucionadores_de_riemann.GRAVEDAD * h[..., -1, -1]**2
+        else:
+            flujo_1, flujo_2 = self.flujo_numerico(h[..., -1:, -1], u[..., -1:, -1], halo_derecho[0], halo_derecho[1])
+            self._residual_1[..., -1:, -1] -= flujo_1
+            self._residual_2[..., -1:, -1] -= flujo_2
+
+    def _dividir_por_altura(self, numerador, h, out):
+
+        # out = numerador / h, igual a cero donde h == 0
+        np.not_equal(h, 0, out=self._mojado)
+        np.divide(numerador, h, out=out, where=self._mojado)
+        np.logical_not(self._mojado, out=self._seco)
+        np.copyto(out, 0.0, where=self._seco)
+
+    def evaluate(self, state, out=None):
+        '''
+        Calcula dh/dt y du/dt para el estado primitivo (h, u) y los escribe en
+        out = (dh_dt, du_dt). Si out no es dado se reservan dos arrays nuevos.
+        '''
+        h, u = state
+        if out is None:
+            out = (np.empty(self.shape, dtype=self.dtype), np.empty(self.shape, dtype=self.dtype))
+        dh_dt, du_dt = out
+
+        with instrumentacion.etapa('primitivas'):
+            np.multiply(h, u, out=self._hu)
+        self._derivadas_conservativas(h, self._hu, u, dh_dt, self._temporal)
+
+        # du_dt = ( d2U_dt - u * dh_dt ) / h
+        with instrumentacion.etapa('primitivas'):
+            np.multiply(u, dh_dt, out=du_dt)
+            np.subtract(self._temporal, du_dt, out=du_dt)
+            self._dividir_por_altura(du_dt, h, du_dt)
+
+        return dh_dt, du_dt
+
+    def evaluate_conservative(self, U, out=None, halos=None):
+        '''
+        Calcula dU/dt para el bloque conservativo U = [h, hu] de forma (2, N_elementos, N_nodos)
+        (o (2, B, N_elementos, N_nodos) para un lote) y lo escribe en out, con la misma forma. Si out no es dado se reserva un array nuevo.
+        La velocidad se calcula una sola vez por nodo y no se recupera du/dt.
+
+        Si U es un bloque de elementos contiguos de un dominio mas grande, halos = (izquierdo, derecho)
+        da el estado conservativo (h, hu) del nodo vecino a cada lado del bloque, como arrays de
+        forma (..., 1); None en un lado indica que ese extremo es una pared del dominio.
+        '''
+        if out is None:
+            out = np.empty(U.shape, dtype=U.dtype)
+
+        halo_izquierdo, halo_derecho = (None, None) if halos is None else halos
+        with instrumentacion.etapa('primitivas'):
+            if halo_izquierdo is not None:
+                halo_izquierdo = (halo_izquierdo[0], estado.calcular_velocidad(halo_izquierdo[0], halo_izquierdo[1]))
+            if halo_derecho is not None:
+                halo_derecho = (halo_derecho[0], estado.calcular_velocidad(halo_derecho[0], halo_derecho[1]))
+            self._dividir_por_altura(U[1], U[0], self._u)
+        self._derivadas_conservativas(U[0], U[1], self._u, out[0], out[1], halo_izquierdo, halo_derecho)
+
+        return out
+
+def paso_euler_conservativo(estado_, operador_, paso_t_, dU_dt_=None):
+    '''
+    Avanza en el lugar un EstadoConservativo un paso de Euler explicito, actualizando h y hu
+    con una sola operacion sobre el bloque (2, N_elementos, N_nodos).
+
+    Retorna:
+        numpy.ndarray: El array dU_dt usado, para reutilizarlo en el siguiente paso.
+    '''
+    dU_dt_ = operador_.evaluate_conservative(estado_.datos, dU_dt_)
+    dU_dt_ *= paso_t_
+    estado_.datos += dU_dt_
+    return dU_dt_
+
+# registro de integradores temporales explicitos: nombre -> funcion que avanza un paso
+INTEGRADORES = {}
+
+def registrar_integrador(nombre, n_registros, cfl):
+    '''
+    Decorador que agrega un integrador temporal al registro bajo el nombre dado.
+
+    Todo integrador registrado avanza en el lugar el bloque conservativo U un paso de tiempo,
+    usando la funcion lado_derecho(U, out) que escribe dU/dt en out y una lista de n_registros
+    arrays de trabajo con la forma de U:
+
+        integrador(U, lado_derecho, paso_t, registros)
+
+    cfl es el numero CFL por defecto con el que el integrador es estable en la condicion
+    de paso_de_tiempo_estable.
+
+    Los integradores registrados no retornan nada. Un integrador con estado (como
+    implicito.IntegradorImplicito) puede retornar False para rechazar el paso y tener un metodo
+    aceptar_paso(paso_t, registros), que integrar llama despues de cada paso aceptado.
+    '''
+    def decorador(funcion):
+        funcion.n_registros = n_registros
+        funcion.cfl = cfl
+        INTEGRADORES[nombre] = funcion
+        return funcion
+    return decorador
+
+def obtener_integrador(nombre):
+    # un integrador con estado (por ejemplo implicito.IntegradorImplicito) se puede pasar directamente
+    if callable(nombre):
+        return nombre
+    try:
+        return INTEGRADORES[nombre]
+    except KeyError:
+        raise ValueError(f'Integrador temporal desconocido: {nombre!r}. Opciones: {sorted(INTEGRADORES)}') from None
+
+def crear_registros(integrador_, shape_, dtype_=None):
+    '''
+    Reserva los arrays de trabajo que el integrador necesita para un bloque de forma shape_ y
+    tipo dtype_ (por defecto la precision actual).
+    '''
+    dtype = precision.tipo_de_dato() if dtype_ is None else dtype_
+    return [np.empty(shape_, dtype=dtype) for _ in range(obtener_integrador(integrador_).n_registros)]
+
+# Euler explicito no es estable para Galerkin discontinuo con N_nodos > 1 salvo con pasos muy pequeños
+@registrar_integrador('euler', n_registros=1, cfl=0.05)
+def paso_euler(U_, lado_derecho_, paso_t_, registros_):
+    # U = U + dt f(U)
+    k = lado_derecho_(U_, registros_[0])
+    k *= paso_t_
+    U_ += k
+
+@registrar_integrador('ssp_rk2', n_registros=2, cfl=0.3)
+def paso_ssp_rk2(U_, lado_derecho_, paso_t_, registros_):
+    U1, k = registros_
+
+    # U1 = U + dt f(U)
+    lado_derecho_(U_, k)
+    np.multiply(k, paso_t_, out=U1)
+    U1 += U_
+
+    # U = 1/2 U + 1/2 ( U1 + dt f(U1) )
+    lado_derecho_(U1, k)
+    k *= paso_t_
+    U1 += k
+    U_ += U1
+    U_ *= 0.5
+
+@registrar_integrador('ssp_rk3', n_registros=2, cfl=0.9)
+def paso_ssp_rk3(U_, lado_derecho_, paso_t_, registros_):
+    U1, k = registros_
+
+    # U1 = U + dt f(U)
+    lado_derecho_(U_, k)
+    np.multiply(k, paso_t_, out=U1)
+    U1 += U_
+
+    # U2 = 3/4 U + 1/4 ( U1 + dt f(U1) ), guardado en U1
+    lado_derecho_(U1, k)
+    k *= paso_t_
+    U1 += k
+    U1 *= 0.25
+    np.multiply(U_, 0.75, out=k)
+    U1 += k
+
+    # U = 1/3 U + 2/3 ( U2 + dt f(U2) )
+    lado_derecho_(U1, k)
+    k *= paso_t_
+    U1 += k
+    U1 *= 2.0 / 3.0
+    U_ *= 1.0 / 3.0
+    U_ += U1
+
+@registrar_integrador('rk4', n_registros=3, cfl=0.9)
+def paso_rk4(U_, lado_derecho_, paso_t_, registros_):
+    U0, etapa, k = registros_
+
+    # k1 se evalua sobre U antes de copiarlo a U0: un limitador en lado_derecho_ modifica U en el
+    # lugar, y U0 y la suma parten del estado limitado
+    lado_derecho_(U_, k)
+    np.copyto(U0, U_)
+
+    # U = U0 + dt/6 ( k1 + 2 k2 + 2 k3 + k4 ), acumulado directamente en U con etapa como temporal
+    for coeficiente_etapa, coeficiente_suma in ((0.5, 1.0 / 6.0), (0.5, 1.0 / 3.0), (1.0, 1.0 / 3.0)):
+        np.multiply(k, coeficiente_suma * paso_t_, out=etapa)
+        U_ += etapa
+
+        # siguiente etapa: U0 + c dt k
+        np.multiply(k, coeficiente_etapa * paso_t_, out=etapa)
+        etapa += U0
+        lado_derecho_(etapa, k)
+
+    np.multiply(k, paso_t_ / 6.0, out=etapa)
+    U_ += etapa
+
+# coeficientes del esquema de Carpenter y Kennedy de 5 etapas y orden 4 con 2 registros
+LSRK45_A = (0.0, -567301805773.0 / 1357537059087.0, -2404267990393.0 / 2016746695238.0, -3550918686646.0 / 2091501179385.0, -1275806237668.0 / 842570457699.0)
+LSRK45_B = (1432997174477.0 / 9575080441755.0, 5161836677717.0 / 13612068292357.0, 1720146321549.0 / 2090206949498.0, 3134564353537.0 / 4481467310338.0, 2277821191437.0 / 14882151754819.0)
+
+@registrar_integrador('lsrk45', n_registros=2, cfl=1.0)
+def paso_lsrk45(U_, lado_derecho_, paso_t_, registros_):
+    dU, k = registros_
+
+    # forma de Williamson: dU = a dU + dt f(U), U = U + b dU; solo U y dU persisten entre etapas
+    for a, b in zip(LSRK45_A, LSRK45_B):
+        lado_derecho_(U_, k)
+        k *= paso_t_
+        if a == 0.0:
+            np.copyto(dU, k)
+        else:
+            dU *= a
+            dU += k
+        np.multiply(dU, b, out=k)
+        U_ += k
+
+def velocidad_maxima_de_onda(U_):
+    '''
+    Maxima velocidad de onda |u| + sqrt(g h) sobre todos los nodos del bloque conservativo.
+    '''
+    h, hu = U_[0], U_[1]
+    u = np.divide(hu, h, out=np.zeros(h.shape, dtype=h.dtype), where=(h != 0))
+    return np.max(np.abs(u) + np.sqrt(solucionadores_de_riemann.GRAVEDAD * np.maximum(h, 0.0)))
+
+def paso_de_tiempo_estable(U_, malla_, cfl_=0.9):
+    '''
+    Paso de tiempo mas grande permitido por la condicion CFL de Galerkin discontinuo:
+
+        dt = cfl * dx_min / ( (2 p + 1) * max(|u| + sqrt(g h)) ), con p = N_nodos - 1
+
+    Si malla_ no es un array sino una discretizacion con su propio limite CFL, como
+    adaptacion_p.DiscretizacionP, se usa su metodo paso_de_tiempo_estable(U, cfl).
+    '''
+    if hasattr(malla_, 'paso_de_tiempo_estable'):
+        return malla_.paso_de_tiempo_estable(U_, cfl_)
+    dx_minimo = np.min(malla_[:, -1] - malla_[:, 0])
+    return paso_de_tiempo_cfl(dx_minimo, malla_.shape[1], velocidad_maxima_de_onda(U_), cfl_)
+
+def paso_de_tiempo_cfl(dx_minimo_, N_nodos_, velocidad_maxima_, cfl_):
+    '''
+    Formula de paso_de_tiempo_estable a partir del tamaño minimo de elemento y de la maxima
+    velocidad de onda ya calculados, por ejemplo reducidos entre varios procesos.
+    '''
+    orden = N_nodos_ - 1
+    return cfl_ * dx_minimo_ / ( ( 2 * orden + 1 ) * velocidad_maxima_ )
+
+def lado_derecho_desde_compute_dhdt_du_dt(matriz_de_rigidez_, matriz_de_masa_inversa_, solucionador_riemann_='roe'):
+    '''
+    Adapta compute_dhdt_du_dt a la interfaz lado_derecho(U, out) de los integradores:
+    dh/dt y d(hu)/dt = u dh/dt + h du/dt sobre el bloque conservativo.
+    '''
+    def lado_derecho(U_, out_):
+        h = U_[0]
+        u = np.divide(U_[1], h, out=np.zeros(h.shape, dtype=h.dtype), where=(h != 0))
+        dh_dt, du_dt = compute_dhdt_du_dt(h, u, matriz_de_rigidez_, matriz_de_masa_inversa_, solucionador_riemann_)
+        out_[0] = dh_dt
+        out_[1] = u * dh_dt + h * du_dt
+        return out_
+    return lado_derecho
+
+def integrar(estado_, lado_derecho_, t_total_, malla_, integrador_='ssp_rk3', paso_t_=None, cfl_=None, factor_rechazo_=0.5, max_rechazos_=10, al_final_del_paso_=None, t_inicial_=0.0, paso_inicial_=0, registros_=None, limitador_=None):
+    '''
+    Evoluciona en el lugar un EstadoConservativo desde t_inicial_ (por defecto t = 0) hasta t_total_.
+
+    Parámetros:
+        estado_ (EstadoConservativo): Estado inicial, actualizado en el lugar.
+        lado_derecho_ (function): lado_derecho(U, out) que escribe dU/dt en out, por ejemplo
+            RHSOperator.evaluate_conservative o lado_derecho_desde_compute_dhdt_du_dt(...).
+        t_total_ (float): Tiempo final (s).
+        malla_ (numpy.ndarray): Coordenadas de los nodos, usadas para el limite CFL, o una
+            discretizacion con el metodo paso_de_tiempo_estable(U, cfl).
+        integrador_ (str): Nombre del integrador registrado en INTEGRADORES, o un integrador
+            con los atributos nombre, n_registros y cfl, como implicito.IntegradorImplicito. Un
+            paso se rechaza tambien si el integrador retorna False, y si el integrador tiene el
+            metodo aceptar_paso(paso_t, registros) se llama despues de cada paso aceptado.
+        paso_t_ (float): Paso de tiempo fijo. Si es None el paso se ajusta en cada paso
+            al limite CFL de Galerkin discontinuo multiplicado por cfl_.
+        cfl_ (float): Numero CFL del paso adaptativo. Si es None se usa el del integrador.
+        factor_rechazo_ (float): Factor que reduce el paso cuando un paso es rechazado, es decir
+            cuando produce valores no finitos o alturas negativas.
+        al_final_del_paso_ (function): Opcional, al_final_del_paso(numero_de_paso, t, estado)
+            llamada despues de cada paso aceptado.
+        t_inicial_ (float): Tiempo del estado inicial, distinto de cero al reanudar una corrida.
+        paso_inicial_ (int): Numero de pasos ya tomados antes de t_inicial_; la numeracion de
+            los pasos continua desde aqui.
+        registros_ (list): Opcional, registros del integrador creados con crear_registros. Si se
+            dan, el integrador los usa en lugar de crear los suyos (por ejemplo para guardarlos
+            en un punto de control).
+        limitador_ (function): Opcional, limitador(U) que modifica un bloque conservativo en el
+            lugar, como limitadores.Limitador. Se aplica al estado de cada etapa antes de evaluar
+            lado_derecho_ y al resultado de cada paso antes de decidir si se rechaza. Solo con
+            los integradores explicitos de INTEGRADORES.
+
+    Retorna:
+        dict: Reporte con los pasos tomados (contando paso_inicial_), los pasos rechazados, el tiempo final y el historial de dt.
+    '''
+    integrador = obtener_integrador(integrador_)
+    cfl = integrador.cfl if cfl_ is None else cfl_
+    registros = crear_registros(integrador_, estado_.datos.shape, estado_.datos.dtype) if registros_ is None else registros_
+    U_anterior = np.empty_like(estado_.datos)
+
+    # el limitador se aplica en el lugar a la entrada de cada evaluacion del lado derecho, que es
+    # el estado de cada etapa en todos los integradores
+    lado_derecho = lado_derecho_ if limitador_ is None else lambda U, out: lado_derecho_(limitador_(U), out)
+
+    reporte = {'integrador': integrador_ if isinstance(integrador_, str) else integrador_.nombre, 'pasos': paso_inicial_, 'pasos_rechazados': 0, 't_final': t_inicial_, 'historial_dt': []}
+
+    t = t_inicial_
+    while t < t_total_ * ( 1.0 - 1e-12 ):
+
+        with instrumentacion.etapa('cfl'):
+            paso_t = paso_t_ if paso_t_ is not None else paso_de_tiempo_estable(estado_.datos, malla_, cfl)
+            # float de Python: un escalar float64 de numpy promoveria un estado float32
+            paso_t = float(min(paso_t, t_total_ - t))
+
+        with instrumentacion.etapa('paso'):
+            np.copyto(U_anterior, estado_.datos)
+            for _ in range(max_rechazos_ + 1):
+                aceptado = integrador(estado_.datos, lado_derecho, paso_t, registros) is not False
+                if limitador_ is not None:
+                    limitador_(estado_.datos)
+                if aceptado and np.all(np.isfinite(estado_.datos)) and np.min(estado_.datos[0]) > 0.0:
+                    break
+                # paso rechazado: se restaura el estado y se reduce el paso de tiempo
+                reporte['pasos_rechazados'] += 1
+                np.copyto(estado_.datos, U_anterior)
+                paso_t *= factor_rechazo_
+            else:
+                raise RuntimeError(f'El paso en t = {t} fue rechazado {max_rechazos_ + 1} veces')
+            if hasattr(integrador, 'aceptar_paso'):
+                integrador.aceptar_paso(paso_t, registros)
+
+        t += paso_t
+        reporte['pasos'] += 1
+        reporte['historial_dt'].append(paso_t)
+        instrumentacion.contar_paso()
+
+        if al_final_del_paso_ is not None:
+            with instrumentacion.etapa('al_final_del_paso'):
+                al_final_del_paso_(reporte['pasos'], t, estado_)
+
+    reporte['t_final'] = t
+    return reporte
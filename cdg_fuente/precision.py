@@ -0,0 +1,66 @@
+'''
+Precision de punto flotante de las simulaciones: 'float64' (por defecto) o 'float32'.
+
+La precision se elige en los puntos donde se crean los arrays: los operadores
+(simulacion.construir_operadores, calculados en float64 y redondeados al final), las condiciones
+iniciales (simulacion.condiciones_iniciales_gaussianas) y los estados creados desde cero
+(estado.EstadoConservativo.ceros). A partir de ahi cada kernel trabaja en el tipo de sus
+entradas: los estados, los arrays de trabajo de RHSOperator, los registros de los integradores
+y los flujos numericos conservan el tipo de los datos, y los pasos de tiempo se pasan como float
+de Python para que ninguna etapa promueva float32 a float64.
+
+La malla siempre es float64: sus coordenadas no pesan en el ancho de banda, y en float32 las
+longitudes de los elementos de una malla uniforme tendrian ruido de redondeo.
+
+Ejemplo:
+    precision.establecer('float32')
+    malla = simulacion.generar_malla(0.0, 10.0, N_elementos, N_nodos)    # float64
+    h, u = simulacion.condiciones_iniciales_gaussianas(malla)            # float32
+
+    with precision.usar('float32'):
+        ...
+'''
+import contextlib
+
+import numpy as np
+
+PRECISIONES = {'float32': np.float32, 'float64': np.float64}
+
+_tipo = np.float64
+
+def tipo_de_dato():
+    '''
+    Tipo de numpy de la precision actual.
+    '''
+    return _tipo
+
+def establecer(nombre_):
+    '''
+    Cambia la precision de los arrays creados desde ahora y retorna el nombre de la anterior.
+    '''
+    global _tipo
+    try:
+        tipo = PRECISIONES[nombre_]
+    except KeyError:
+        raise ValueError(f'Precision desconocida: {nombre_!r}. Opciones: {sorted(PRECISIONES)}') from None
+    anterior, _tipo = np.dtype(_tipo).name, tipo
+    return anterior
+
+@contextlib.contextmanager
+def usar(nombre_):
+    '''
+    Contexto con la precision nombre_, que restaura la anterior al salir.
+    '''
+    anterior = establecer(nombre_)
+    try:
+        yield
+    finally:
+        establecer(anterior)
+
+def tipo_de(*arrays_):
+    '''
+    Tipo de punto flotante comun de los arrays de numpy dados, o la precision actual si ninguno
+    es un array de punto flotante (por ejemplo listas o escalares de Python).
+    '''
+    flotantes = [array.dtype for array in arrays_ if isinstance(array, (np.ndarray, np.generic)) and np.issubdtype(array.dtype, np.floating)]
+    return np.result_type(*flotantes) if flotantes else np.dtype(_tipo)
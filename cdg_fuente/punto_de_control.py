@@ -0,0 +1,286 @@
+'''
+Puntos de control (checkpoints) para reanudar corridas largas del problema de la perturbacion
+gaussiana sin perder el trabajo hecho.
+
+Un punto de control guarda todo lo necesario para continuar la corrida de forma identica bit a
+bit: el estado conservativo, el tiempo, el numero de paso, los registros del integrador, la
+historia del integrador que no esta en los registros (el paso anterior de BDF2, ver
+implicito.IntegradorImplicito.historia) y el caso (los parametros de ensamble.CASO_POR_DEFECTO
+con los que se reconstruyen la malla y los operadores). caso['integrador'] puede ser un
+integrador de paso_de_tiempo.INTEGRADORES o un metodo de implicito.METODOS. El formato binario es
+compacto y versionado:
+
+    FIRMA (8 bytes) | version (uint16) | largo del encabezado (uint32) | encabezado JSON (utf-8)
+    | datos crudos de cada array, en el orden del encabezado | CRC-32 de todo lo anterior (uint32)
+
+Todos los enteros son little-endian. Cada archivo se escribe en un archivo temporal que se
+sincroniza a disco y luego se renombra, asi que un corte a mitad de escritura nunca deja un
+punto de control incompleto con el nombre final. EscritorDePuntosDeControl escribe desde un hilo
+en segundo plano: el integrador solo se detiene lo que tarda en copiar los arrays.
+
+Uso:
+    python punto_de_control.py correr caso.json directorio [cada_n_pasos]
+    python punto_de_control.py reanudar directorio [cada_n_pasos]
+'''
+import glob
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+
+import numpy as np
+
+import ensamble
+import estado
+import instrumentacion
+import paso_de_tiempo
+import precision
+import simulacion
+
+FIRMA = b'CDGPCTRL'
+VERSION_DEL_FORMATO = 1
+_ENCABEZADO_FIJO = struct.Struct('<HI')
+_SUMA_DE_VERIFICACION = struct.Struct('<I')
+
+def guardar_punto_de_control(camino_, caso_, numero_de_paso_, t_, U_, registros_=(), historia_=None):
+    '''
+    Escribe un punto de control de forma atomica.
+
+    Parámetros:
+        camino_ (str): Archivo de salida.
+        caso_ (dict): Caso completo (ensamble.completar_caso) con el que se reconstruye la corrida.
+        numero_de_paso_ (int): Numero de pasos tomados.
+        t_ (float): Tiempo del estado.
+        U_ (numpy.ndarray): Estado conservativo, forma (2, [B,] N_elementos, N_nodos).
+        registros_ (list): Registros del integrador.
+        historia_ (dict): Opcional, historia del integrador serializable en JSON.
+    '''
+    arrays = [('U', np.ascontiguousarray(U_))] + [(f'registro_{i}', np.ascontiguousarray(registro)) for i, registro in enumerate(registros_)]
+    encabezado = json.dumps({
+        'caso': caso_,
+        'paso': int(numero_de_paso_),
+        't': float(t_),
+        'historia': historia_ or {},
+        'arrays': [{'nombre': nombre, 'dtype': array.dtype.str, 'forma': list(array.shape)} for nombre, array in arrays],
+    }).encode('utf-8')
+
+    suma = 0
+    camino_temporal = camino_ + '.tmp'
+    with open(camino_temporal, 'wb') as archivo:
+        for bloque in [FIRMA, _ENCABEZADO_FIJO.pack(VERSION_DEL_FORMATO, len(encabezado)), encabezado] + [memoryview(array).cast('B') for _, array in arrays]:
+            suma = zlib.crc32(bloque, suma)
+            archivo.write(bloque)
+        archivo.write(_SUMA_DE_VERIFICACION.pack(suma))
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(camino_temporal, camino_)
+
+def cargar_punto_de_control(camino_):
+    '''
+    Lee un punto de control y verifica su firma, version y suma de verificacion.
+
+    Retorna:
+        dict: Llaves 'caso', 'paso', 't', 'U', 'registros' e 'historia'.
+    '''
+    with open(camino_, 'rb') as archivo:
+        contenido = archivo.read()
+
+    if contenido[:len(FIRMA)] != FIRMA:
+        raise ValueError(f'{camino_} no es un punto de control')
+    if len(contenido) < len(FIRMA) + _ENCABEZADO_FIJO.size + _SUMA_DE_VERIFICACION.size:
+        raise ValueError(f'El punto de control {camino_} esta truncado')
+    suma, = _SUMA_DE_VERIFICACION.unpack_from(contenido, len(contenido) - _SUMA_DE_VERIFICACION.size)
+    if zlib.crc32(memoryview(contenido)[:-_SUMA_DE_VERIFICACION.size]) != suma:
+        raise ValueError(f'La suma de verificacion del punto de control {camino_} no coincide')
+
+    version, largo = _ENCABEZADO_FIJO.unpack_from(contenido, len(FIRMA))
+    if version != VERSION_DEL_FORMATO:
+        raise ValueError(f'Version del punto de control {version} no soportada, se esperaba {VERSION_DEL_FORMATO}')
+    inicio = len(FIRMA) + _ENCABEZADO_FIJO.size
+    encabezado = json.loads(contenido[inicio:inicio + largo].decode('utf-8'))
+
+    posicion = inicio + largo
+    arrays = []
+    for descripcion in encabezado['arrays']:
+        dtype = np.dtype(descripcion['dtype'])
+        n_valores = int(np.prod(descripcion['forma']))
+        arrays.append(np.frombuffer(contenido, dtype, n_valores, posicion).reshape(descripcion['forma']).copy())
+        posicion += n_valores * dtype.itemsize
+
+    return {
+        'caso': encabezado['caso'],
+        'paso': encabezado['paso'],
+        't': encabezado['t'],
+        'U': arrays[0],
+        'registros': arrays[1:],
+        'historia': encabezado.get('historia', {}),
+    }
+
+def ultimo_punto_de_control(directorio_):
+    '''
+    Retorna el camino del punto de control con el mayor numero de paso en directorio_, o None.
+    '''
+    caminos = sorted(glob.glob(os.path.join(directorio_, 'punto_*.cdgpc')))
+    return caminos[-1] if caminos else None
+
+class EscritorDePuntosDeControl:
+    '''
+    Escribe puntos de control cada cierto numero de pasos desde un hilo en segundo plano.
+
+    Parámetros:
+        directorio_ (str): Directorio de los puntos de control, se crea si no existe.
+        caso_ (dict): Caso completo de la corrida.
+        registros_ (list): Registros del integrador, los mismos que se pasan a paso_de_tiempo.integrar.
+        cada_n_pasos_ (int): Se escribe un punto de control cada cada_n_pasos_ pasos.
+        mantener_ (int): Numero de puntos de control que se conservan; los mas viejos se borran.
+        integrador_ (object): Opcional, integrador con el metodo historia(), cuyo resultado se
+            guarda con cada punto de control.
+    '''
+
+    def __init__(self, directorio_, caso_, registros_=(), cada_n_pasos_=100, mantener_=2, integrador_=None):
+
+        os.makedirs(directorio_, exist_ok=True)
+        self.directorio = directorio_
+        self.caso = caso_
+        self.registros = registros_
+        self.cada_n_pasos = cada_n_pasos_
+        self.mantener = mantener_
+        self.integrador = integrador_
+
+        # a lo sumo un punto de control espera mientras otro se escribe
+        self._cola = queue.Queue(maxsize=1)
+        self._error = None
+        self._hilo = threading.Thread(target=self._escribir_en_segundo_plano, name='EscritorDePuntosDeControl', daemon=True)
+        self._hilo.start()
+
+    def _escribir_en_segundo_plano(self):
+        try:
+            while True:
+                punto = self._cola.get()
+                if punto is None:
+                    break
+                numero_de_paso, t, U, registros, historia = punto
+                guardar_punto_de_control(os.path.join(self.directorio, f'punto_{numero_de_paso:010d}.cdgpc'), self.caso, numero_de_paso, t, U, registros, historia)
+                for camino in sorted(glob.glob(os.path.join(self.directorio, 'punto_*.cdgpc')))[:-self.mantener]:
+                    os.remove(camino)
+        except BaseException as error:
+            self._error = error
+            # vacia la cola para que el integrador no quede esperando
+            while True:
+                try:
+                    if self._cola.get_nowait() is None:
+                        break
+                except queue.Empty:
+                    break
+
+    def _revisar_error(self):
+        if self._error is not None:
+            raise RuntimeError('El hilo de escritura de puntos de control fallo') from self._error
+
+    def escribir(self, numero_de_paso_, t_, estado_):
+        '''
+        Encola un punto de control del estado (un EstadoConservativo). Solo copia los arrays.
+        '''
+        self._revisar_error()
+        with instrumentacion.etapa('punto_de_control'):
+            historia = self.integrador.historia() if hasattr(self.integrador, 'historia') else {}
+            self._cola.put((numero_de_paso_, t_, estado_.datos.copy(), [registro.copy() for registro in self.registros], historia))
+
+    def al_final_del_paso(self, numero_de_paso_, t_, estado_):
+        '''
+        Funcion para el argumento al_final_del_paso_ de paso_de_tiempo.integrar.
+        '''
+        if numero_de_paso_ % self.cada_n_pasos == 0:
+            self.escribir(numero_de_paso_, t_, estado_)
+
+    def cerrar(self):
+        '''
+        Espera a que el ultimo punto de control encolado se escriba.
+        '''
+        if self._hilo.is_alive():
+            self._cola.put(None)
+            self._hilo.join()
+        self._revisar_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+def _integrar_caso(caso_, estado_, directorio_, cada_n_pasos_, t_inicial_=0.0, paso_inicial_=0, registros_=None, historia_=None):
+
+    malla, matriz_de_masa_inversa, matriz_de_rigidez = ensamble.operadores_en_cache(caso_['x_inicial'], caso_['x_final'], caso_['N_elementos'], caso_['N_nodos'], caso_['familia'])
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez, caso_['solucionador'], estado_.datos.shape[1] if estado_.datos.ndim == 4 else None)
+
+    integrador = caso_['integrador']
+    if integrador not in paso_de_tiempo.INTEGRADORES:
+        # scipy solo se importa para los integradores implicitos
+        import implicito
+        integrador = implicito.IntegradorImplicito(matriz_de_masa_inversa, matriz_de_rigidez, integrador, caso_['solucionador'])
+        if historia_:
+            integrador.restaurar_historia(historia_)
+
+    registros = paso_de_tiempo.crear_registros(integrador, estado_.datos.shape, estado_.datos.dtype)
+    if registros_ is not None:
+        for registro, guardado in zip(registros, registros_):
+            np.copyto(registro, guardado)
+
+    with EscritorDePuntosDeControl(directorio_, caso_, registros, cada_n_pasos_, integrador_=integrador) as escritor:
+        reporte = paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, caso_['t_total'], malla, integrador, caso_['paso_t'], caso_['cfl'],
+                                          al_final_del_paso_=escritor.al_final_del_paso, t_inicial_=t_inicial_, paso_inicial_=paso_inicial_, registros_=registros)
+        # el ultimo estado siempre queda guardado
+        if reporte['pasos'] % cada_n_pasos_ != 0:
+            escritor.escribir(reporte['pasos'], reporte['t_final'], estado_)
+    return estado_, reporte
+
+def correr(caso_, directorio_, cada_n_pasos_=100):
+    '''
+    Ejecuta un caso desde las condiciones iniciales gaussianas guardando puntos de control en
+    directorio_.
+
+    Retorna:
+        tuple: (estado final, reporte de paso_de_tiempo.integrar).
+    '''
+    caso = ensamble.completar_caso(caso_)
+    malla = ensamble.operadores_en_cache(caso['x_inicial'], caso['x_final'], caso['N_elementos'], caso['N_nodos'], caso['familia'])[0]
+    h, u = simulacion.condiciones_iniciales_gaussianas(malla, caso['amplitud'], caso['ancho'], caso['centro'])
+    return _integrar_caso(caso, estado.EstadoConservativo.desde_primitivas(h, u), directorio_, cada_n_pasos_)
+
+def reanudar(camino_, cada_n_pasos_=100, t_total_=None):
+    '''
+    Continua una corrida desde un punto de control. camino_ puede ser un archivo o un directorio,
+    en cuyo caso se usa su ultimo punto de control. El resultado es identico bit a bit al de la
+    corrida sin interrupciones.
+
+    Parámetros:
+        t_total_ (float): Opcional, nuevo tiempo final para extender la corrida.
+
+    Retorna:
+        tuple: (estado final, reporte de paso_de_tiempo.integrar).
+    '''
+    directorio = camino_ if os.path.isdir(camino_) else os.path.dirname(os.path.abspath(camino_))
+    archivo = ultimo_punto_de_control(camino_) if os.path.isdir(camino_) else camino_
+    if archivo is None:
+        raise FileNotFoundError(f'No hay puntos de control en {camino_}')
+
+    punto = cargar_punto_de_control(archivo)
+    caso = punto['caso'] if t_total_ is None else dict(punto['caso'], t_total=t_total_)
+    estado_ = estado.EstadoConservativo(punto['U'])
+    # los operadores se reconstruyen con la precision en que se guardo el estado
+    with precision.usar(estado_.datos.dtype.name):
+        return _integrar_caso(caso, estado_, directorio, cada_n_pasos_, punto['t'], punto['paso'], punto['registros'], punto['historia'])
+
+if __name__ == '__main__':
+    cada_n_pasos = int(sys.argv[-1]) if sys.argv[-1].isdigit() else 100
+    if sys.argv[1] == 'correr':
+        with open(sys.argv[2]) as archivo:
+            _, reporte = correr(json.load(archivo), sys.argv[3], cada_n_pasos)
+    elif sys.argv[1] == 'reanudar':
+        _, reporte = reanudar(sys.argv[2], cada_n_pasos)
+    else:
+        raise ValueError(f'Comando desconocido: {sys.argv[1]}. Opciones: correr, reanudar')
+    print(f"pasos = {reporte['pasos']}, t = {reporte['t_final']}")
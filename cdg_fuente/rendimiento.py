@@ -0,0 +1,242 @@
+'''
+Mediciones de rendimiento de los kernels de Galerkin discontinuo y de pasos completos.
+
+Micro-mediciones, sobre una rejilla de N_elementos y N_nodos:
+    flujo       galerkin_discontinuo.compute_numerical_flux_vectors
+    rigidez     galerkin_discontinuo.compute_stiffness_vectors
+    masa        galerkin_discontinuo.calcula_inversa_matriz_de_masa
+    referencia  bases.generate_reference_space
+    dhdt_dudt   paso_de_tiempo.compute_dhdt_du_dt
+
+Los kernels que recorren la malla se reportan en elementos por segundo; masa y referencia
+trabajan sobre el elemento de referencia (su costo no depende de N_elementos), se miden una sola
+vez por N_nodos y se reportan en llamadas por segundo. referencia vacia el cache de
+bases.operadores_de_referencia en cada llamada, de modo que mide la evaluacion baricentrica y no
+la consulta al cache.
+
+Mediciones de punta a punta: paso_de_tiempo.integrar con RHSOperator durante un numero fijo
+de pasos, reportadas en actualizaciones de elemento por segundo (N_elementos * pasos / s).
+
+Los resultados se guardan en JSON junto con los metadatos del entorno y se pueden comparar con
+un archivo de referencia guardado antes; una medicion es una regresion si su tiempo minimo
+(el menos afectado por el ruido de la maquina) es mas lento que el de referencia por mas de la
+tolerancia. Solo se comparan mediciones de la misma precision; si la version de numpy o la
+plataforma difieren se emite una advertencia, porque los tiempos no son comparables del todo.
+
+Uso:
+    python rendimiento.py resultados.json
+    python rendimiento.py resultados.json --referencia referencia.json --tolerancia 0.1
+    python rendimiento.py resultados.json --elementos 10 1000 --nodos 2 4 --sin-punta-a-punta
+    python rendimiento.py resultados_float32.json --precision float32
+
+La comparacion de float32 con float64 (error y aceleracion) esta en validar_precision.py.
+'''
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+
+import bases
+import estado
+import galerkin_discontinuo
+import instrumentacion
+import paso_de_tiempo
+import precision
+import simulacion
+
+N_ELEMENTOS = (10, 100, 1000, 10**4, 10**5, 10**6)
+N_NODOS = (2, 4, 8, 16)
+
+# limite de valores de la malla (N_elementos * N_nodos) de una medicion, para no agotar la memoria
+MAX_VALORES = 4 * 10**6
+
+# kernels del elemento de referencia, cuyo costo no depende de N_elementos
+KERNELS_DE_REFERENCIA = ('masa', 'referencia')
+
+def metadatos_del_entorno():
+    '''
+    Version de Python y numpy, plataforma, procesador y commit de git de la medicion.
+    '''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'fecha': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'implementacion': platform.python_implementation(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'nucleos': os.cpu_count(),
+        'commit': commit,
+        'precision': np.dtype(precision.tipo_de_dato()).name,
+    }
+
+def _problema(N_elementos_, N_nodos_):
+    # malla, estado inicial y operadores del problema de la perturbacion gaussiana
+    malla = simulacion.generar_malla(0.0, 10.0, N_elementos_, N_nodos_)
+    h, u = simulacion.condiciones_iniciales_gaussianas(malla)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+    return malla, h, u, matriz_de_masa_inversa, matriz_de_rigidez
+
+def _referencia_sin_cache(malla_, cuadratura_de_gauss_):
+    # sin el cache, generate_reference_space evalua de nuevo los polinomios de Lagrange
+    bases.operadores_de_referencia.cache_clear()
+    return bases.generate_reference_space(malla_, cuadratura_de_gauss_)
+
+def micro_mediciones(N_elementos_, N_nodos_, tiempo_minimo_=0.2, kernels_de_referencia_=True):
+    '''
+    Mide cada kernel en una malla de N_elementos_ elementos con N_nodos_ nodos. Con
+    kernels_de_referencia_ falso se omiten los kernels de KERNELS_DE_REFERENCIA.
+
+    Retorna:
+        list: Un diccionario por kernel, con elementos_por_segundo o, para los kernels del
+        elemento de referencia, llamadas_por_segundo.
+    '''
+    malla, h, u, matriz_de_masa_inversa, matriz_de_rigidez = _problema(N_elementos_, N_nodos_)
+    n_cuadratura = bases.n_nodos_cuadratura_minima(N_nodos_)
+    cuadratura_de_gauss, pesos_de_gauss = bases.cuadratura_de_gauss_legendre(n_cuadratura)
+    phi, dphi_dx = bases.generate_reference_space(malla, cuadratura_de_gauss)
+    longitud_elemento = malla[0][-1] - malla[0][0]
+
+    kernels = {
+        'flujo': lambda: galerkin_discontinuo.compute_numerical_flux_vectors(h, u),
+        'rigidez': lambda: galerkin_discontinuo.compute_stiffness_vectors(h, u, matriz_de_rigidez),
+        'masa': lambda: galerkin_discontinuo.calcula_inversa_matriz_de_masa(longitud_elemento, pesos_de_gauss, phi, N_nodos_),
+        'referencia': lambda: _referencia_sin_cache(malla, cuadratura_de_gauss),
+        'dhdt_dudt': lambda: paso_de_tiempo.compute_dhdt_du_dt(h, u, matriz_de_rigidez, matriz_de_masa_inversa),
+    }
+
+    resultados = []
+    for nombre, kernel in kernels.items():
+        if nombre in KERNELS_DE_REFERENCIA and not kernels_de_referencia_:
+            continue
+        tiempo = instrumentacion.medir(kernel, tiempo_minimo_)
+        if nombre in KERNELS_DE_REFERENCIA:
+            tasa = {'llamadas_por_segundo': 1.0 / tiempo['mediana']}
+        else:
+            tasa = {'elementos_por_segundo': N_elementos_ / tiempo['mediana']}
+        resultados.append(dict(nombre=nombre, N_elementos=N_elementos_, N_nodos=N_nodos_, **tasa, **tiempo))
+    return resultados
+
+def punta_a_punta(N_elementos_, N_nodos_, n_pasos_=20, integrador_='ssp_rk3', cfl_=0.1):
+    '''
+    Mide n_pasos_ pasos de integrar con RHSOperator y paso de tiempo fijo. El numero CFL es
+    pequeño para que el paso sea estable tambien con N_nodos grande.
+
+    Retorna:
+        dict: Mediana y minimo del tiempo por paso (s) y actualizaciones de elemento por segundo.
+    '''
+    malla, h, u, matriz_de_masa_inversa, matriz_de_rigidez = _problema(N_elementos_, N_nodos_)
+    estado_ = estado.EstadoConservativo.desde_primitivas(h, u)
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+    paso_t = paso_de_tiempo.paso_de_tiempo_estable(estado_.datos, malla, cfl_)
+
+    # un paso de calentamiento fuera de la medicion
+    paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, paso_t, malla, integrador_, paso_t)
+
+    # instantes al final de cada paso, para el tiempo de cada paso
+    instantes = [time.perf_counter()]
+    paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, n_pasos_ * paso_t, malla, integrador_, paso_t, al_final_del_paso_=lambda *_: instantes.append(time.perf_counter()))
+    tiempos = np.diff(instantes)
+
+    return {
+        'nombre': f'punta_a_punta_{integrador_}',
+        'N_elementos': N_elementos_,
+        'N_nodos': N_nodos_,
+        'mediana': float(np.median(tiempos)),
+        'minimo': float(np.min(tiempos)),
+        'repeticiones': len(tiempos),
+        'elementos_por_segundo': N_elementos_ * len(tiempos) / ( instantes[-1] - instantes[0] ),
+    }
+
+def ejecutar_mediciones(N_elementos_=N_ELEMENTOS, N_nodos_=N_NODOS, micro_=True, punta_a_punta_=True, max_valores_=MAX_VALORES, tiempo_minimo_=0.2):
+    '''
+    Ejecuta las mediciones sobre la rejilla N_elementos_ x N_nodos_, saltando las combinaciones con
+    mas de max_valores_ valores por variable, e imprime una linea por medicion.
+
+    Retorna:
+        dict: {'metadatos': ..., 'resultados': [...]}, listo para guardar en JSON.
+    '''
+    resultados = []
+    for N_nodos in N_nodos_:
+        # los kernels del elemento de referencia se miden solo con la primera malla de cada N_nodos
+        referencia_medida = False
+        for N_elementos in N_elementos_:
+            if N_elementos * N_nodos > max_valores_:
+                continue
+            mediciones = micro_mediciones(N_elementos, N_nodos, tiempo_minimo_, not referencia_medida) if micro_ else []
+            referencia_medida = True
+            if punta_a_punta_:
+                mediciones.append(punta_a_punta(N_elementos, N_nodos))
+            for medicion in mediciones:
+                if 'elementos_por_segundo' in medicion:
+                    tasa = f"{medicion['elementos_por_segundo']:14.4e} elementos/s"
+                else:
+                    tasa = f"{medicion['llamadas_por_segundo']:14.4e} llamadas/s"
+                print(f"{medicion['nombre']:>22} E = {N_elementos:>8} N = {N_nodos:>3} {medicion['mediana'] * 1e3:12.4f} ms {tasa}")
+            resultados.extend(mediciones)
+    return {'metadatos': metadatos_del_entorno(), 'resultados': resultados}
+
+def comparar_con_referencia(resultados_, referencia_, tolerancia_=0.1):
+    '''
+    Compara los tiempos minimos de resultados_ con los de referencia_ (ambos con el formato de
+    ejecutar_mediciones), emparejando por nombre, N_elementos y N_nodos. Lanza ValueError si las
+    precisiones de los metadatos difieren y advierte si difieren la version de numpy o la
+    plataforma.
+
+    Retorna:
+        list: (nombre, N_elementos, N_nodos, razon) de las mediciones cuya razon entre el minimo
+        actual y el de referencia es mayor que 1 + tolerancia_.
+    '''
+    actuales, de_referencia = resultados_['metadatos'], referencia_['metadatos']
+    if actuales.get('precision') != de_referencia.get('precision'):
+        raise ValueError(f"No se pueden comparar mediciones en {actuales.get('precision')} con una referencia en {de_referencia.get('precision')}")
+    for campo in ('numpy', 'plataforma'):
+        if actuales.get(campo) != de_referencia.get(campo):
+            warnings.warn(f'La referencia se midio con {campo} {de_referencia.get(campo)}, distinto de {actuales.get(campo)}: los tiempos pueden no ser comparables')
+
+    llave = lambda medicion: (medicion['nombre'], medicion['N_elementos'], medicion['N_nodos'])
+    referencia = {llave(medicion): medicion for medicion in referencia_['resultados']}
+
+    regresiones = []
+    for medicion in resultados_['resultados']:
+        if llave(medicion) in referencia:
+            razon = medicion['minimo'] / referencia[llave(medicion)]['minimo']
+            if razon > 1.0 + tolerancia_:
+                regresiones.append(llave(medicion) + (razon,))
+    return regresiones
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Mediciones de rendimiento de cdg_fuente')
+    argumentos.add_argument('salida', help='archivo JSON de resultados')
+    argumentos.add_argument('--referencia', help='archivo JSON de referencia para detectar regresiones')
+    argumentos.add_argument('--tolerancia', type=float, default=0.1, help='fraccion de mas lentitud tolerada')
+    argumentos.add_argument('--elementos', type=int, nargs='+', default=N_ELEMENTOS)
+    argumentos.add_argument('--nodos', type=int, nargs='+', default=N_NODOS)
+    argumentos.add_argument('--max-valores', type=int, default=MAX_VALORES)
+    argumentos.add_argument('--sin-micro', action='store_true')
+    argumentos.add_argument('--sin-punta-a-punta', action='store_true')
+    argumentos.add_argument('--precision', default='float64', choices=sorted(precision.PRECISIONES))
+    argumentos = argumentos.parse_args()
+
+    with precision.usar(argumentos.precision):
+        resultados = ejecutar_mediciones(argumentos.elementos, argumentos.nodos, not argumentos.sin_micro, not argumentos.sin_punta_a_punta, argumentos.max_valores)
+    with open(argumentos.salida, 'w') as archivo:
+        json.dump(resultados, archivo, indent=1)
+
+    if argumentos.referencia:
+        with open(argumentos.referencia) as archivo:
+            regresiones = comparar_con_referencia(resultados, json.load(archivo), argumentos.tolerancia)
+        for nombre, N_elementos, N_nodos, razon in regresiones:
+            print(f'REGRESION {nombre} E = {N_elementos} N = {N_nodos}: {razon:.2f} veces mas lento')
+        sys.exit(1 if regresiones else 0)
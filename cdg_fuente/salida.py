@@ -0,0 +1,243 @@
+'''
+Salida de la simulacion en bloques binarios leidos con memoria mapeada, escritos por un hilo en segundo plano.
+
+EscritorDeSnapshots guarda una foto (snapshot) del estado cada cierto numero de pasos en un
+contenedor de solo agregar: bloques de hasta snapshots_por_bloque fotos, cada uno un archivo
+binario crudo (orden C, tipo 'dtype' del indice) de forma (n_fotos, n_variables, N_elementos,
+N_nodos) que crece foto a foto, y un indice JSON con los pasos, los tiempos y los bloques escritos.
+El integrador solo paga la copia del estado; la escritura a disco la hace un hilo alimentado por
+una cola acotada (si la cola se llena el integrador espera).
+
+Los bloques no se reservan de antemano: un bloque ocupa solo las fotos escritas. El indice se
+reescribe (de forma atomica, despues de vaciar el bloque a disco) al cambiar de bloque, cada
+indice_cada_n_fotos_ fotos y al cerrar. Reescribirlo con cada foto costaria O(n^2) en una
+corrida larga, porque el indice crece con la lista de pasos y tiempos. Si la corrida se
+interrumpe el indice describe las fotos hasta su ultima reescritura, incluidas las del bloque
+incompleto; se pierden a lo sumo las ultimas indice_cada_n_fotos_ - 1 fotos.
+
+LectorDeSnapshots abre el indice y lee rangos de tiempo de forma perezosa, mapeando solo los
+bloques que cubren el rango pedido.
+
+Ejemplo:
+    with salida.EscritorDeSnapshots('corrida', malla, cada_n_pasos_=10) as escritor:
+        paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, t_total, malla,
+                                al_final_del_paso_=escritor.al_final_del_paso)
+
+    lector = salida.LectorDeSnapshots('corrida')
+    h = lector.leer_rango_de_tiempo(0.5, 1.0, 'h')
+'''
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+import estado
+import instrumentacion
+
+NOMBRE_INDICE = 'indice.json'
+NOMBRE_MALLA = 'malla.npy'
+VARIABLES_VALIDAS = ('h', 'hu', 'u')
+
+def _extraer_variables(estado_, variables_):
+    # copia las variables pedidas del estado conservativo a un array nuevo
+    valores = {'h': estado_.h, 'hu': estado_.hu}
+    if 'u' in variables_:
+        valores['u'] = estado_.u
+    return np.stack([valores[variable] for variable in variables_])
+
+def _escribir_json_atomico(camino_, contenido_):
+    camino_temporal = camino_ + '.tmp'
+    with open(camino_temporal, 'w') as archivo:
+        json.dump(contenido_, archivo)
+    os.replace(camino_temporal, camino_)
+
+class EscritorDeSnapshots:
+    '''
+    Escribe fotos del estado en un directorio desde un hilo en segundo plano.
+
+    Parámetros:
+        directorio_ (str): Directorio de salida, se crea si no existe. Debe estar vacio.
+        malla_ (numpy.ndarray): Coordenadas de los nodos, forma (N_elementos, N_nodos).
+        variables_ (tuple): Variables guardadas, de 'h', 'hu' y 'u'.
+        cada_n_pasos_ (int): Se guarda una foto cada cada_n_pasos_ pasos.
+        snapshots_por_bloque_ (int): Numero maximo de fotos por bloque.
+        capacidad_cola_ (int): Numero maximo de fotos esperando ser escritas.
+        indice_cada_n_fotos_ (int): El indice se reescribe cada indice_cada_n_fotos_ fotos, ademas
+            de al cambiar de bloque y al cerrar.
+    '''
+
+    def __init__(self, directorio_, malla_, variables_=('h', 'hu'), cada_n_pasos_=1, snapshots_por_bloque_=256, capacidad_cola_=8, indice_cada_n_fotos_=16):
+
+        desconocidas = set(variables_) - set(VARIABLES_VALIDAS)
+        if desconocidas:
+            raise ValueError(f'Variables desconocidas: {sorted(desconocidas)}. Opciones: {VARIABLES_VALIDAS}')
+
+        os.makedirs(directorio_, exist_ok=True)
+        if os.path.exists(os.path.join(directorio_, NOMBRE_INDICE)):
+            raise FileExistsError(f'El directorio {directorio_} ya contiene una corrida')
+
+        self.directorio = directorio_
+        self.variables = tuple(variables_)
+        self.cada_n_pasos = cada_n_pasos_
+        self.snapshots_por_bloque = snapshots_por_bloque_
+        self.indice_cada_n_fotos = indice_cada_n_fotos_
+        self.shape = (len(self.variables),) + malla_.shape
+
+        np.save(os.path.join(directorio_, NOMBRE_MALLA), malla_)
+        self.indice = {'variables': list(self.variables), 'shape': list(self.shape), 'snapshots_por_bloque': snapshots_por_bloque_, 'bloques': [], 'pasos': [], 'tiempos': []}
+        _escribir_json_atomico(os.path.join(directorio_, NOMBRE_INDICE), self.indice)
+
+        self._cola = queue.Queue(maxsize=capacidad_cola_)
+        self._error = None
+        self._hilo = threading.Thread(target=self._escribir_en_segundo_plano, name='EscritorDeSnapshots', daemon=True)
+        self._hilo.start()
+
+    def _escribir_en_segundo_plano(self):
+
+        bloque = None
+        try:
+            while True:
+                foto = self._cola.get()
+                if foto is None:
+                    break
+                numero_de_paso, t, valores = foto
+
+                # abre un nuevo bloque cuando el actual se llena; el indice queda al dia con el bloque cerrado
+                if len(self.indice['pasos']) % self.snapshots_por_bloque == 0:
+                    if bloque is not None:
+                        bloque.close()
+                        _escribir_json_atomico(os.path.join(self.directorio, NOMBRE_INDICE), self.indice)
+                    nombre = f'bloque_{len(self.indice["bloques"]):05d}.bin'
+                    bloque = open(os.path.join(self.directorio, nombre), 'wb')
+                    self.indice['bloques'].append(nombre)
+                    self.indice['dtype'] = valores.dtype.str
+
+                bloque.write(memoryview(np.ascontiguousarray(valores)).cast('B'))
+                self.indice['pasos'].append(int(numero_de_paso))
+                self.indice['tiempos'].append(float(t))
+
+                if len(self.indice['pasos']) % self.indice_cada_n_fotos == 0:
+                    bloque.flush()
+                    _escribir_json_atomico(os.path.join(self.directorio, NOMBRE_INDICE), self.indice)
+
+            if bloque is not None:
+                bloque.close()
+            _escribir_json_atomico(os.path.join(self.directorio, NOMBRE_INDICE), self.indice)
+        except BaseException as error:
+            if bloque is not None:
+                bloque.close()
+            self._error = error
+            # vacia la cola para que el integrador no quede esperando
+            while True:
+                try:
+                    if self._cola.get_nowait() is None:
+                        break
+                except queue.Empty:
+                    break
+
+    def _revisar_error(self):
+        if self._error is not None:
+            raise RuntimeError('El hilo de escritura de snapshots fallo') from self._error
+
+    def escribir(self, numero_de_paso_, t_, estado_):
+        '''
+        Encola una foto del estado (un EstadoConservativo). Solo copia las variables pedidas.
+        '''
+        self._revisar_error()
+        with instrumentacion.etapa('salida'):
+            self._cola.put((numero_de_paso_, t_, _extraer_variables(estado_, self.variables)))
+
+    def al_final_del_paso(self, numero_de_paso_, t_, estado_):
+        '''
+        Funcion para el argumento al_final_del_paso_ de paso_de_tiempo.integrar: guarda una foto
+        cada cada_n_pasos_ pasos.
+        '''
+        if numero_de_paso_ % self.cada_n_pasos == 0:
+            self.escribir(numero_de_paso_, t_, estado_)
+
+    def cerrar(self):
+        '''
+        Espera a que todas las fotos encoladas se escriban y cierra el indice.
+        '''
+        if self._hilo.is_alive():
+            self._cola.put(None)
+            self._hilo.join()
+        self._revisar_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+class LectorDeSnapshots:
+    '''
+    Lee de forma perezosa las fotos escritas por EscritorDeSnapshots.
+
+    Parámetros:
+        directorio_ (str): Directorio de la corrida.
+    '''
+
+    def __init__(self, directorio_):
+        self.directorio = directorio_
+        with open(os.path.join(directorio_, NOMBRE_INDICE)) as archivo:
+            self.indice = json.load(archivo)
+        self.variables = tuple(self.indice['variables'])
+        self.pasos = np.array(self.indice['pasos'], dtype=int)
+        self.tiempos = np.array(self.indice['tiempos'])
+        self._bloques = {}
+
+    def __len__(self):
+        return len(self.tiempos)
+
+    @property
+    def malla(self):
+        return np.load(os.path.join(self.directorio, NOMBRE_MALLA))
+
+    def _bloque(self, i):
+        # cada bloque se mapea en memoria la primera vez que se necesita, solo con las fotos del indice
+        if i not in self._bloques:
+            por_bloque = self.indice['snapshots_por_bloque']
+            n_fotos = min(por_bloque, len(self) - i * por_bloque)
+            self._bloques[i] = np.memmap(os.path.join(self.directorio, self.indice['bloques'][i]), dtype=np.dtype(self.indice['dtype']), mode='r', shape=(n_fotos,) + tuple(self.indice['shape']))
+        return self._bloques[i]
+
+    def leer(self, inicio_=0, fin_=None, variable_=None):
+        '''
+        Lee las fotos con indices [inicio_, fin_). Con variable_ = None retorna todas las variables
+        guardadas, forma (n_fotos, n_variables, N_elementos, N_nodos); con una variable retorna
+        forma (n_fotos, N_elementos, N_nodos). 'u' se puede pedir si se guardaron 'h' y 'hu'.
+        '''
+        inicio, fin, _ = slice(inicio_, fin_).indices(len(self))
+        por_bloque = self.indice['snapshots_por_bloque']
+
+        partes = []
+        for i in range(inicio // por_bloque, ( max(fin, inicio + 1) - 1 ) // por_bloque + 1):
+            desde = max(inicio, i * por_bloque) - i * por_bloque
+            hasta = min(fin, ( i + 1 ) * por_bloque) - i * por_bloque
+            if hasta > desde:
+                partes.append(self._seleccionar(self._bloque(i)[desde:hasta], variable_))
+
+        if not partes:
+            shape = (0,) + tuple(self.indice['shape'][1:]) if variable_ is not None else (0,) + tuple(self.indice['shape'])
+            return np.empty(shape)
+        return np.concatenate(partes)
+
+    def _seleccionar(self, fotos_, variable_):
+        if variable_ is None:
+            return fotos_
+        if variable_ in self.variables:
+            return fotos_[:, self.variables.index(variable_)]
+        if variable_ == 'u' and {'h', 'hu'} <= set(self.variables):
+            return estado.calcular_velocidad(fotos_[:, self.variables.index('h')], fotos_[:, self.variables.index('hu')])
+        raise ValueError(f'La variable {variable_!r} no fue guardada. Variables guardadas: {self.variables}')
+
+    def leer_rango_de_tiempo(self, t_inicial_, t_final_, variable_=None):
+        '''
+        Lee las fotos con t_inicial_ <= t <= t_final_.
+        '''
+        inicio = np.searchsorted(self.tiempos, t_inicial_, side='left')
+        fin = np.searchsorted(self.tiempos, t_final_, side='right')
+        return self.leer(inicio, fin, variable_)
@@ -0,0 +1,90 @@
+import numpy as np
+import bases
+import galerkin_discontinuo
+import precision
+
+def generar_malla(x_inicial_, x_final_, N_elementos_, N_nodos_, familia_='equiespaciados'):
+    '''
+    Genera una malla cartesiana unidimensional con elementos igualmente espaciados. Los nodos de
+    cada elemento son los nodos de referencia de la familia dada ('equiespaciados' o
+    'gauss_lobatto') llevados del intervalo [-1, 1] al elemento. Las coordenadas siempre se
+    guardan en float64, sea cual sea la precision actual: en float32 el redondeo de las
+    coordenadas haria que los elementos de una malla uniforme tuvieran longitudes distintas (del
+    orden de 1e-3 relativo con 1e4 elementos), que RHSOperator, los diagnosticos y el limitador
+    tomarian como una malla no uniforme. Solo el estado y los operadores usan la precision actual.
+
+    Retorna:
+        numpy.ndarray: malla[i, j] es la coordenada del nodo j del elemento i, forma (N_elementos, N_nodos).
+    '''
+    longitud_elemento = (x_final_ - x_inicial_) / N_elementos_
+    limite_izquierdo = x_inicial_ + longitud_elemento * np.arange(N_elementos_)
+    nodos = bases.nodos_de_referencia(N_nodos_, familia_)
+    return limite_izquierdo[:, None] + 0.5 * longitud_elemento * ( nodos[None, :] + 1.0 )
+
+def generar_malla_desde_limites(limites_, N_nodos_, familia_='equiespaciados'):
+    '''
+    Genera una malla unidimensional con elementos de longitudes arbitrarias: el elemento i va de
+    limites_[i] a limites_[i + 1]. Los nodos de cada elemento son los nodos de referencia de la
+    familia dada llevados al elemento. Como generar_malla, siempre en float64.
+
+    Retorna:
+        numpy.ndarray: malla[i, j] es la coordenada del nodo j del elemento i, forma (len(limites_) - 1, N_nodos).
+    '''
+    limites = np.asarray(limites_, dtype=float)
+    longitud_elemento = np.diff(limites)
+    nodos = bases.nodos_de_referencia(N_nodos_, familia_)
+    return limites[:-1, None] + 0.5 * longitud_elemento[:, None] * ( nodos[None, :] + 1.0 )
+
+def condiciones_iniciales_gaussianas(malla_, amplitud_=0.1, ancho_=1.0, centro_=5.0):
+    '''
+    Condiciones iniciales del curso: una perturbacion gaussiana de la altura en reposo,
+    h_0 = 1 + amplitud exp(-((x - centro)/ancho)^2) y u_0 = 0.
+
+    Retorna:
+        tuple: (h, u) con la forma de la malla y la precision actual.
+    '''
+    tipo = precision.tipo_de_dato()
+    h = ( 1.0 + amplitud_ * np.exp( - ( ( malla_ - centro_ ) / ancho_ )**2 ) ).astype(tipo, copy=False) # Altura (m)
+    u = np.zeros(np.shape(malla_), dtype=tipo) # Velocidad horizontal (m/s)
+    return h, u
+
+def construir_operadores(malla_, n_nodos_cuadratura_gauss_=None, familia_='equiespaciados'):
+    '''
+    Construye la matriz de masa inversa y la matriz de rigidez del primer elemento de la malla.
+    Si los elementos tienen longitudes distintas, RHSOperator escala la derivada temporal de cada
+    elemento por el cociente de su longitud con la del primero.
+
+    Con familia_ = 'equiespaciados' la integracion usa la cuadratura de Gauss-Legendre con
+    n_nodos_cuadratura_gauss_ puntos, o con el minimo numero de puntos exacto si es None.
+
+    Con familia_ = 'gauss_lobatto' (malla generada con los nodos de Gauss-Lobatto) se usa el
+    modo de colocacion: la cuadratura de Gauss-Lobatto en los mismos nodos, la matriz de masa
+    es diagonal y se retorna solo su diagonal inversa, de forma (N_nodos,).
+
+    Los operadores se calculan en float64 y se retornan con la precision actual, de modo que en
+    float32 los kernels trabajan en float32 sin promover (la malla siempre es float64).
+
+    Retorna:
+        tuple: (matriz_de_masa_inversa, matriz_de_rigidez).
+    '''
+    tipo = precision.tipo_de_dato()
+    malla_ = np.asarray(malla_, dtype=np.float64)
+    N_nodos = malla_.shape[1]
+    longitud_elemento = malla_[0][-1] - malla_[0][0]
+
+    if familia_ == 'gauss_lobatto':
+        cuadratura_de_gauss, pesos_de_gauss = bases.cuadratura_de_gauss_lobatto(N_nodos)
+    else:
+        if n_nodos_cuadratura_gauss_ is None:
+            n_nodos_cuadratura_gauss_ = bases.n_nodos_cuadratura_minima(N_nodos)
+        cuadratura_de_gauss, pesos_de_gauss = bases.cuadratura_de_gauss_legendre(n_nodos_cuadratura_gauss_)
+
+    polinomios_de_lagrange_en_cuadratura_de_gauss, derivada_x_polinomios_de_lagrange_en_cuadratura_de_gauss = bases.generate_reference_space(malla_, cuadratura_de_gauss)
+    matriz_de_rigidez = galerkin_discontinuo.calcula_matrix_de_rigidez(longitud_elemento, pesos_de_gauss, polinomios_de_lagrange_en_cuadratura_de_gauss, derivada_x_polinomios_de_lagrange_en_cuadratura_de_gauss)
+
+    if familia_ == 'gauss_lobatto':
+        matriz_de_masa_inversa = galerkin_discontinuo.calcula_inversa_matriz_de_masa_diagonal(longitud_elemento, pesos_de_gauss)
+    else:
+        matriz_de_masa_inversa = galerkin_discontinuo.calcula_inversa_matriz_de_masa(longitud_elemento, pesos_de_gauss, polinomios_de_lagrange_en_cuadratura_de_gauss, N_nodos)
+
+    return matriz_de_masa_inversa.astype(tipo, copy=False), matriz_de_rigidez.astype(tipo, copy=False)
@@ -0,0 +1,252 @@
+import numpy as np
+
+# aceleracion de la gravedad (m/s^2)
+GRAVEDAD = 9.8
+
+# registro de solucionadores de Riemann disponibles: nombre -> funcion de flujo numerico
+SOLUCIONADORES_DE_RIEMANN = {}
+
+def registrar_solucionador(nombre):
+    '''
+    Decorador que agrega una funcion de flujo numerico al registro de solucionadores
+    de Riemann bajo el nombre dado.
+
+    Toda funcion registrada recibe los estados a la izquierda y a la derecha de todas las
+    fronteras entre elementos como arrays y retorna los dos componentes del flujo numerico:
+
+        flujo_1, flujo_2 = solucionador(h_izquierda, u_izquierda, h_derecha, u_derecha, trabajo_=None)
+
+    trabajo_ es un bloque opcional de arrays de trabajo creado con crear_trabajo para la forma de
+    las fronteras. Si se da, el solucionador no reserva memoria y flujo_1, flujo_2 son vistas de
+    trabajo_, validas hasta la siguiente llamada con el mismo bloque.
+    '''
+    def decorador(funcion):
+        SOLUCIONADORES_DE_RIEMANN[nombre] = funcion
+        return funcion
+    return decorador
+
+def obtener_solucionador(nombre):
+    '''
+    Retorna la funcion de flujo numerico registrada bajo el nombre dado.
+
+    Parámetros:
+        nombre (str): Nombre del solucionador de Riemann.
+            ejemplo: nombre = 'roe'
+
+    Retorna:
+        function: Funcion de flujo numerico.
+    '''
+    try:
+        return SOLUCIONADORES_DE_RIEMANN[nombre]
+    except KeyError:
+        raise ValueError(f'Solucionador de Riemann desconocido: {nombre!r}. Opciones: {sorted(SOLUCIONADORES_DE_RIEMANN)}') from None
+
+# numero de arrays de trabajo del tamaño de las fronteras que usa el solucionador que mas usa (Roe)
+N_TRABAJO = 10
+
+def crear_trabajo(shape_, dtype_=np.float64):
+    '''
+    Bloque de arrays de trabajo para el argumento trabajo_ de los solucionadores, forma
+    (N_TRABAJO,) + shape_, con shape_ la forma de los estados en las fronteras.
+    '''
+    return np.empty((N_TRABAJO,) + tuple(shape_), dtype=dtype_)
+
+def _trabajo(trabajo_, *estados_):
+    # el bloque dado, o uno nuevo con la forma y el tipo de los estados
+    if trabajo_ is not None:
+        return trabajo_
+    tipo = np.result_type(*estados_)
+    if not np.issubdtype(tipo, np.inexact):
+        tipo = np.float64
+    return crear_trabajo(np.broadcast_shapes(*( np.shape(estado) for estado in estados_ )), tipo)
+
+def flujos_fisicos(h_, u_):
+    '''
+    Calcula el estado conservativo (1U = h, 2U = hu) y el flujo fisico
+    (f1 = hu, f2 = hu^2 + 0.5 g h^2) de las ecuaciones de agua poco profunda.
+    '''
+    hu_ = h_ * u_
+    return hu_, hu_, hu_ * u_ + 0.5 * GRAVEDAD * h_**2
+
+@registrar_solucionador('rusanov')
+def flujo_rusanov(h_izquierda, u_izquierda, h_derecha, u_derecha, trabajo_=None):
+    '''
+    Flujo de Rusanov (Lax-Friedrichs local): promedio de los flujos fisicos menos una
+    disipacion proporcional a la maxima velocidad de onda |u| + sqrt(g h) en la frontera.
+    '''
+    trabajo = _trabajo(trabajo_, h_izquierda, u_izquierda, h_derecha, u_derecha)
+    flujo_1, flujo_2, a, b, velocidad_maxima, salto = trabajo[:6]
+
+    # maxima velocidad de onda a ambos lados de cada frontera
+    np.multiply(h_izquierda, GRAVEDAD, out=a)
+    np.sqrt(a, out=a)
+    np.abs(u_izquierda, out=b)
+    a += b
+    np.multiply(h_derecha, GRAVEDAD, out=velocidad_maxima)
+    np.sqrt(velocidad_maxima, out=velocidad_maxima)
+    np.abs(u_derecha, out=b)
+    velocidad_maxima += b
+    np.maximum(a, velocidad_maxima, out=velocidad_maxima)
+
+    # flujo_1 = 0.5 (hu_L + hu_R) - 0.5 v (h_R - h_L)
+    hu_izquierda, hu_derecha = a, b
+    np.multiply(h_izquierda, u_izquierda, out=hu_izquierda)
+    np.multiply(h_derecha, u_derecha, out=hu_derecha)
+    np.add(hu_izquierda, hu_derecha, out=flujo_1)
+    np.subtract(h_derecha, h_izquierda, out=salto)
+    salto *= velocidad_maxima
+    flujo_1 -= salto
+    flujo_1 *= 0.5
+
+    # flujo_2 = 0.5 (f2_L + f2_R) - 0.5 v (hu_R - hu_L), con f2 = hu u + 0.5 g h^2
+    np.subtract(hu_derecha, hu_izquierda, out=salto)
+    salto *= velocidad_maxima
+    _flujo_fisico_2(h_izquierda, u_izquierda, hu_izquierda, velocidad_maxima)
+    _flujo_fisico_2(h_derecha, u_derecha, hu_derecha, velocidad_maxima)
+    np.add(hu_izquierda, hu_derecha, out=flujo_2)
+    flujo_2 -= salto
+    flujo_2 *= 0.5
+
+    return flujo_1, flujo_2
+
+def _flujo_fisico_2(h_, u_, hu_, temporal_):
+    # hu_ <- hu u + 0.5 g h^2 en el lugar, con temporal_ como array de trabajo
+    hu_ *= u_
+    np.multiply(h_, h_, out=temporal_)
+    temporal_ *= 0.5 * GRAVEDAD
+    hu_ += temporal_
+
+@registrar_solucionador('hll')
+def flujo_hll(h_izquierda, u_izquierda, h_derecha, u_derecha, trabajo_=None):
+    '''
+    Flujo HLL con las estimaciones de velocidad de Davis. Para las ecuaciones de agua poco
+    profunda en 1D sin escalares pasivos el flujo HLLC coincide con el flujo HLL.
+    '''
+    trabajo = _trabajo(trabajo_, h_izquierda, u_izquierda, h_derecha, u_derecha)
+    flujo_1, flujo_2, a, b, s_izquierda, s_derecha, hu_izquierda, hu_derecha = trabajo[:8]
+
+    c_izquierda, c_derecha = a, b
+    np.multiply(h_izquierda, GRAVEDAD, out=c_izquierda)
+    np.sqrt(c_izquierda, out=c_izquierda)
+    np.multiply(h_derecha, GRAVEDAD, out=c_derecha)
+    np.sqrt(c_derecha, out=c_derecha)
+
+    # velocidades de las ondas mas lenta y mas rapida, acotadas por cero para que la misma
+    # formula de como resultado el flujo izquierdo (s_izquierda >= 0) o el derecho (s_derecha <= 0)
+    np.subtract(u_izquierda, c_izquierda, out=s_izquierda)
+    np.subtract(u_derecha, c_derecha, out=hu_izquierda)
+    np.minimum(s_izquierda, hu_izquierda, out=s_izquierda)
+    np.minimum(s_izquierda, 0.0, out=s_izquierda)
+    np.add(u_izquierda, c_izquierda, out=s_derecha)
+    np.add(u_derecha, c_derecha, out=hu_izquierda)
+    np.maximum(s_derecha, hu_izquierda, out=s_derecha)
+    np.maximum(s_derecha, 0.0, out=s_derecha)
+
+    inversa_ancho, producto_s = a, b
+    np.subtract(s_derecha, s_izquierda, out=inversa_ancho)
+    np.divide(1.0, inversa_ancho, out=inversa_ancho)
+    np.multiply(s_izquierda, s_derecha, out=producto_s)
+
+    # flujo_1 = ( s_R f1_L - s_L f1_R + s_L s_R (h_R - h_L) ) / ( s_R - s_L )
+    np.multiply(h_izquierda, u_izquierda, out=hu_izquierda)
+    np.multiply(h_derecha, u_derecha, out=hu_derecha)
+    np.multiply(s_derecha, hu_izquierda, out=flujo_1)
+    np.multiply(s_izquierda, hu_derecha, out=flujo_2)
+    flujo_1 -= flujo_2
+    np.subtract(h_derecha, h_izquierda, out=flujo_2)
+    flujo_2 *= producto_s
+    flujo_1 += flujo_2
+    flujo_1 *= inversa_ancho
+
+    # flujo_2 = ( s_R f2_L - s_L f2_R + s_L s_R (hu_R - hu_L) ) / ( s_R - s_L )
+    np.subtract(hu_derecha, hu_izquierda, out=flujo_2)
+    flujo_2 *= producto_s
+    _flujo_fisico_2(h_izquierda, u_izquierda, hu_izquierda, producto_s)
+    _flujo_fisico_2(h_derecha, u_derecha, hu_derecha, producto_s)
+    hu_izquierda *= s_derecha
+    hu_derecha *= s_izquierda
+    hu_izquierda -= hu_derecha
+    hu_izquierda += flujo_2
+    np.multiply(hu_izquierda, inversa_ancho, out=flujo_2)
+
+    return flujo_1, flujo_2
+
+# en 1D sin escalares pasivos la onda de contacto de HLLC no existe y el flujo es el de HLL
+SOLUCIONADORES_DE_RIEMANN['hllc'] = flujo_hll
+
+@registrar_solucionador('roe')
+def flujo_roe(h_izquierda, u_izquierda, h_derecha, u_derecha, trabajo_=None):
+    '''
+    Flujo de Roe con el jacobiano [[0, 1], [g h - u^2, 2 u]] evaluado en el estado promedio.
+    Sus valores propios son u - c y u + c con c = sqrt(g h) y sus vectores propios son
+    [1, u - c] y [1, u + c], por lo que |A| = R |Lambda| R^-1 se escribe en forma cerrada.
+    '''
+    trabajo = _trabajo(trabajo_, h_izquierda, u_izquierda, h_derecha, u_derecha)
+    abs_A_00, abs_A_01, abs_A_10, abs_A_11 = matriz_absoluta_de_roe(h_izquierda, u_izquierda, h_derecha, u_derecha, trabajo)
+    flujo_1, flujo_2, hu_izquierda, hu_derecha, salto_1, salto_2 = trabajo[4:10]
+
+    # saltos de las variables conservativas en cada frontera
+    np.multiply(h_izquierda, u_izquierda, out=hu_izquierda)
+    np.multiply(h_derecha, u_derecha, out=hu_derecha)
+    np.subtract(h_derecha, h_izquierda, out=salto_1)
+    np.subtract(hu_derecha, hu_izquierda, out=salto_2)
+
+    # flujo_1 = 0.5 (f1_L + f1_R) - 0.5 |A|_00 salto_1 - 0.5 |A|_01 salto_2
+    np.add(hu_izquierda, hu_derecha, out=flujo_1)
+    flujo_1 *= 0.5
+    for abs_A, salto in ((abs_A_00, salto_1), (abs_A_01, salto_2), (abs_A_10, salto_1), (abs_A_11, salto_2)):
+        abs_A *= 0.5
+        abs_A *= salto
+    flujo_1 -= abs_A_00
+    flujo_1 -= abs_A_01
+
+    # flujo_2 = 0.5 (f2_L + f2_R) - 0.5 |A|_10 salto_1 - 0.5 |A|_11 salto_2
+    _flujo_fisico_2(h_izquierda, u_izquierda, hu_izquierda, salto_1)
+    _flujo_fisico_2(h_derecha, u_derecha, hu_derecha, salto_1)
+    np.add(hu_izquierda, hu_derecha, out=flujo_2)
+    flujo_2 *= 0.5
+    flujo_2 -= abs_A_10
+    flujo_2 -= abs_A_11
+
+    return flujo_1, flujo_2
+
+def matriz_absoluta_de_roe(h_izquierda, u_izquierda, h_derecha, u_derecha, trabajo_=None):
+    '''
+    Componentes (abs_A_00, abs_A_01, abs_A_10, abs_A_11) de la matriz de disipacion |A| del flujo
+    de Roe en cada frontera. Con trabajo_ (ver crear_trabajo) son las vistas trabajo_[0:4] y se
+    usa trabajo_[4:9] como espacio de trabajo.
+    '''
+    trabajo = _trabajo(trabajo_, h_izquierda, u_izquierda, h_derecha, u_derecha)
+    abs_A_00, abs_A_01, abs_A_10, abs_A_11, inversa_2c, valor_propio_1, valor_propio_2, abs_valor_propio_1, abs_valor_propio_2 = trabajo[:9]
+
+    # valores propios del jacobiano en el estado promedio
+    c_promedio = inversa_2c
+    np.add(h_izquierda, h_derecha, out=c_promedio)
+    c_promedio *= 0.5
+    c_promedio *= GRAVEDAD
+    np.sqrt(c_promedio, out=c_promedio)
+    np.add(u_izquierda, u_derecha, out=valor_propio_1)
+    valor_propio_1 *= 0.5
+    np.add(valor_propio_1, c_promedio, out=valor_propio_2)
+    valor_propio_1 -= c_promedio
+    np.abs(valor_propio_1, out=abs_valor_propio_1)
+    np.abs(valor_propio_2, out=abs_valor_propio_2)
+    np.divide(0.5, c_promedio, out=inversa_2c)
+
+    # componentes de abs_A = R |Lambda| R^-1
+    np.multiply(abs_valor_propio_1, valor_propio_2, out=abs_A_00)
+    np.multiply(abs_valor_propio_2, valor_propio_1, out=abs_A_01)
+    abs_A_00 -= abs_A_01
+    abs_A_00 *= inversa_2c
+    np.subtract(abs_valor_propio_2, abs_valor_propio_1, out=abs_A_01)
+    abs_A_01 *= inversa_2c
+    np.multiply(valor_propio_1, valor_propio_2, out=abs_A_10)
+    np.subtract(abs_valor_propio_1, abs_valor_propio_2, out=abs_A_11)
+    abs_A_10 *= abs_A_11
+    abs_A_10 *= inversa_2c
+    np.multiply(valor_propio_2, abs_valor_propio_2, out=abs_A_11)
+    np.multiply(valor_propio_1, abs_valor_propio_1, out=valor_propio_2)
+    abs_A_11 -= valor_propio_2
+    abs_A_11 *= inversa_2c
+
+    return abs_A_00, abs_A_01, abs_A_10, abs_A_11
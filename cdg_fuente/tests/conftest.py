@@ -0,0 +1,10 @@
+'''
+Configuracion de pytest: los modulos de cdg_fuente se importan entre si por nombre, como en main.py.
+
+Uso:
+    python -m pytest cdg_fuente/tests
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
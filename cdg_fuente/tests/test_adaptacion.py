@@ -0,0 +1,51 @@
+'''
+adaptacion.adaptar conserva las integrales de h y hu al refinar y unir elementos, y marcar no
+devuelve parejas que se solapen entre si ni con los elementos a refinar.
+'''
+import numpy as np
+import pytest
+
+import adaptacion
+import bases
+
+def _integrales(malla_adaptativa_, U_):
+    # integral de cada variable: sum_e dx_e * promedio_e, con el promedio por cuadratura exacta
+    N_nodos = malla_adaptativa_.N_nodos
+    cuadratura, pesos = bases.cuadratura_de_gauss_legendre(N_nodos)
+    promedio = 0.5 * bases.evaluar_base_baricentrica(bases.nodos_de_referencia(N_nodos, malla_adaptativa_.familia), cuadratura) @ pesos
+    return ( U_ @ promedio ) @ np.diff(malla_adaptativa_.limites())
+
+def _malla_con_niveles(generador_, N_nodos_, familia_):
+    # malla con niveles mezclados, refinando al azar algunas veces desde la malla base
+    malla_adaptativa = adaptacion.MallaAdaptativa(0.0, 10.0, 8, N_nodos_, 3, familia_)
+    for _ in range(3):
+        refinar = ( generador_.random(malla_adaptativa.N_elementos) < 0.5 ) & ( malla_adaptativa.niveles < malla_adaptativa.nivel_maximo )
+        vacio = np.zeros((2, malla_adaptativa.N_elementos, N_nodos_))
+        malla_adaptativa, _ = adaptacion.adaptar(malla_adaptativa, vacio, refinar, np.zeros_like(refinar))
+    return malla_adaptativa
+
+@pytest.mark.parametrize('familia', ['equiespaciados', 'gauss_lobatto'])
+@pytest.mark.parametrize('N_nodos', [2, 3, 5])
+def test_adaptar_conserva_las_integrales(N_nodos, familia):
+    generador = np.random.default_rng(N_nodos)
+    malla_adaptativa = _malla_con_niveles(generador, N_nodos, familia)
+    U = np.stack((1.0 + generador.random((malla_adaptativa.N_elementos, N_nodos)), generador.standard_normal((malla_adaptativa.N_elementos, N_nodos))))
+
+    refinar, primero_de_pareja = adaptacion.marcar(malla_adaptativa, generador.random(malla_adaptativa.N_elementos), 0.7, 0.5)
+    assert np.any(refinar) and np.any(primero_de_pareja)
+    nueva, U_nuevo = adaptacion.adaptar(malla_adaptativa, U, refinar, primero_de_pareja)
+
+    assert nueva.N_elementos == malla_adaptativa.N_elementos + np.count_nonzero(refinar) - np.count_nonzero(primero_de_pareja)
+    assert np.allclose(_integrales(nueva, U_nuevo), _integrales(malla_adaptativa, U), rtol=1e-13, atol=1e-13)
+
+@pytest.mark.parametrize('semilla', range(20))
+def test_marcar_sin_parejas_solapadas(semilla):
+    generador = np.random.default_rng(semilla)
+    malla_adaptativa = _malla_con_niveles(generador, 3, 'equiespaciados')
+    # umbral de union mayor que el de refinamiento, para que un elemento pueda cumplir ambos
+    refinar, primero_de_pareja = adaptacion.marcar(malla_adaptativa, generador.random(malla_adaptativa.N_elementos), 0.3, 0.6)
+
+    segundo_de_pareja = np.roll(primero_de_pareja, 1)
+    assert not primero_de_pareja[-1]
+    assert not np.any(primero_de_pareja & segundo_de_pareja)
+    assert not np.any(refinar & ( primero_de_pareja | segundo_de_pareja ))
@@ -0,0 +1,54 @@
+'''
+adaptacion_p.matriz_de_proyeccion conserva la integral del polinomio al subir y al bajar el
+orden, y es exacta al subirlo. DiscretizacionP da el lado derecho de RHSOperator con un solo
+orden y conserva la masa con ordenes mezclados.
+'''
+import numpy as np
+import pytest
+
+import adaptacion_p
+import bases
+import estado
+import paso_de_tiempo
+import simulacion
+
+def _promedio(N_nodos_, familia_):
+    # promedio en el elemento de referencia de los valores nodales como vector fila: U @ promedio
+    cuadratura, pesos = bases.cuadratura_de_gauss_legendre(N_nodos_)
+    return 0.5 * bases.evaluar_base_baricentrica(bases.nodos_de_referencia(N_nodos_, familia_), cuadratura) @ pesos
+
+@pytest.mark.parametrize('familia', ['equiespaciados', 'gauss_lobatto'])
+@pytest.mark.parametrize('N_origen, N_destino', [(2, 5), (5, 2), (3, 4), (4, 3), (6, 2), (8, 8)])
+def test_proyeccion_conserva_la_integral(N_origen, N_destino, familia):
+    U = np.random.default_rng(N_origen * 10 + N_destino).standard_normal((2, 30, N_origen))
+    proyectado = U @ adaptacion_p.matriz_de_proyeccion(N_origen, N_destino, familia)
+    assert np.allclose(proyectado @ _promedio(N_destino, familia), U @ _promedio(N_origen, familia), rtol=1e-12, atol=1e-12)
+
+@pytest.mark.parametrize('N_origen, N_destino', [(2, 5), (3, 4)])
+def test_subir_el_orden_es_exacto(N_origen, N_destino):
+    U = np.random.default_rng(0).standard_normal((2, 30, N_origen))
+    ida_y_vuelta = U @ adaptacion_p.matriz_de_proyeccion(N_origen, N_destino) @ adaptacion_p.matriz_de_proyeccion(N_destino, N_origen)
+    assert np.allclose(ida_y_vuelta, U, rtol=1e-12, atol=1e-12)
+
+@pytest.mark.parametrize('N_nodos', [2, 4])
+def test_orden_uniforme_igual_que_rhs_operator(N_nodos):
+    # con un solo grupo, las trazas y los flujos indexados por extremo dan el lado derecho de RHSOperator
+    malla = simulacion.generar_malla(0.0, 10.0, 50, N_nodos)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+    U = estado.EstadoConservativo.desde_primitivas(*simulacion.condiciones_iniciales_gaussianas(malla)).datos
+    esperado = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez).evaluate_conservative(U)
+
+    discretizacion = adaptacion_p.DiscretizacionP(np.linspace(0.0, 10.0, 51), np.full(50, N_nodos))
+    dU_dt = discretizacion.evaluate_conservative(U.reshape(2, -1))
+    assert np.allclose(dU_dt.reshape(U.shape), esperado, rtol=1e-10, atol=1e-10)
+
+def test_ordenes_mezclados_conservan_la_masa():
+    # con paredes reflejantes la integral de dh/dt es cero, tambien entre elementos de ordenes distintos
+    N_nodos = np.random.default_rng(0).integers(2, 7, 60)
+    discretizacion = adaptacion_p.DiscretizacionP(np.linspace(0.0, 10.0, 61), N_nodos)
+    condicion_inicial = lambda malla: simulacion.condiciones_iniciales_gaussianas(malla, amplitud_=0.1, ancho_=0.3)
+    estado_ = adaptacion_p.EstadoPorOrden.desde_condicion_inicial(discretizacion, condicion_inicial)
+    dU_dt = discretizacion.evaluate_conservative(estado_.datos)
+
+    integral = sum(grupo.vista(dU_dt)[0] @ _promedio(grupo.N_nodos, 'equiespaciados') @ np.diff(discretizacion.limites)[grupo.indices] for grupo in discretizacion.grupos)
+    assert abs(integral) < 1e-12
@@ -0,0 +1,32 @@
+'''
+configuracion acepta los integradores implicitos: una corrida BDF2 con puntos de control guarda
+la historia del integrador y se reanuda hasta el mismo estado bit a bit que una corrida entera.
+'''
+import glob
+import os
+
+import numpy as np
+import pytest
+
+import configuracion
+import punto_de_control
+
+def test_bdf2_con_puntos_de_control(tmp_path):
+    directorio = str(tmp_path / 'corrida')
+    caso, salida, nombre_precision = configuracion.caso_desde_configuracion({
+        'malla': {'N_elementos': 30, 'N_nodos': 3},
+        'integracion': {'t_total': 0.5, 'integrador': 'bdf2', 'cfl': 3.0},
+        'salida': {'directorio': directorio, 'puntos_de_control_cada_n_pasos': 4},
+    })
+    reporte = configuracion.ejecutar(caso, salida, precision_=nombre_precision)
+
+    intermedio = sorted(glob.glob(os.path.join(directorio, 'puntos_de_control', 'punto_*.cdgpc')))[0]
+    assert punto_de_control.cargar_punto_de_control(intermedio)['historia']
+    reanudado, reporte_reanudado = punto_de_control.reanudar(intermedio, cada_n_pasos_=4)
+    completo, _ = punto_de_control.correr(caso, str(tmp_path / 'completa'), cada_n_pasos_=4)
+    assert reporte_reanudado['pasos'] == reporte['pasos']
+    assert np.array_equal(reanudado.datos, completo.datos)
+
+def test_integrador_desconocido():
+    with pytest.raises(ValueError, match='bdf3'):
+        configuracion.caso_desde_configuracion({'integracion': {'integrador': 'bdf3'}})
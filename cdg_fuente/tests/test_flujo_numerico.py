@@ -0,0 +1,63 @@
+'''
+El flujo de Roe vectorizado de galerkin_discontinuo.compute_numerical_flux_vectors contra el bucle
+original por frontera con np.linalg.eig y np.linalg.inv, guardado aqui como referencia.
+'''
+import numpy as np
+import pytest
+
+import galerkin_discontinuo
+
+def _flujo_con_bucle(h_, u_):
+    # compute_numerical_flux_vectors original: un jacobiano de Roe y su descomposicion espectral
+    # por frontera, y un bucle por elemento para las diferencias de flujo
+    base_en_nodos = np.eye(len(h_[0]))
+    N_elementos = len(h_)
+
+    roe_flux_1 = []
+    roe_flux_2 = []
+    for n in np.arange(N_elementos - 1):
+        h_promedio = 0.5 * ( h_[n][-1] + h_[n + 1][0] )
+        u_promedio = 0.5 * ( u_[n][-1] + u_[n + 1][0] )
+        jacobiano = [[0, 1], [9.8 * h_promedio - u_promedio**2, 2 * u_promedio]]
+        valores_propios, vectores_propios = np.linalg.eig(jacobiano)
+        abs_A = vectores_propios @ np.diag(np.abs(valores_propios)) @ np.linalg.inv(vectores_propios)
+
+        f1_izquierda = h_[n][-1] * u_[n][-1]
+        f1_derecha = h_[n + 1][0] * u_[n + 1][0]
+        f2_izquierda = h_[n][-1] * u_[n][-1]**2 + 0.5 * 9.8 * h_[n][-1]**2
+        f2_derecha = h_[n + 1][0] * u_[n + 1][0]**2 + 0.5 * 9.8 * h_[n + 1][0]**2
+        salto_1 = h_[n + 1][0] - h_[n][-1]
+        salto_2 = h_[n + 1][0] * u_[n + 1][0] - h_[n][-1] * u_[n][-1]
+
+        roe_flux_1.append(0.5 * ( f1_izquierda + f1_derecha ) - 0.5 * abs_A[0][0] * salto_1 - 0.5 * abs_A[0][1] * salto_2)
+        roe_flux_2.append(0.5 * ( f2_izquierda + f2_derecha ) - 0.5 * abs_A[1][0] * salto_1 - 0.5 * abs_A[1][1] * salto_2)
+
+    diferencia_1 = []
+    diferencia_2 = []
+    for n in np.arange(N_elementos):
+        if n == 0:
+            diferencia_1.append(base_en_nodos[:, -1] * roe_flux_1[n])
+            diferencia_2.append(base_en_nodos[:, -1] * roe_flux_2[n] - base_en_nodos[:, 0] * ( 0.5 * 9.8 * h_[n][0]**2 ))
+        elif n == N_elementos - 1:
+            diferencia_1.append(- base_en_nodos[:, 0] * roe_flux_1[n - 1])
+            diferencia_2.append(base_en_nodos[:, -1] * ( 0.5 * 9.8 * h_[n][-1]**2 ) - base_en_nodos[:, 0] * roe_flux_2[n - 1])
+        else:
+            diferencia_1.append(base_en_nodos[:, -1] * roe_flux_1[n] - base_en_nodos[:, 0] * roe_flux_1[n - 1])
+            diferencia_2.append(base_en_nodos[:, -1] * roe_flux_2[n] - base_en_nodos[:, 0] * roe_flux_2[n - 1])
+
+    return np.array(diferencia_1), np.array(diferencia_2)
+
+@pytest.mark.parametrize('N_elementos, N_nodos', [(2, 2), (7, 3), (50, 4), (200, 6)])
+@pytest.mark.parametrize('semilla', range(3))
+def test_roe_vectorizado_igual_al_bucle(N_elementos, N_nodos, semilla):
+    generador = np.random.default_rng(semilla)
+    h = generador.uniform(0.2, 2.0, (N_elementos, N_nodos))
+    # flujos subcriticos y supercriticos, incluida |u| > sqrt(g h)
+    u = generador.uniform(-6.0, 6.0, (N_elementos, N_nodos))
+
+    vectorizado = galerkin_discontinuo.compute_numerical_flux_vectors(h, u, 'roe')
+    referencia = _flujo_con_bucle(h, u)
+
+    for calculado, esperado in zip(vectorizado, referencia):
+        assert calculado.shape == esperado.shape
+        np.testing.assert_allclose(calculado, esperado, rtol=1e-12, atol=1e-12)
@@ -0,0 +1,60 @@
+'''
+limitadores.Limitador conserva el promedio de h de cada elemento, deja h >= epsilon despues del
+limitador de positividad en los elementos con promedio mayor que epsilon, no modifica datos
+lineales con minmod y da en un lote (2, B, E, N) lo mismo que miembro por miembro.
+'''
+import numpy as np
+
+import limitadores
+import simulacion
+
+def _datos_oscilantes(malla_, semilla_=0):
+    # frente empinado sobre una capa casi seca, con ruido nodal que deja algunos nodos negativos
+    generador = np.random.default_rng(semilla_)
+    h = np.where(malla_ < 5.0, 1.0, 1e-3) + 2e-3 * generador.standard_normal(malla_.shape)
+    hu = 0.1 * generador.standard_normal(malla_.shape)
+    return np.stack((h, hu))
+
+def _promedios(limitador_, U_):
+    return U_ @ limitador_.promedio
+
+def test_conserva_el_promedio_de_h():
+    malla = simulacion.generar_malla(0.0, 10.0, 40, 4)
+    limitador = limitadores.Limitador(malla)
+    U = _datos_oscilantes(malla)
+    promedio_h = _promedios(limitador, U)[0]
+
+    limitador(U)
+    assert limitador.elementos_limitados > 0
+    assert np.allclose(_promedios(limitador, U)[0], promedio_h, rtol=0.0, atol=1e-14)
+
+def test_positividad_deja_h_mayor_que_epsilon():
+    malla = simulacion.generar_malla(0.0, 10.0, 40, 4)
+    limitador = limitadores.Limitador(malla, tvb_=False, epsilon_=1e-6)
+    U = _datos_oscilantes(malla)
+    assert np.min(U[0]) < 0.0
+
+    # los elementos con promedio menor que epsilon no se pueden corregir conservando la masa
+    corregibles = _promedios(limitador, U)[0] > limitador.epsilon
+    contraidos = limitador.limitar_positividad(U)
+    assert np.any(contraidos)
+    assert np.min(U[0][corregibles]) >= limitador.epsilon * ( 1.0 - 1e-8 )
+
+def test_minmod_no_modifica_datos_lineales():
+    malla = simulacion.generar_malla(0.0, 10.0, 40, 4)
+    limitador = limitadores.Limitador(malla, positividad_=False, M_=0.0)
+    U = np.stack((1.0 + 0.05 * malla, 0.2 - 0.01 * malla))
+    original = U.copy()
+
+    assert not np.any(limitador.limitar_pendiente(U))
+    assert np.array_equal(U, original)
+
+def test_lote_igual_que_miembro_por_miembro():
+    malla = simulacion.generar_malla(0.0, 10.0, 40, 4)
+    lote = np.stack([_datos_oscilantes(malla, semilla) for semilla in range(3)], axis=1)
+    miembros = [lote[:, b].copy() for b in range(lote.shape[1])]
+
+    limitadores.Limitador(malla)(lote)
+    for b, miembro in enumerate(miembros):
+        limitadores.Limitador(malla)(miembro)
+        assert np.array_equal(lote[:, b], miembro)
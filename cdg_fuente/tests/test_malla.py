@@ -0,0 +1,33 @@
+'''
+La malla de simulacion.generar_malla es float64 en cualquier precision, y RHSOperator reconoce
+una malla uniforme aunque las longitudes de los elementos difieran por el redondeo de las
+coordenadas, y escala las mallas no uniformes.
+'''
+import numpy as np
+import pytest
+
+import paso_de_tiempo
+import precision
+import simulacion
+
+@pytest.mark.parametrize('N_elementos', [10, 10**5])
+def test_malla_uniforme_sin_escala(N_elementos):
+    malla = simulacion.generar_malla(0.0, 10.0, N_elementos, 3)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+    assert paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez).escala_por_elemento is None
+
+def test_malla_no_uniforme_con_escala():
+    malla = simulacion.generar_malla_desde_limites(np.linspace(0.0, 1.0, 101)**2 * 10.0, 3)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+    assert paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez).escala_por_elemento is not None
+
+def test_malla_float64_en_float32():
+    # la malla no se redondea a float32: solo el estado y los operadores siguen la precision
+    with precision.usar('float32'):
+        malla = simulacion.generar_malla(0.0, 10.0, 10**5, 3)
+        matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+        h, u = simulacion.condiciones_iniciales_gaussianas(malla)
+        operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+    assert malla.dtype == np.float64
+    assert matriz_de_masa_inversa.dtype == h.dtype == u.dtype == np.float32
+    assert operador.escala_por_elemento is None
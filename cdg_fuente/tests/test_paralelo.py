@@ -0,0 +1,46 @@
+'''
+paralelo.integrar_en_paralelo da el mismo estado bit a bit que paso_de_tiempo.integrar en serie,
+con paso de tiempo fijo y adaptativo, para 1, 2, 4 y 8 procesos.
+'''
+import numpy as np
+import pytest
+
+import estado
+import paralelo
+import paso_de_tiempo
+import precision
+import simulacion
+
+def _integrar_en_serie_y_en_paralelo(n_procesos_, integrador_, paso_t_, N_elementos_=400, N_nodos_=4, t_total_=0.05):
+    malla = simulacion.generar_malla(0.0, 10.0, N_elementos_, N_nodos_)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+    h, u = simulacion.condiciones_iniciales_gaussianas(malla)
+
+    serie = estado.EstadoConservativo.desde_primitivas(h, u)
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+    reporte_serie = paso_de_tiempo.integrar(serie, operador.evaluate_conservative, t_total_, malla, integrador_, paso_t_)
+
+    en_paralelo = estado.EstadoConservativo.desde_primitivas(h, u)
+    reporte_paralelo = paralelo.integrar_en_paralelo(en_paralelo, malla, matriz_de_masa_inversa, matriz_de_rigidez, t_total_, n_procesos_, integrador_, paso_t_)
+    return serie, en_paralelo, reporte_serie, reporte_paralelo
+
+@pytest.mark.parametrize('n_procesos', [1, 2, 4, 8])
+@pytest.mark.parametrize('integrador, paso_t', [('ssp_rk3', None), ('lsrk45', None), ('rk4', 1e-3)])
+def test_identico_a_la_serie(n_procesos, integrador, paso_t):
+    serie, en_paralelo, reporte_serie, reporte_paralelo = _integrar_en_serie_y_en_paralelo(n_procesos, integrador, paso_t)
+    assert reporte_paralelo['pasos'] == reporte_serie['pasos']
+    assert reporte_paralelo['historial_dt'] == reporte_serie['historial_dt']
+    assert np.array_equal(en_paralelo.datos, serie.datos)
+
+def test_identico_a_la_serie_en_float32():
+    with precision.usar('float32'):
+        serie, en_paralelo, _, _ = _integrar_en_serie_y_en_paralelo(4, 'ssp_rk3', None)
+    assert en_paralelo.datos.dtype == np.float32
+    assert np.array_equal(en_paralelo.datos, serie.datos)
+
+def test_error_en_un_proceso():
+    malla = simulacion.generar_malla(0.0, 10.0, 40, 3)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+    estado_ = estado.EstadoConservativo.desde_primitivas(*simulacion.condiciones_iniciales_gaussianas(malla))
+    with pytest.raises(RuntimeError):
+        paralelo.integrar_en_paralelo(estado_, malla, matriz_de_masa_inversa, matriz_de_rigidez, 0.01, 2, solucionador_='desconocido')
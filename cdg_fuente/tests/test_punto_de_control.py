@@ -0,0 +1,38 @@
+'''
+Una corrida reanudada desde un punto de control intermedio termina en el mismo estado bit a bit
+que la corrida sin interrupciones, tambien con BDF2, cuya historia incluye el paso anterior.
+'''
+import glob
+import os
+
+import numpy as np
+import pytest
+
+import punto_de_control
+
+@pytest.mark.parametrize('integrador', ['ssp_rk3', 'bdf2'])
+def test_reanudar_identico_bit_a_bit(tmp_path, integrador):
+    caso = {'N_elementos': 30, 'N_nodos': 3, 't_total': 0.5, 'integrador': integrador}
+    if integrador == 'bdf2':
+        # paso variable, para que w = dt_n / dt_(n-1) dependa de la historia guardada
+        caso['cfl'] = 3.0
+
+    directorio = str(tmp_path / 'corrida')
+    completo, reporte = punto_de_control.correr(caso, directorio, cada_n_pasos_=4)
+    intermedio = sorted(glob.glob(os.path.join(directorio, 'punto_*.cdgpc')))[0]
+    assert punto_de_control.cargar_punto_de_control(intermedio)['paso'] < reporte['pasos']
+
+    reanudado, reporte_reanudado = punto_de_control.reanudar(intermedio, cada_n_pasos_=4)
+    assert reporte_reanudado['pasos'] == reporte['pasos']
+    assert np.array_equal(reanudado.datos, completo.datos)
+
+def test_reanudar_con_nombre_de_archivo_relativo(tmp_path, monkeypatch):
+    # un nombre de archivo sin directorio se reanuda en el directorio actual
+    monkeypatch.chdir(tmp_path)
+    caso = {'N_elementos': 20, 'N_nodos': 3, 't_total': 0.2}
+    completo, reporte = punto_de_control.correr(caso, '.', cada_n_pasos_=4)
+    intermedio = os.path.basename(sorted(glob.glob('punto_*.cdgpc'))[0])
+
+    reanudado, reporte_reanudado = punto_de_control.reanudar(intermedio, cada_n_pasos_=4)
+    assert reporte_reanudado['pasos'] == reporte['pasos']
+    assert np.array_equal(reanudado.datos, completo.datos)
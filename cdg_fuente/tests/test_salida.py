@@ -0,0 +1,46 @@
+'''
+salida.EscritorDeSnapshots escribe bloques que crecen foto a foto y reescribe el indice al cambiar
+de bloque y cada indice_cada_n_fotos_ fotos, de modo que el bloque incompleto se puede leer antes
+de cerrar (como tras una corrida interrumpida).
+'''
+import json
+import os
+import time
+
+import numpy as np
+
+import estado
+import salida
+
+def _esperar_indice(directorio_, n_fotos_, limite_=10.0):
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < limite_:
+        camino = os.path.join(directorio_, salida.NOMBRE_INDICE)
+        if os.path.exists(camino):
+            with open(camino) as archivo:
+                if len(json.load(archivo)['pasos']) == n_fotos_:
+                    return
+        time.sleep(0.01)
+    raise AssertionError(f'el indice no llego a {n_fotos_} fotos')
+
+def test_bloque_incompleto_legible_antes_de_cerrar(tmp_path):
+    malla = np.zeros((50, 4))
+    actual = estado.EstadoConservativo(np.zeros((2, 50, 4)))
+    directorio = str(tmp_path / 'corrida')
+
+    escritor = salida.EscritorDeSnapshots(directorio, malla, snapshots_por_bloque_=4, indice_cada_n_fotos_=5)
+    for numero_de_paso in range(1, 11):
+        actual.datos[:] = numero_de_paso
+        escritor.al_final_del_paso(numero_de_paso, 0.1 * numero_de_paso, actual)
+    _esperar_indice(directorio, 10)
+
+    # los bloques ocupan solo las fotos escritas: 4, 4 y 2
+    lector = salida.LectorDeSnapshots(directorio)
+    tamaño_de_foto = 2 * malla.size * np.dtype(np.float64).itemsize
+    assert [os.path.getsize(os.path.join(directorio, nombre)) for nombre in lector.indice['bloques']] == [4 * tamaño_de_foto, 4 * tamaño_de_foto, 2 * tamaño_de_foto]
+    assert np.array_equal(lector.leer(8, 10, 'h')[:, 0, 0], [9.0, 10.0])
+
+    escritor.cerrar()
+    lector = salida.LectorDeSnapshots(directorio)
+    assert len(lector) == 10
+    assert np.array_equal(lector.leer(0, None, 'hu')[:, 0, 0], np.arange(1.0, 11.0))
@@ -0,0 +1,80 @@
+'''
+RHSOperator y los pasos de los integradores no reservan memoria del tamaño del estado una vez
+creados el operador y los registros: el pico de tracemalloc de una evaluacion (o de un paso)
+despues de la primera queda por debajo de UMBRAL_BYTES, muy por debajo del tamaño del estado.
+
+El unico resto es el buffer interno de los ufuncs de numpy (np.getbufsize() elementos, 64 KiB
+en float64) para operaciones con vistas no contiguas, que no crece con la malla.
+'''
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import estado
+import paso_de_tiempo
+import simulacion
+
+N_ELEMENTOS = 100000
+N_NODOS = 4
+UMBRAL_BYTES = 256 * 1024
+
+def _pico_de_memoria(funcion_):
+    # bytes reservados en el pico de una llamada sobre el nivel de entrada
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        inicial = tracemalloc.get_traced_memory()[0]
+        funcion_()
+        return tracemalloc.get_traced_memory()[1] - inicial
+    finally:
+        tracemalloc.stop()
+
+def _caso(solucionador_riemann_='roe', familia_='equiespaciados', n_casos_=None):
+    malla = simulacion.generar_malla(0.0, 10.0, N_ELEMENTOS, N_NODOS, familia_)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla, familia_=familia_)
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez, solucionador_riemann_, n_casos_)
+    h, u = simulacion.condiciones_iniciales_gaussianas(malla)
+    u = u + 0.1
+    if n_casos_ is not None:
+        h, u = np.stack([h] * n_casos_), np.stack([u] * n_casos_)
+    return operador, h, u
+
+@pytest.mark.parametrize('solucionador_riemann', ['roe', 'rusanov', 'hll'])
+@pytest.mark.parametrize('familia', ['equiespaciados', 'gauss_lobatto'])
+def test_evaluate_conservative_sin_reservas(solucionador_riemann, familia):
+    operador, h, u = _caso(solucionador_riemann, familia)
+    U = estado.EstadoConservativo.desde_primitivas(h, u).datos
+    dU_dt = np.empty_like(U)
+    operador.evaluate_conservative(U, dU_dt)
+
+    pico = _pico_de_memoria(lambda: operador.evaluate_conservative(U, dU_dt))
+    assert pico < UMBRAL_BYTES, f'{pico} bytes reservados con un estado de {U.nbytes} bytes'
+
+def test_evaluate_primitivo_sin_reservas():
+    operador, h, u = _caso()
+    salida = (np.empty_like(h), np.empty_like(h))
+    operador.evaluate((h, u), salida)
+
+    pico = _pico_de_memoria(lambda: operador.evaluate((h, u), salida))
+    assert pico < UMBRAL_BYTES, f'{pico} bytes reservados con un estado de {2 * h.nbytes} bytes'
+
+def test_lote_sin_reservas():
+    operador, h, u = _caso(n_casos_=2)
+    U = estado.EstadoConservativo.desde_primitivas(h, u).datos
+    dU_dt = np.empty_like(U)
+    operador.evaluate_conservative(U, dU_dt)
+
+    pico = _pico_de_memoria(lambda: operador.evaluate_conservative(U, dU_dt))
+    assert pico < UMBRAL_BYTES, f'{pico} bytes reservados con un lote de {U.nbytes} bytes'
+
+@pytest.mark.parametrize('integrador', ['euler', 'ssp_rk2', 'ssp_rk3', 'rk4', 'lsrk45'])
+def test_paso_sin_reservas(integrador):
+    operador, h, u = _caso()
+    U = estado.EstadoConservativo.desde_primitivas(h, u).datos
+    paso = paso_de_tiempo.obtener_integrador(integrador)
+    registros = paso_de_tiempo.crear_registros(integrador, U.shape, U.dtype)
+    paso(U, operador.evaluate_conservative, 1e-5, registros)
+
+    pico = _pico_de_memoria(lambda: paso(U, operador.evaluate_conservative, 1e-5, registros))
+    assert pico < UMBRAL_BYTES, f'{pico} bytes reservados por un paso de {integrador} con un estado de {U.nbytes} bytes'
@@ -0,0 +1,137 @@
+'''
+Validacion de la precision float32 contra float64 en el problema de la perturbacion gaussiana.
+
+Cada caso de la rejilla N_elementos x N_nodos se integra dos veces hasta el mismo tiempo fisico
+t_total con el mismo paso de tiempo fijo (el limite CFL calculado en float64, ajustado para
+llegar exactamente a t_total), una en cada precision, y se reporta:
+
+    error_rhs     || d(hu)/dt_32 - d(hu)/dt_64 || / || d(hu)/dt_64 || en el estado inicial
+    error_max     max |h_32 - h_64| en t_total
+    error_l2      || h_32 - h_64 || / || h_64 || en t_total, sobre los valores nodales
+    deriva_masa   cambio relativo de sum(h) entre el estado inicial y el final de cada precision
+    paso          tiempo minimo por paso (s) de cada precision y la aceleracion float64 / float32
+    memoria       bytes del bloque conservativo de cada precision
+
+Con el mismo paso de tiempo la diferencia entre ambas corridas es solo el redondeo, pero el
+redondeo no es pequeño en mallas finas: la derivada del flujo se calcula con diferencias de
+valores de tamaño 1 divididas por dx, de modo que el error relativo del lado derecho en float32
+crece como eps / dx (en la perturbacion gaussiana, del orden de 1e-3 con 1e3 elementos y de
+1e-1 con 1e5). Como el numero de pasos hasta t_total crece con N_elementos, el error de h en
+t_total tambien acumula mas pasos en mallas finas. Comparar a tiempo fisico fijo, y no despues
+de un numero fijo de pasos, es lo que muestra ese regimen.
+
+Uso:
+    python validar_precision.py
+    python validar_precision.py resultados.json --elementos 1000 100000 --nodos 2 4 --t-total 0.05
+'''
+import argparse
+import json
+import time
+
+import numpy as np
+
+import estado
+import paso_de_tiempo
+import precision
+import rendimiento
+import simulacion
+
+N_ELEMENTOS = (100, 10**3, 10**4, 10**5)
+N_NODOS = (2, 4, 8)
+
+# tiempo fisico (s) al que se comparan ambas precisiones
+T_TOTAL = 0.01
+
+def _correr(N_elementos_, N_nodos_, n_pasos_, paso_t_, integrador_):
+    # integra n_pasos_ pasos de paso_t_ con la precision actual, con un paso de calentamiento
+    # antes; retorna el estado inicial, el final, el tiempo de cada paso medido y el lado
+    # derecho en el estado inicial
+    malla = simulacion.generar_malla(0.0, 10.0, N_elementos_, N_nodos_)
+    matriz_de_masa_inversa, matriz_de_rigidez = simulacion.construir_operadores(malla)
+    estado_ = estado.EstadoConservativo.desde_primitivas(*simulacion.condiciones_iniciales_gaussianas(malla))
+    operador = paso_de_tiempo.RHSOperator(malla, matriz_de_masa_inversa, matriz_de_rigidez)
+    inicial = estado_.copia()
+    dU_dt = operador.evaluate_conservative(inicial.datos)
+
+    # el calentamiento corre sobre una copia para que ambas precisiones hagan los mismos pasos
+    paso_de_tiempo.integrar(inicial.copia(), operador.evaluate_conservative, paso_t_, malla, integrador_, paso_t_)
+
+    instantes = [time.perf_counter()]
+    paso_de_tiempo.integrar(estado_, operador.evaluate_conservative, n_pasos_ * paso_t_, malla, integrador_, paso_t_, al_final_del_paso_=lambda *_: instantes.append(time.perf_counter()))
+    if estado_.datos.dtype != precision.tipo_de_dato():
+        raise RuntimeError(f'El estado termino en {estado_.datos.dtype} en lugar de {np.dtype(precision.tipo_de_dato())}')
+    return inicial, estado_, np.diff(instantes), dU_dt
+
+def validar(N_elementos_, N_nodos_, t_total_=T_TOTAL, integrador_='ssp_rk3', cfl_=0.5):
+    '''
+    Compara float32 con float64 en una malla de N_elementos_ elementos con N_nodos_ nodos,
+    integrando ambas hasta t_total_.
+
+    Retorna:
+        dict: Errores, deriva de masa, tiempos por paso, aceleracion y memoria de cada precision.
+    '''
+    malla = simulacion.generar_malla(0.0, 10.0, N_elementos_, N_nodos_)
+    U = estado.EstadoConservativo.desde_primitivas(*simulacion.condiciones_iniciales_gaussianas(malla)).datos
+    n_pasos = max(1, int(np.ceil(t_total_ / paso_de_tiempo.paso_de_tiempo_estable(U, malla, cfl_))))
+    paso_t = t_total_ / n_pasos
+
+    corridas = {}
+    for nombre in ('float64', 'float32'):
+        with precision.usar(nombre):
+            corridas[nombre] = _correr(N_elementos_, N_nodos_, n_pasos, paso_t, integrador_)
+
+    dhu_dt_64 = corridas['float64'][3][1]
+    dhu_dt_32 = corridas['float32'][3][1].astype(np.float64)
+
+    h_64 = corridas['float64'][1].h
+    h_32 = corridas['float32'][1].h.astype(np.float64)
+    resultado = {
+        'N_elementos': N_elementos_,
+        'N_nodos': N_nodos_,
+        't_total': t_total_,
+        'pasos': n_pasos,
+        'error_rhs': float(np.linalg.norm(dhu_dt_32 - dhu_dt_64) / np.linalg.norm(dhu_dt_64)),
+        'error_max': float(np.max(np.abs(h_32 - h_64))),
+        'error_l2': float(np.linalg.norm(h_32 - h_64) / np.linalg.norm(h_64)),
+    }
+    for nombre, (inicial, final, tiempos, _) in corridas.items():
+        masa_inicial = np.sum(inicial.h, dtype=np.float64)
+        resultado[f'deriva_masa_{nombre}'] = float(abs(np.sum(final.h, dtype=np.float64) - masa_inicial) / masa_inicial)
+        resultado[f'paso_{nombre}'] = float(np.min(tiempos))
+        resultado[f'memoria_{nombre}'] = final.datos.nbytes
+    resultado['aceleracion'] = resultado['paso_float64'] / resultado['paso_float32']
+    return resultado
+
+def ejecutar_validacion(N_elementos_=N_ELEMENTOS, N_nodos_=N_NODOS, t_total_=T_TOTAL, max_valores_=rendimiento.MAX_VALORES):
+    '''
+    Ejecuta validar sobre la rejilla N_elementos_ x N_nodos_, saltando las combinaciones con mas
+    de max_valores_ valores por variable, e imprime una linea por caso.
+
+    Retorna:
+        dict: {'metadatos': ..., 'resultados': [...]}, listo para guardar en JSON.
+    '''
+    print(f'{"E":>8} {"N":>3} {"pasos":>6} {"error_rhs":>10} {"error_max":>10} {"error_l2":>10} {"masa 64":>10} {"masa 32":>10} {"ms/paso 64":>11} {"ms/paso 32":>11} {"acel.":>6} {"MB 64":>8} {"MB 32":>8}')
+    resultados = []
+    for N_nodos in N_nodos_:
+        for N_elementos in N_elementos_:
+            if N_elementos * N_nodos > max_valores_:
+                continue
+            r = validar(N_elementos, N_nodos, t_total_)
+            print(f"{N_elementos:>8} {N_nodos:>3} {r['pasos']:>6} {r['error_rhs']:10.2e} {r['error_max']:10.2e} {r['error_l2']:10.2e} {r['deriva_masa_float64']:10.2e} {r['deriva_masa_float32']:10.2e} "
+                  f"{r['paso_float64'] * 1e3:11.4f} {r['paso_float32'] * 1e3:11.4f} {r['aceleracion']:6.2f} {r['memoria_float64'] / 1e6:8.2f} {r['memoria_float32'] / 1e6:8.2f}")
+            resultados.append(r)
+    return {'metadatos': rendimiento.metadatos_del_entorno(), 'resultados': resultados}
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Error y aceleracion de float32 contra float64 en cdg_fuente')
+    argumentos.add_argument('salida', nargs='?', help='archivo JSON de resultados, opcional')
+    argumentos.add_argument('--elementos', type=int, nargs='+', default=N_ELEMENTOS)
+    argumentos.add_argument('--nodos', type=int, nargs='+', default=N_NODOS)
+    argumentos.add_argument('--t-total', type=float, default=T_TOTAL, help='tiempo fisico (s) de la comparacion')
+    argumentos.add_argument('--max-valores', type=int, default=rendimiento.MAX_VALORES)
+    argumentos = argumentos.parse_args()
+
+    resultados = ejecutar_validacion(argumentos.elementos, argumentos.nodos, argumentos.t_total, argumentos.max_valores)
+    if argumentos.salida:
+        with open(argumentos.salida, 'w') as archivo:
+            json.dump(resultados, archivo, indent=1)